@@ -0,0 +1,373 @@
+"""
+:since: 2026-10-18
+
+Benchmarks of storage clients against local stand-ins.
+
+Runs upload, download (raw and gunzipped), is_exists, rename and delete over
+object sizes and concurrency levels, and reports throughput, latency
+percentiles and how much RSS grew while each case ran. Results are written as JSON, which a later run
+compares with::
+
+    python -m benchmarks.bench_storage --output baseline.json
+    python -m benchmarks.bench_storage --baseline baseline.json
+
+Backends:
+    local: LocalStorage in a temporary directory, flat and sharded layouts
+    s3: moto's S3 server started in process(needs moto[server]), or an S3
+        compatible endpoint given with --s3-endpoint
+    gcs: a fake GCS server, e.g. fsouza/fake-gcs-server, given with
+        --gcs-endpoint. Skipped without one
+"""
+import argparse
+import concurrent.futures
+import contextlib
+import datetime
+import gzip
+import json
+import logging
+import os
+import platform
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+from cloud_storage import GoogleCloudStorage, LocalStorage, S3CloudStorageBoto3, __version__
+from cloud_storage.clients import create_gcs_client, create_s3_client
+
+BUCKET_NAME = 'cloud-storage-bench'
+DEFAULT_SIZES = '1K,256K,4M'
+DEFAULT_CONCURRENCY = '1,8'
+DEFAULT_OPS = 40
+# relative change of throughput or p99 latency reported as a regression.
+DEFAULT_TOLERANCE = 0.2
+# seconds between RSS samples while a case runs.
+RSS_SAMPLE_INTERVAL = 0.005
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+OPERATIONS = (
+    'upload',
+    'download_raw',
+    'download_gzip',
+    'is_exists',
+    'rename',
+    'delete',
+)
+# operations moving object content, whose throughput is reported in MB/s.
+CONTENT_OPERATIONS = frozenset(('upload', 'download_raw', 'download_gzip'))
+
+SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+
+def parse_size(text):
+    """Return bytes of a size like '512', '256K' or '4M'"""
+    text = text.strip().upper().rstrip('B')
+    unit = text[-1:] if text[-1:] in SIZE_UNITS else ''
+    return int(float(text[:len(text) - len(unit)]) * SIZE_UNITS[unit])
+
+
+def make_payload(size):
+    """Return reproducible content, half random and half zeros"""
+    rng = random.Random(size)
+    random_size = size // 2
+    return rng.getrandbits(random_size * 8).to_bytes(random_size, 'little') + \
+        bytes(size - random_size)
+
+
+def percentile(sorted_values, fraction):
+    """Return the nearest-rank percentile of sorted values"""
+    index = max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def current_rss():
+    """Return bytes of resident memory now. None without /proc"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        return None
+
+
+class RssSampler(object):
+    """Sample RSS on a thread, to report how much it peaked above its start
+
+    The process-wide high-water mark of getrusage can't be told apart per
+    case, as it never goes down.
+    """
+
+    def __init__(self):
+        self.start_rss = current_rss()
+        self.peak_rss = self.start_rss
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def __enter__(self):
+        if self.start_rss is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _sample(self):
+        while not self._stopped.wait(RSS_SAMPLE_INTERVAL):
+            self.peak_rss = max(self.peak_rss, current_rss())
+        self.peak_rss = max(self.peak_rss, current_rss())
+
+    def peak_growth_mb(self):
+        if self.start_rss is None:
+            return None
+        return (self.peak_rss - self.start_rss) / 1024 / 1024
+
+
+def run_case(storage, operation, size, concurrency, ops, prefix):
+    """Time ``ops`` calls of an operation on ``concurrency`` threads
+
+    Objects of each case are set up by the operations before it, in the
+    order of OPERATIONS.
+
+    Returns:
+        dict. Result of the case
+    """
+    payload = make_payload(size)
+    gzipped_payload = gzip.compress(payload, 1)
+    keys = ['%s/%d' % (prefix, i) for i in range(ops)]
+
+    def call(i):
+        key = keys[i]
+        if operation == 'upload':
+            storage.upload(BUCKET_NAME, key, payload)
+        elif operation == 'download_raw':
+            storage.download_gzipped(BUCKET_NAME, key)
+        elif operation == 'download_gzip':
+            storage.download_gzipped(BUCKET_NAME, key + '.gz', do_gunzip=True)
+        elif operation == 'is_exists':
+            storage.is_exists(BUCKET_NAME, key)
+        elif operation == 'rename':
+            storage.rename(BUCKET_NAME, key, key + '.renamed')
+        elif operation == 'delete':
+            storage.delete(BUCKET_NAME, key + '.renamed')
+
+    if operation == 'download_gzip':
+        for key in keys:
+            storage.upload(BUCKET_NAME, key + '.gz', gzipped_payload,
+                           'application/octet-stream', 'gzip')
+
+    def timed_call(i):
+        started = time.perf_counter()
+        call(i)
+        return time.perf_counter() - started
+
+    with RssSampler() as rss_sampler:
+        started = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(concurrency) as executor:
+            latencies = sorted(executor.map(timed_call, range(ops)))
+        seconds = time.perf_counter() - started
+
+    if operation == 'download_gzip':
+        for key in keys:
+            storage.delete(BUCKET_NAME, key + '.gz')
+
+    return {
+        'operation': operation,
+        'size': size,
+        'concurrency': concurrency,
+        'ops': ops,
+        'seconds': seconds,
+        'ops_per_sec': ops / seconds,
+        'mb_per_sec': (
+            size * ops / seconds / 1024 / 1024
+            if operation in CONTENT_OPERATIONS else None),
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p90_ms': percentile(latencies, 0.9) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': latencies[-1] * 1000,
+        # RSS peak above its level when the case started.
+        'rss_growth_mb': rss_sampler.peak_growth_mb(),
+    }
+
+
+def run_backend(name, storage, sizes, concurrency_levels, ops):
+    results = []
+    for size in sizes:
+        for concurrency in concurrency_levels:
+            prefix = 'bench/%d/%d/%d' % (size, concurrency, time.time_ns())
+            for operation in OPERATIONS:
+                result = dict(run_case(storage, operation, size, concurrency, ops, prefix),
+                              backend=name)
+                print_result(result)
+                results.append(result)
+    return results
+
+
+@contextlib.contextmanager
+def local_storages():
+    with tempfile.TemporaryDirectory(prefix='cloud-storage-bench-') as root_dir:
+        flat = LocalStorage(root_dir + '/flat')
+        sharded = LocalStorage(root_dir + '/sharded', layout='sharded')
+        for storage in (flat, sharded):
+            storage.create_bucket(BUCKET_NAME)
+        yield [('local', flat), ('local-sharded', sharded)]
+
+
+@contextlib.contextmanager
+def s3_storage(endpoint_url, max_pool_connections):
+    server = None
+    if endpoint_url is None:
+        try:
+            from moto.server import ThreadedMotoServer
+        except ImportError as e:
+            print('s3 skipped, moto[server] is needed: %s' % e, file=sys.stderr)
+            yield []
+            return
+        # werkzeug logs every request.
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        port = _free_port()
+        server = ThreadedMotoServer(ip_address='127.0.0.1', port=port, verbose=False)
+        server.start()
+        endpoint_url = 'http://127.0.0.1:%d' % port
+
+    try:
+        client = create_s3_client(
+            max_pool_connections=max_pool_connections, endpoint_url=endpoint_url,
+            region_name='us-east-1', aws_access_key_id='bench',
+            aws_secret_access_key='bench',
+        )
+        client.create_bucket(Bucket=BUCKET_NAME)
+        yield [('s3', S3CloudStorageBoto3(storage_client=client))]
+    finally:
+        if server is not None:
+            server.stop()
+
+
+@contextlib.contextmanager
+def gcs_storage(endpoint_url, max_pool_connections):
+    if endpoint_url is None:
+        print('gcs skipped, no --gcs-endpoint', file=sys.stderr)
+        yield []
+        return
+
+    import google.api_core.exceptions
+    import google.auth.credentials
+
+    client = create_gcs_client(
+        max_pool_connections=max_pool_connections, project='bench',
+        credentials=google.auth.credentials.AnonymousCredentials(),
+        client_options={'api_endpoint': endpoint_url},
+    )
+    try:
+        client.create_bucket(BUCKET_NAME)
+    except google.api_core.exceptions.Conflict:
+        pass
+    yield [('gcs', GoogleCloudStorage(storage_client=client))]
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def compare(results, baseline, tolerance):
+    """Return results slower than their baseline
+
+    A case regresses if its throughput drops or its p99 latency grows by
+    more than tolerance.
+
+    Returns:
+        list. (result, baseline result) pairs
+    """
+    def case_key(x):
+        return x['backend'], x['operation'], x['size'], x['concurrency']
+
+    baseline_results = {case_key(x): x for x in baseline['results']}
+    regressions = []
+    for result in results:
+        base = baseline_results.get(case_key(result))
+        if base is None:
+            continue
+        if (result['ops_per_sec'] < base['ops_per_sec'] * (1 - tolerance)
+                or result['p99_ms'] > base['p99_ms'] * (1 + tolerance)):
+            regressions.append((result, base))
+    return regressions
+
+
+def print_result(result):
+    mb_per_sec = result['mb_per_sec']
+    print('%-14s %-14s %9d B x%-3d %9.1f ops/s %9s MB/s  p50 %8.2f  p99 %8.2f ms' % (
+        result['backend'], result['operation'], result['size'], result['concurrency'],
+        result['ops_per_sec'], '-' if mb_per_sec is None else '%.1f' % mb_per_sec,
+        result['p50_ms'], result['p99_ms'],
+    ))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--backends', default='local,s3,gcs',
+                        help='Comma separated: local, s3, gcs')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES,
+                        help='Comma separated object sizes. e.g. 1K,4M')
+    parser.add_argument('--concurrency', default=DEFAULT_CONCURRENCY,
+                        help='Comma separated numbers of threads')
+    parser.add_argument('--ops', type=int, default=DEFAULT_OPS,
+                        help='Calls per operation, size and concurrency')
+    parser.add_argument('--s3-endpoint', help='Use this S3 endpoint instead of moto')
+    parser.add_argument('--gcs-endpoint',
+                        help='Fake GCS server. e.g. http://localhost:4443')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--baseline', help='JSON results to compare with')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Allowed slowdown against baseline(default: 0.2)')
+    args = parser.parse_args(argv)
+
+    backends = set(args.backends.split(','))
+    sizes = [parse_size(x) for x in args.sizes.split(',')]
+    concurrency_levels = [int(x) for x in args.concurrency.split(',')]
+    max_pool_connections = max(concurrency_levels)
+
+    results = []
+    with contextlib.ExitStack() as stack:
+        storages = []
+        if 'local' in backends:
+            storages += stack.enter_context(local_storages())
+        if 's3' in backends:
+            storages += stack.enter_context(s3_storage(args.s3_endpoint, max_pool_connections))
+        if 'gcs' in backends:
+            storages += stack.enter_context(gcs_storage(args.gcs_endpoint, max_pool_connections))
+        for name, storage in storages:
+            results += run_backend(name, storage, sizes, concurrency_levels, args.ops)
+
+    report = {
+        'meta': {
+            'cloud_storage': __version__,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'ops': args.ops,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for result, base in regressions:
+            print('regressed %s %s %d B x%d: %.1f -> %.1f ops/s, p99 %.2f -> %.2f ms' % (
+                result['backend'], result['operation'], result['size'],
+                result['concurrency'], base['ops_per_sec'], result['ops_per_sec'],
+                base['p99_ms'], result['p99_ms']))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
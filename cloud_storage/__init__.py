@@ -1,7 +1,21 @@
 from cloud_storage.__about__ import __version__
+from cloud_storage.aio import (
+    AsyncGoogleCloudStorage,
+    AsyncLocalStorage,
+    AsyncS3Storage,
+)
+from cloud_storage.cache import CachedStorage
 from cloud_storage.enums import CloudStorageType
 from cloud_storage.excepts import UnsupportedStorage
+from cloud_storage.instrumentation import (
+    CallbackInstrumentation,
+    OpenTelemetryInstrumentation,
+    PrometheusInstrumentation,
+)
 from cloud_storage.local_storage import LocalStorage
+from cloud_storage.memory_cache import MemoryCache
+from cloud_storage.models import BatchItemResult, ObjectInfo
+from cloud_storage.retry import RetryBudget, RetryPolicy
 from cloud_storage.gcs_storage import GoogleCloudStorage
 from cloud_storage.s3_storage_boto3 import S3CloudStorageBoto3
 
@@ -11,19 +25,47 @@ STORAGE_CLIENT_MAPPING = {
     CloudStorageType.S3: S3CloudStorageBoto3,
 }
 
+ASYNC_STORAGE_CLIENT_MAPPING = {
+    CloudStorageType.GCS: AsyncGoogleCloudStorage,
+    CloudStorageType.LOCAL: AsyncLocalStorage,
+    CloudStorageType.S3: AsyncS3Storage,
+}
+
 
-def create_storage_client(name):
+def create_storage_client(name, **kwargs):
     """
     Return new CloudStorage client
 
     Args:
         name
+    Kwargs:
+        **kwargs: Passed to the client class. e.g. shared_client=True,
+            max_pool_connections=64 or read_timeout=30 for 's3' and 'gcs'
     """
     try:
         client_class = STORAGE_CLIENT_MAPPING[name]
-        return client_class()
     except KeyError:
         raise UnsupportedStorage('%s is not supported.' % name)
+    return client_class(**kwargs)
+
+
+def create_async_storage_client(name, **kwargs):
+    """
+    Return new async CloudStorage client
+
+    Args:
+        name
+    Kwargs:
+        storage: Storage client to run calls with. Created if not given
+        max_in_flight(int): Max number of calls running at the same time
+        **kwargs: Passed to the storage client created, as by
+            ``create_storage_client``. e.g. retry_policy or read_timeout
+    """
+    try:
+        client_class = ASYNC_STORAGE_CLIENT_MAPPING[name]
+    except KeyError:
+        raise UnsupportedStorage('%s is not supported.' % name)
+    return client_class(**kwargs)
 
 
 def int_or_str(value):
@@ -39,6 +81,19 @@ __all__ = (
     '__version__',
     'VERSION',
     'create_storage_client',
+    'create_async_storage_client',
+    'AsyncGoogleCloudStorage',
+    'AsyncLocalStorage',
+    'AsyncS3Storage',
+    'BatchItemResult',
+    'CachedStorage',
+    'CallbackInstrumentation',
+    'MemoryCache',
+    'ObjectInfo',
+    'OpenTelemetryInstrumentation',
+    'PrometheusInstrumentation',
+    'RetryBudget',
+    'RetryPolicy',
     'LocalStorage',
     'GoogleCloudStorage',
     'S3CloudStorageBoto3',
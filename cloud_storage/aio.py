@@ -0,0 +1,137 @@
+"""
+:since: 2026-10-18
+
+asyncio interface of storage clients.
+
+Each async client owns a storage client and a thread pool sized to its
+in-flight limit. Every coroutine runs the matching blocking call on that pool,
+so concurrency is set per client rather than by the event loop's default
+executor, and all calls share the storage client's connection pool.
+
+Calls run on threads because boto3 and google-cloud-storage only make
+blocking requests; native async SDKs would be new dependencies. The pool
+bounds calls in flight, as the connection pool would anyway.
+"""
+import asyncio
+import concurrent.futures
+import functools
+
+from cloud_storage.gcs_storage import GoogleCloudStorage
+from cloud_storage.local_storage import LocalStorage
+from cloud_storage.s3_storage_boto3 import S3CloudStorageBoto3
+
+DEFAULT_MAX_IN_FLIGHT = 32
+
+STORAGE_METHOD_NAMES = (
+    'list_bucket_names',
+    'upload_file',
+    'upload',
+    'upload_stream',
+    'is_exists',
+    'stat',
+    'rename',
+    'copy',
+    'download_gzipped_to_file',
+    'download_gzipped',
+    'delete',
+    'upload_many',
+    'download_many',
+    'delete_many',
+)
+
+
+def _async_method(name):
+    async def method(self, *args, **kwargs):
+        return await self._run(getattr(self.storage, name), *args, **kwargs)
+
+    method.__name__ = name
+    method.__doc__ = 'Coroutine version of ``%s``' % name
+    return method
+
+
+class AsyncStorage(object):
+    """Base of async storage clients
+
+    Args:
+        storage: Storage client to run calls with
+    Kwargs:
+        max_in_flight(int): Max number of calls running at the same time
+
+    Subclasses create their storage client if not given one, passing it
+    other keyword arguments, e.g. retry_policy or read_timeout.
+    """
+
+    def __init__(self, storage, max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+        self.storage = storage
+        self.max_in_flight = max_in_flight
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_in_flight)
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs))
+
+    def close(self):
+        """Wait for running calls and release the worker threads"""
+        self._executor.shutdown(wait=True)
+
+    async def aclose(self):
+        """Coroutine version of ``close``, waiting without blocking the loop"""
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+
+for _name in STORAGE_METHOD_NAMES:
+    setattr(AsyncStorage, _name, _async_method(_name))
+
+
+class AsyncGoogleCloudStorage(AsyncStorage):
+
+    def __init__(self, storage=None, max_in_flight=DEFAULT_MAX_IN_FLIGHT,
+                 **storage_options):
+        if storage is None:
+            # one pooled connection per in-flight call.
+            storage_options.setdefault('max_pool_connections', max_in_flight)
+            storage = GoogleCloudStorage(**storage_options)
+        else:
+            assert not storage_options, "storage options are for a new storage client"
+        super().__init__(storage, max_in_flight)
+
+
+class AsyncLocalStorage(AsyncStorage):
+
+    def __init__(self, storage=None, max_in_flight=DEFAULT_MAX_IN_FLIGHT,
+                 **storage_options):
+        if storage is None:
+            storage = LocalStorage(**storage_options)
+        else:
+            assert not storage_options, "storage options are for a new storage client"
+        super().__init__(storage, max_in_flight)
+
+    create_bucket = _async_method('create_bucket')
+
+
+class AsyncS3Storage(AsyncStorage):
+
+    def __init__(self, storage=None, max_in_flight=DEFAULT_MAX_IN_FLIGHT,
+                 **storage_options):
+        if storage is None:
+            # one pooled connection per in-flight call.
+            storage_options.setdefault('max_pool_connections', max_in_flight)
+            storage = S3CloudStorageBoto3(**storage_options)
+        else:
+            assert not storage_options, "storage options are for a new storage client"
+        super().__init__(storage, max_in_flight)
+
+
+__all__ = (
+    'AsyncGoogleCloudStorage',
+    'AsyncLocalStorage',
+    'AsyncS3Storage',
+    'AsyncStorage',
+)
@@ -0,0 +1,174 @@
+"""
+:since: 2026-10-18
+"""
+import concurrent.futures
+
+from cloud_storage.excepts import (
+    CloudStorageBadRequestException,
+    CloudStorageInvalidArgumentTypeException,
+    CloudStorageNotFoundException,
+    CloudStorageServerErrorException,
+    CloudStorageTooManyRequestsException,
+    CloudStorageUnknownErrorException,
+)
+from cloud_storage.instrumentation import with_call_event
+from cloud_storage.memory_cache import object_token
+from cloud_storage.models import BatchItemResult
+
+DEFAULT_BATCH_MAX_WORKERS = 16
+
+STORAGE_EXCEPTIONS = (
+    CloudStorageBadRequestException,
+    CloudStorageInvalidArgumentTypeException,
+    CloudStorageNotFoundException,
+    CloudStorageServerErrorException,
+    CloudStorageTooManyRequestsException,
+    CloudStorageUnknownErrorException,
+)
+
+
+def to_storage_exception(e):
+    """Map an exception to one of ``cloud_storage.excepts`` types
+
+    Args:
+        e(Exception): Exception raised by a storage call
+    Returns:
+        Exception. ``e`` itself if it's already a storage exception
+    """
+    if isinstance(e, STORAGE_EXCEPTIONS):
+        return e
+    if isinstance(e, FileNotFoundError):
+        return CloudStorageNotFoundException(str(e))
+    if isinstance(e, AssertionError):
+        return CloudStorageInvalidArgumentTypeException(str(e))
+    return CloudStorageUnknownErrorException(str(e))
+
+
+def run_many(func, args_list, max_workers=DEFAULT_BATCH_MAX_WORKERS,
+             to_exception=to_storage_exception):
+    """Call ``func`` for every args in ``args_list`` on a bounded worker pool
+
+    Args:
+        func(callable): Function to call
+        args_list(list): List of (object_key, args) pairs
+    Kwargs:
+        max_workers(int): Max concurrent calls
+        to_exception(callable): Maps errors to storage exceptions, keeping
+            the original as their cause
+    Returns:
+        list. BatchItemResult per item, in the order of ``args_list``
+    """
+    def call(object_key_and_args):
+        object_key, args = object_key_and_args
+        try:
+            return BatchItemResult(object_key, func(*args), None)
+        except Exception as e:
+            error = to_exception(e)
+            if error is not e and error.__cause__ is None:
+                error.__cause__ = e
+            return BatchItemResult(object_key, None, error)
+
+    if not args_list:
+        return []
+    max_workers = max(1, min(max_workers, len(args_list)))
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+        return list(executor.map(with_call_event(call), args_list))
+
+
+class BaseStorage(object):
+    """Operations shared by every storage client
+
+    They are built on the single object methods each client implements.
+    """
+    # optional cloud_storage.memory_cache.MemoryCache
+    memory_cache = None
+    # optional cloud_storage.retry.RetryPolicy
+    retry_policy = None
+    # optional cloud_storage.instrumentation.Instrumentation
+    instrumentation = None
+
+    def _to_storage_exception(self, e):
+        """Map an error of this client's calls to a storage exception, as its
+        single object calls do
+        """
+        return to_storage_exception(e)
+
+    def _download_gzipped_stated(self, bucket_name, object_key, info, **kwargs):
+        """``download_gzipped`` an object the caller has just stat-ed
+
+        Clients which stat objects to download them reuse ``info`` instead.
+        """
+        return self.download_gzipped(bucket_name, object_key, **kwargs)
+
+    def _memory_cache_namespace(self):
+        """Return what keeps this client's memory_cache entries apart from
+        other clients'
+        """
+        return type(self).__name__, object_token(self)
+
+    def iter_objects(self, bucket_name, prefix=None, delimiter=None, page_size=None):
+        """Iterate objects of a bucket lazily, in key order
+
+        Yields:
+            ObjectInfo
+        """
+        raise NotImplementedError(
+            '%s can not list objects' % self.__class__.__name__)
+
+    def upload_many(self, bucket_name, items,
+                    max_workers=DEFAULT_BATCH_MAX_WORKERS, **kwargs):
+        """Upload many contents to a bucket concurrently
+
+        Args:
+            bucket_name(str):  Bucket name to use
+            items(iterable): (object_key, buffer) pairs
+        Kwargs:
+            max_workers(int): Max concurrent uploads
+            **kwargs: Passed to ``upload``. e.g. content_type
+        Returns:
+            list. BatchItemResult per item
+        """
+        return run_many(
+            lambda object_key, buffer: self.upload(
+                bucket_name, object_key, buffer, **kwargs),
+            [(object_key, (object_key, buffer)) for object_key, buffer in items],
+            max_workers, self._to_storage_exception,
+        )
+
+    def download_many(self, bucket_name, object_keys,
+                      max_workers=DEFAULT_BATCH_MAX_WORKERS, **kwargs):
+        """Download many objects to memory concurrently
+
+        Args:
+            bucket_name(str):  Bucket name to use
+            object_keys(iterable): Object keys to download
+        Kwargs:
+            max_workers(int): Max concurrent downloads
+            **kwargs: Passed to ``download_gzipped``. e.g. do_gunzip
+        Returns:
+            list. BatchItemResult per item. result is the content
+        """
+        return run_many(
+            lambda object_key: self.download_gzipped(
+                bucket_name, object_key, **kwargs),
+            [(object_key, (object_key,)) for object_key in object_keys],
+            max_workers, self._to_storage_exception,
+        )
+
+    def delete_many(self, bucket_name, object_keys,
+                    max_workers=DEFAULT_BATCH_MAX_WORKERS):
+        """Delete many objects from bucket concurrently
+
+        Args:
+            bucket_name(str):  Bucket name to use
+            object_keys(iterable): Object keys to delete
+        Kwargs:
+            max_workers(int): Max concurrent deletes
+        Returns:
+            list. BatchItemResult per item
+        """
+        return run_many(
+            lambda object_key: self.delete(bucket_name, object_key),
+            [(object_key, (object_key,)) for object_key in object_keys],
+            max_workers, self._to_storage_exception,
+        )
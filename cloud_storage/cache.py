@@ -0,0 +1,309 @@
+"""
+:since: 2026-10-18
+
+Caching layers in front of storage clients.
+"""
+import collections
+import os
+import tempfile
+import threading
+
+from cloud_storage.base import BaseStorage, to_storage_exception
+from cloud_storage.excepts import CloudStorageNotFoundException
+from cloud_storage.local_storage import LocalStorage
+from cloud_storage.memory_cache import VERSION_STRIPES
+
+DEFAULT_CACHE_DIR = '/tmp/cloud_storage_cache'
+DEFAULT_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+
+ETAG_SUFFIX = '.etag'
+TEMP_PREFIX = '.tmp-'
+# gunzipped content is cached under a key no real key collides with.
+GUNZIP_KEY_SUFFIX = '\0gunzip'
+
+
+class CachedStorage(BaseStorage):
+    """Read-through local disk cache in front of a storage client
+
+    ``download_gzipped`` results are kept under ``cache_dir``, in a
+    subdirectory per ``namespace``, in the ``LocalStorage`` layout, and least
+    recently used ones are evicted once they add up to more than
+    ``max_bytes``. With ``revalidate``, every hit is checked against the
+    object's current ETag with ``stat`` (HEAD), which is much cheaper than a
+    download, and a miss downloads the content of that ETag without another
+    HEAD.
+
+    The budget is kept by each instance, over the content it found at start
+    and cached since: processes sharing a namespace directory can together
+    exceed it, so give them their own namespaces or a share of the budget.
+
+    Writes made through the wrapper invalidate cached content of the keys.
+    Other attributes are passed through to the wrapped client.
+
+    Args:
+        storage: Storage client to cache, e.g. from create_storage_client
+    Kwargs:
+        cache_dir(str): Directory to keep cached content
+        max_bytes(int): Size budget of cached content
+        revalidate(bool): True to check ETag on every hit(default: True)
+        namespace(str): Subdirectory of cache_dir keeping this client's
+            content apart from other clients', e.g. per endpoint or account.
+            Defaults to the client's type name, e.g. 'S3CloudStorageBoto3'
+    """
+
+    def __init__(self, storage, cache_dir=DEFAULT_CACHE_DIR,
+                 max_bytes=DEFAULT_CACHE_MAX_BYTES, revalidate=True, namespace=None):
+        self.storage = storage
+        self.max_bytes = max_bytes
+        self.revalidate = revalidate
+        if namespace is None:
+            namespace = type(storage).__name__
+        cache_dir = os.path.join(cache_dir, namespace)
+        os.makedirs(cache_dir, exist_ok=True)
+        self._local_storage = LocalStorage(cache_dir)
+        self._lock = threading.Lock()
+        # full path to size, least recently used first.
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        # bumped by invalidations of the paths hashing to each, as in
+        # MemoryCache. Content downloaded while its counter changed isn't kept.
+        self._versions = [0] * VERSION_STRIPES
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load_entries(cache_dir)
+
+    def __getattr__(self, name):
+        return getattr(self.storage, name)
+
+    # defined by BaseStorage, so not reaching __getattr__.
+    memory_cache = property(lambda self: self.storage.memory_cache)
+    retry_policy = property(lambda self: self.storage.retry_policy)
+    instrumentation = property(lambda self: self.storage.instrumentation)
+
+    def _memory_cache_namespace(self):
+        return self.storage._memory_cache_namespace()
+
+    def iter_objects(self, bucket_name, *args, **kwargs):
+        return self.storage.iter_objects(bucket_name, *args, **kwargs)
+
+    def stats(self):
+        """Return cache counters
+
+        Returns:
+            dict. hits, misses, evictions, entries and bytes
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+            }
+
+    def download_gzipped(self, bucket_name, object_key, do_gunzip=False, **kwargs):
+        """Download an object to memory, through the cache
+
+        See ``download_gzipped`` of the wrapped client.
+        """
+        cache_key = object_key + GUNZIP_KEY_SUFFIX if do_gunzip else object_key
+        full_path = self._local_storage._get_write_path(bucket_name, cache_key)
+        version = self._versions[_stripe(full_path)]
+
+        info = etag = None
+        if self.revalidate:
+            try:
+                info = self.storage.stat(bucket_name, object_key)
+                etag = info.etag
+            except Exception as e:
+                if isinstance(to_storage_exception(e), CloudStorageNotFoundException):
+                    self._remove_entry(full_path)
+                raise
+
+        content = self._read_entry(full_path, etag)
+        if content is not None:
+            with self._lock:
+                self.hits += 1
+            if kwargs.get('as_bytearray'):
+                return bytearray(content)
+            return content
+
+        with self._lock:
+            self.misses += 1
+        if info is not None:
+            content = self.storage._download_gzipped_stated(
+                bucket_name, object_key, info, do_gunzip=do_gunzip, **kwargs)
+        else:
+            content = self.storage.download_gzipped(
+                bucket_name, object_key, do_gunzip=do_gunzip, **kwargs)
+        self._write_entry(full_path, content, etag, version)
+        return content
+
+    def upload_file(self, bucket_name, object_key, *args, **kwargs):
+        try:
+            return self.storage.upload_file(bucket_name, object_key, *args, **kwargs)
+        finally:
+            self.invalidate(bucket_name, object_key)
+
+    def upload(self, bucket_name, object_key, *args, **kwargs):
+        try:
+            return self.storage.upload(bucket_name, object_key, *args, **kwargs)
+        finally:
+            self.invalidate(bucket_name, object_key)
+
+    def upload_stream(self, bucket_name, object_key, *args, **kwargs):
+        try:
+            return self.storage.upload_stream(bucket_name, object_key, *args, **kwargs)
+        finally:
+            self.invalidate(bucket_name, object_key)
+
+    def rename(self, bucket_name, object_key, new_object_key):
+        try:
+            return self.storage.rename(bucket_name, object_key, new_object_key)
+        finally:
+            self.invalidate(bucket_name, object_key)
+            self.invalidate(bucket_name, new_object_key)
+
+    def copy(self, bucket_name, object_key, dst_bucket_name, dst_object_key, **kwargs):
+        try:
+            return self.storage.copy(
+                bucket_name, object_key, dst_bucket_name, dst_object_key, **kwargs)
+        finally:
+            self.invalidate(dst_bucket_name, dst_object_key)
+
+    def delete(self, bucket_name, object_key):
+        try:
+            return self.storage.delete(bucket_name, object_key)
+        finally:
+            self.invalidate(bucket_name, object_key)
+
+    def delete_many(self, bucket_name, object_keys, **kwargs):
+        object_keys = list(object_keys)
+        try:
+            return self.storage.delete_many(bucket_name, object_keys, **kwargs)
+        finally:
+            for object_key in object_keys:
+                self.invalidate(bucket_name, object_key)
+
+    def invalidate(self, bucket_name, object_key):
+        """Drop cached content of an object
+
+        Args:
+            bucket_name(str):  Bucket name to use
+            object_key(str): Object key stored in bucket
+        Returns:
+            None
+        """
+        for cache_key in (object_key, object_key + GUNZIP_KEY_SUFFIX):
+            full_path = self._local_storage._get_full_path(bucket_name, cache_key)
+            with self._lock:
+                self._versions[_stripe(full_path)] += 1
+            self._remove_entry(full_path)
+
+    def _load_entries(self, cache_dir):
+        """Register content cached by previous processes, oldest access first"""
+        found = []
+        for bucket_name in self._local_storage.list_bucket_names():
+            bucket_directory = os.path.join(cache_dir, bucket_name)
+            for name in os.listdir(bucket_directory):
+                full_path = os.path.join(bucket_directory, name)
+                if name.startswith(TEMP_PREFIX):
+                    _remove_file(full_path)
+                elif not name.endswith(ETAG_SUFFIX):
+                    stat_result = os.stat(full_path)
+                    found.append((stat_result.st_atime, full_path, stat_result.st_size))
+
+        with self._lock:
+            for _, full_path, size in sorted(found):
+                self._entries[full_path] = size
+                self._bytes += size
+            self._evict()
+
+    def _read_entry(self, full_path, etag):
+        with self._lock:
+            if full_path not in self._entries:
+                return None
+            self._entries.move_to_end(full_path)
+
+        try:
+            if etag is not None:
+                with open(full_path + ETAG_SUFFIX, 'r') as f:
+                    if f.read() != etag:
+                        self._remove_entry(full_path)
+                        return None
+            with open(full_path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            # evicted meanwhile.
+            return None
+
+    def _write_entry(self, full_path, content, etag, version):
+        size = len(content)
+        if size > self.max_bytes:
+            return
+
+        if etag is not None:
+            _write_file(full_path + ETAG_SUFFIX, etag.encode('utf-8'))
+        else:
+            _remove_file(full_path + ETAG_SUFFIX)
+        _write_file(full_path, content)
+
+        with self._lock:
+            stale = version != self._versions[_stripe(full_path)]
+            if not stale:
+                self._bytes += size - self._entries.pop(full_path, 0)
+                self._entries[full_path] = size
+                self._evict()
+        if stale:
+            # invalidated while downloading; the content may predate a write.
+            self._remove_entry(full_path)
+            _remove_file(full_path)
+            _remove_file(full_path + ETAG_SUFFIX)
+
+    def _remove_entry(self, full_path):
+        with self._lock:
+            size = self._entries.pop(full_path, None)
+            if size is None:
+                return
+            self._bytes -= size
+        _remove_file(full_path)
+        _remove_file(full_path + ETAG_SUFFIX)
+
+    def _evict(self):
+        """Evict least recently used content over budget. Lock must be held."""
+        while self._bytes > self.max_bytes and self._entries:
+            full_path, size = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+            _remove_file(full_path)
+            _remove_file(full_path + ETAG_SUFFIX)
+
+
+def _stripe(full_path):
+    return hash(full_path) % VERSION_STRIPES
+
+
+def _write_file(full_path, content):
+    """Write a file as a whole, so readers never see it half written"""
+    fd, temp_path = tempfile.mkstemp(
+        prefix=TEMP_PREFIX, dir=os.path.dirname(full_path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.replace(temp_path, full_path)
+    except BaseException:
+        _remove_file(temp_path)
+        raise
+
+
+def _remove_file(full_path):
+    try:
+        os.remove(full_path)
+    except FileNotFoundError:
+        pass
+
+
+__all__ = (
+    'CachedStorage',
+)
@@ -0,0 +1,209 @@
+"""
+:since: 2026-10-18
+
+Construction and sharing of the SDK clients storages talk through.
+
+A storage built with ``shared_client=True`` takes its SDK client from a
+process-wide registry, so storages with the same options reuse one warmed
+connection pool.
+"""
+import socket
+import threading
+
+import boto3.session
+import botocore.config
+import google.auth
+import google.auth.transport.requests
+import google.cloud.storage
+import requests.adapters
+import urllib3.connection
+import urllib3.util.retry
+
+# status codes GCS asks to retry, per its retry strategy.
+GCS_RETRY_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+# timeout of AuthorizedSession.request calls made without one.
+GCS_DEFAULT_TIMEOUT = 120
+
+_shared_clients = {}
+_shared_clients_lock = threading.Lock()
+
+
+def create_s3_client(max_pool_connections=None, connect_timeout=None,
+                     read_timeout=None, retry_mode=None, max_attempts=None,
+                     tcp_keepalive=None, session=None, **client_kwargs):
+    """Return a new boto3 S3 client
+
+    Options left None keep botocore defaults.
+
+    Kwargs:
+        max_pool_connections(int): Max pooled connections(botocore: 10)
+        connect_timeout(float): Seconds to wait for a connection
+        read_timeout(float): Seconds to wait for data
+        retry_mode(str): 'legacy', 'standard' or 'adaptive'
+        max_attempts(int): Max attempts of a request, including the first
+        tcp_keepalive(bool): True to enable TCP keep-alive
+        session(boto3.session.Session): Session to create the client from.
+            A new one by default, as the default session isn't thread-safe
+        **client_kwargs: Passed to ``session.client``. e.g. endpoint_url
+    Returns:
+        botocore.client.S3
+    """
+    config_kwargs = {
+        name: value for name, value in (
+            ('max_pool_connections', max_pool_connections),
+            ('connect_timeout', connect_timeout),
+            ('read_timeout', read_timeout),
+            ('tcp_keepalive', tcp_keepalive),
+        ) if value is not None
+    }
+    retries = {}
+    if retry_mode is not None:
+        retries['mode'] = retry_mode
+    if max_attempts is not None:
+        retries['total_max_attempts'] = max_attempts
+    if retries:
+        config_kwargs['retries'] = retries
+
+    if session is None:
+        session = boto3.session.Session()
+    return session.client(
+        's3', config=botocore.config.Config(**config_kwargs), **client_kwargs)
+
+
+def create_gcs_client(max_pool_connections=None, connect_timeout=None,
+                      read_timeout=None, retry_mode=None, max_attempts=None,
+                      tcp_keepalive=None, session=None, project=None,
+                      credentials=None, **client_kwargs):
+    """Return a new google.cloud.storage.Client
+
+    Options left None keep library defaults. Unless a session is given, any
+    option set builds a ``PooledSession`` for the client.
+
+    Kwargs:
+        max_pool_connections(int): Max pooled connections per host(requests: 10)
+        connect_timeout(float): Seconds to wait for a connection
+        read_timeout(float): Seconds to wait for data
+        retry_mode(str): Ignored. The library retries API calls itself
+        max_attempts(int): Max attempts of a request on connection errors
+            and retryable statuses, including the first
+        tcp_keepalive(bool): True to enable TCP keep-alive
+        session(requests.Session): Authorized session to send requests with,
+            e.g. a google.auth.transport.requests.AuthorizedSession
+        project(str): Project of the client
+        credentials: google.auth credentials. Defaults to the environment's
+        **client_kwargs: Passed to ``Client``. e.g. client_options
+    Returns:
+        google.cloud.storage.Client
+    """
+    options = (max_pool_connections, connect_timeout, read_timeout,
+               max_attempts, tcp_keepalive)
+    if session is None and any(x is not None for x in options):
+        if credentials is None:
+            credentials, default_project = google.auth.default(
+                scopes=google.cloud.storage.Client.SCOPE)
+            project = project or default_project
+        session = PooledSession(
+            credentials, max_pool_connections=max_pool_connections,
+            connect_timeout=connect_timeout, read_timeout=read_timeout,
+            max_attempts=max_attempts, tcp_keepalive=tcp_keepalive,
+        )
+
+    if project is not None:
+        client_kwargs['project'] = project
+    return google.cloud.storage.Client(
+        credentials=credentials, _http=session, **client_kwargs)
+
+
+class PooledSession(google.auth.transport.requests.AuthorizedSession):
+    """Authorized session with a configurable connection pool
+
+    Args:
+        credentials: google.auth credentials
+    Kwargs:
+        max_pool_connections(int): Max pooled connections per host
+        connect_timeout(float): Seconds to wait for a connection. Overrides
+            the library's per call timeouts
+        read_timeout(float): Seconds to wait for data. Overrides the
+            library's per call timeouts
+        max_attempts(int): Max attempts of a request, including the first
+        tcp_keepalive(bool): True to enable TCP keep-alive
+    """
+
+    def __init__(self, credentials, max_pool_connections=None, connect_timeout=None,
+                 read_timeout=None, max_attempts=None, tcp_keepalive=None):
+        super().__init__(credentials)
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+        adapter_kwargs = {}
+        if max_pool_connections is not None:
+            adapter_kwargs['pool_connections'] = max_pool_connections
+            adapter_kwargs['pool_maxsize'] = max_pool_connections
+        if max_attempts is not None:
+            adapter_kwargs['max_retries'] = urllib3.util.retry.Retry(
+                total=max_attempts - 1, backoff_factor=0.5,
+                status_forcelist=GCS_RETRY_STATUS_CODES, raise_on_status=False,
+            )
+        socket_options = None
+        if tcp_keepalive:
+            socket_options = urllib3.connection.HTTPConnection.default_socket_options + [
+                (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+            ]
+        self.mount('https://', _SocketOptionsAdapter(socket_options, **adapter_kwargs))
+
+    def request(self, method, url, *args, **kwargs):
+        if self.connect_timeout is not None or self.read_timeout is not None:
+            timeout = kwargs.get('timeout', GCS_DEFAULT_TIMEOUT)
+            if not isinstance(timeout, tuple):
+                timeout = (timeout, timeout)
+            kwargs['timeout'] = (
+                timeout[0] if self.connect_timeout is None else self.connect_timeout,
+                timeout[1] if self.read_timeout is None else self.read_timeout,
+            )
+        return super().request(method, url, *args, **kwargs)
+
+
+class _SocketOptionsAdapter(requests.adapters.HTTPAdapter):
+
+    def __init__(self, socket_options=None, **kwargs):
+        self.socket_options = socket_options
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.socket_options is not None:
+            kwargs['socket_options'] = self.socket_options
+        super().init_poolmanager(*args, **kwargs)
+
+
+def get_shared_client(factory, **options):
+    """Return the registered SDK client created by ``factory(**options)``
+
+    The first call creates and registers it. Later calls with the same
+    factory and options, from any thread, get the same client.
+
+    Args:
+        factory(callable): e.g. create_s3_client
+    Kwargs:
+        **options: Passed to factory. Values must be hashable
+    """
+    key = (factory, tuple(sorted(options.items())))
+    with _shared_clients_lock:
+        client = _shared_clients.get(key)
+        if client is None:
+            client = factory(**options)
+            _shared_clients[key] = client
+        return client
+
+
+def clear_shared_clients():
+    """Forget registered clients, e.g. in a child process after fork"""
+    with _shared_clients_lock:
+        _shared_clients.clear()
+
+
+__all__ = (
+    'clear_shared_clients',
+    'create_gcs_client',
+    'create_s3_client',
+    'get_shared_client',
+)
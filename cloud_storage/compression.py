@@ -0,0 +1,412 @@
+"""
+:since: 2026-10-18
+
+Content codecs: gzip, and zstd and lz4 when ``zstandard`` and ``lz4`` are
+installed. Content encoding of compressed objects names their codec.
+"""
+import collections
+import concurrent.futures
+import os
+import struct
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # optional, for zstd
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:  # optional, for lz4
+    lz4 = None
+
+from cloud_storage.enums import Compression
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+DEFAULT_GZIP_LEVEL = 6
+DEFAULT_GZIP_BLOCK_SIZE = 1024 * 1024
+DEFAULT_ZSTD_LEVEL = 3
+DEFAULT_LZ4_LEVEL = 0
+
+# 16 + MAX_WBITS makes zlib expect a gzip header and trailer.
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+# Members of block gzip streams carry their own size in an extra subfield,
+# as BGZF does, so readers can find members without inflating them. The
+# subfield is 4 bytes, as members may be larger than BGZF's 64 KB.
+GZIP_MEMBER_SUBFIELD_ID = b'CS'
+GZIP_MEMBER_HEADER = struct.Struct('<BBBBIBBH2sHI')
+GZIP_MEMBER_TRAILER = struct.Struct('<II')
+GZIP_FLAG_EXTRA = 4
+GZIP_OS_UNKNOWN = 255
+
+# leading bytes of content of each codec.
+CODEC_MAGIC = {
+    Compression.GZIP: b'\x1f\x8b',
+    Compression.ZSTD: b'\x28\xb5\x2f\xfd',
+    Compression.LZ4: b'\x04\x22\x4d\x18',
+}
+CODEC_MAGIC_SIZE = max(len(x) for x in CODEC_MAGIC.values())
+
+
+def get_codec(content_encoding, default=None):
+    """Return the Compression decoding content of an encoding
+
+    Args:
+        content_encoding(str): e.g. 'gzip'. None or '' if not encoded
+    Kwargs:
+        default(Compression): Returned if the encoding isn't a codec
+    Returns:
+        Compression
+    """
+    try:
+        return Compression(content_encoding)
+    except ValueError:
+        return default
+
+
+def guess_codec(head):
+    """Return the Compression content starting with ``head`` looks encoded with
+
+    Args:
+        head(bytes): At least CODEC_MAGIC_SIZE leading bytes of content
+    Returns:
+        Compression. None if it doesn't look compressed
+    """
+    for codec, magic in CODEC_MAGIC.items():
+        if head.startswith(magic):
+            return codec
+    return None
+
+
+def iter_compress(chunks, compression, level=None, max_workers=None):
+    """Compress an iterable of chunks incrementally
+
+    gzip content is compressed by ``iter_gzip_blocks``, on threads; zstd by
+    zstandard's own threads.
+
+    Args:
+        chunks(iterable): bytes chunks
+        compression(str): 'gzip', 'zstd' or 'lz4'
+    Kwargs:
+        level(int): Compression level. Defaults to the codec's
+        max_workers(int): Max threads. Defaults to the number of CPUs
+    Yields:
+        bytes. Compressed content
+    """
+    compression = Compression(compression)
+    if compression == Compression.GZIP:
+        return iter_gzip_blocks(
+            chunks, DEFAULT_GZIP_LEVEL if level is None else level,
+            max_workers=max_workers)
+    return _iter_compressobj(chunks, _new_compressor(compression, level, max_workers))
+
+
+def compress(data, compression, level=None, max_workers=None):
+    """Compress bytes. See ``iter_compress``"""
+    return b''.join(iter_compress([data], compression, level, max_workers))
+
+
+def _new_compressor(compression, level, max_workers):
+    if compression == Compression.ZSTD:
+        _require(zstandard, 'zstandard', compression)
+        return zstandard.ZstdCompressor(
+            level=DEFAULT_ZSTD_LEVEL if level is None else level,
+            threads=-1 if max_workers is None else max_workers,
+        ).compressobj()
+    _require(lz4, 'lz4', compression)
+    compressor = lz4.frame.LZ4FrameCompressor(
+        compression_level=DEFAULT_LZ4_LEVEL if level is None else level)
+    # the frame header comes first.
+    compressor.pending = compressor.begin()
+    return compressor
+
+
+def _iter_compressobj(chunks, compressor):
+    pending = getattr(compressor, 'pending', None)
+    if pending:
+        yield pending
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _require(module, package, compression):
+    if module is None:
+        raise ImportError('%s compression needs %s installed' % (compression, package))
+
+
+def iter_gunzip(chunks, max_length=DEFAULT_CHUNK_SIZE):
+    """Gunzip an iterable of gzipped chunks incrementally
+
+    Concatenated gzip members are decoded back to back, as ``gzip.GzipFile``
+    does. Each yielded piece is at most ``max_length`` bytes, so memory stays
+    bounded whatever the compression ratio is.
+
+    Args:
+        chunks(iterable): bytes chunks of a gzip stream
+    Kwargs:
+        max_length(int): Max size of each decompressed piece
+    Yields:
+        bytes. Decompressed content
+    Raises:
+        EOFError: the stream ended in the middle of a gzip member
+        zlib.error: the stream is not valid gzip
+    """
+    return iter_decompress(chunks, Compression.GZIP, max_length)
+
+
+def iter_decompress(chunks, compression, max_length=DEFAULT_CHUNK_SIZE):
+    """Decompress an iterable of compressed chunks incrementally
+
+    Args:
+        chunks(iterable): bytes chunks
+        compression(str): 'gzip', 'zstd' or 'lz4'
+    Kwargs:
+        max_length(int): Max size of each decompressed piece, where the
+            codec allows
+    Yields:
+        bytes. Decompressed content
+    Raises:
+        EOFError: the stream ended in the middle of a frame or member
+    """
+    decoder = Decoder(compression, max_length)
+    for chunk in chunks:
+        for data in decoder.decode(chunk):
+            yield data
+    decoder.finish()
+
+
+class Decoder(object):
+    """Incremental decoder of compressed content pushed chunk by chunk
+
+    Concatenated gzip members and zstd or lz4 frames are decoded back to
+    back.
+
+    Args:
+        compression(str): 'gzip', 'zstd' or 'lz4'
+    Kwargs:
+        max_length(int): Max size of each decompressed piece, where the
+            codec allows
+    """
+
+    def __init__(self, compression, max_length=DEFAULT_CHUNK_SIZE):
+        self.compression = Compression(compression)
+        self.max_length = max_length
+        if self.compression == Compression.ZSTD:
+            _require(zstandard, 'zstandard', self.compression)
+        elif self.compression == Compression.LZ4:
+            _require(lz4, 'lz4', self.compression)
+        self._decompressor = self._new_decompressor()
+        self._started = False
+
+    def _new_decompressor(self):
+        if self.compression == Compression.GZIP:
+            return zlib.decompressobj(GZIP_WBITS)
+        if self.compression == Compression.ZSTD:
+            return zstandard.ZstdDecompressor().decompressobj()
+        return lz4.frame.LZ4FrameDecompressor()
+
+    def decode(self, chunk):
+        """
+        Yields:
+            bytes. Decompressed content of chunk, as far as it goes
+        """
+        if self.compression == Compression.GZIP:
+            return self._decode_gzip(chunk)
+        return self._decode_frames(chunk)
+
+    def _decode_gzip(self, chunk):
+        while chunk:
+            if self._decompressor.eof:
+                self._decompressor = self._new_decompressor()
+            self._started = True
+            decompressor = self._decompressor
+            data = decompressor.decompress(chunk, self.max_length)
+            while data:
+                yield data
+                if decompressor.eof or decompressor.unconsumed_tail:
+                    break
+                # input is consumed, but zlib may still hold pending output.
+                data = decompressor.decompress(b'', self.max_length)
+
+            if decompressor.eof:
+                chunk = decompressor.unused_data
+            else:
+                chunk = decompressor.unconsumed_tail
+
+    def _decode_frames(self, chunk):
+        while chunk:
+            if self._decompressor.eof:
+                self._decompressor = self._new_decompressor()
+            self._started = True
+            data = self._decompressor.decompress(chunk)
+            if data:
+                yield data
+            chunk = self._decompressor.unused_data if self._decompressor.eof else b''
+
+    def finish(self):
+        """
+        Raises:
+            EOFError: content ended in the middle of a frame or member
+        """
+        if self._started and not self._decompressor.eof:
+            raise EOFError(
+                'Compressed stream ended before the end-of-stream marker was reached')
+
+
+def iter_gzip(chunks, level=DEFAULT_GZIP_LEVEL):
+    """Gzip an iterable of chunks incrementally
+
+    Args:
+        chunks(iterable): bytes chunks
+    Kwargs:
+        level(int): Compression level, 1 (fastest) to 9 (smallest)
+    Yields:
+        bytes. Chunks of one gzip stream
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def iter_gzip_blocks(chunks, level=DEFAULT_GZIP_LEVEL, block_size=DEFAULT_GZIP_BLOCK_SIZE,
+                     max_workers=None):
+    """Gzip an iterable of chunks as independent blocks, on threads
+
+    Each block of ``block_size`` bytes is compressed into its own gzip member,
+    as pigz and bgzip do, and zlib releases the GIL while compressing, so
+    blocks compress in parallel. Concatenated members are one valid gzip
+    stream. Members record their size, so they can be inflated in parallel
+    too.
+
+    Args:
+        chunks(iterable): bytes chunks
+    Kwargs:
+        level(int): Compression level, 1 (fastest) to 9 (smallest)
+        block_size(int): Uncompressed bytes per member
+        max_workers(int): Max threads. Defaults to the number of CPUs
+    Yields:
+        bytes. gzip members, in order
+    """
+    blocks = _iter_blocks(chunks, block_size)
+    first = next(blocks, b'')
+    second = next(blocks, None)
+    if second is None:
+        # no threads for content of one block.
+        yield gzip_member(first, level)
+        return
+
+    max_workers = max_workers or os.cpu_count() or 1
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+        pending = collections.deque(
+            executor.submit(gzip_member, x, level) for x in (first, second))
+        for block in blocks:
+            # a few blocks ahead of the consumer, to bound memory.
+            if len(pending) >= max_workers * 2:
+                yield pending.popleft().result()
+            pending.append(executor.submit(gzip_member, block, level))
+        while pending:
+            yield pending.popleft().result()
+
+
+def gzip_member(data, level=DEFAULT_GZIP_LEVEL):
+    """Return a gzip member of data, recording its own size
+
+    Returns:
+        bytes
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    body = compressor.compress(data) + compressor.flush()
+    member_size = GZIP_MEMBER_HEADER.size + len(body) + GZIP_MEMBER_TRAILER.size
+    header = GZIP_MEMBER_HEADER.pack(
+        0x1f, 0x8b, zlib.DEFLATED, GZIP_FLAG_EXTRA, 0, 0, GZIP_OS_UNKNOWN,
+        GZIP_MEMBER_HEADER.size - 12, GZIP_MEMBER_SUBFIELD_ID, 4, member_size,
+    )
+    trailer = GZIP_MEMBER_TRAILER.pack(zlib.crc32(data), len(data) & 0xffffffff)
+    return b''.join((header, body, trailer))
+
+
+def _iter_blocks(chunks, block_size):
+    """Regroup chunks into blocks of block_size bytes, the last one shorter"""
+    buffer = bytearray()
+    for chunk in chunks:
+        view = memoryview(chunk)
+        if buffer:
+            taken = block_size - len(buffer)
+            buffer += view[:taken]
+            view = view[taken:]
+            if len(buffer) < block_size:
+                continue
+            yield bytes(buffer)
+            buffer = bytearray()
+        while len(view) >= block_size:
+            yield bytes(view[:block_size])
+            view = view[block_size:]
+        buffer += view
+    if buffer:
+        yield bytes(buffer)
+
+
+def gunzip_to_bytearray(chunks):
+    """Gunzip an iterable of gzipped chunks into one bytearray
+
+    Args:
+        chunks(iterable): bytes chunks of a gzip stream
+    Returns:
+        bytearray. Decompressed content
+    """
+    return decompress_to_bytearray(chunks, Compression.GZIP)
+
+
+def decompress_to_bytearray(chunks, compression):
+    """Decompress an iterable of compressed chunks into one bytearray
+
+    Args:
+        chunks(iterable): bytes chunks
+        compression(str): 'gzip', 'zstd' or 'lz4'
+    Returns:
+        bytearray. Decompressed content
+    """
+    buffer = bytearray()
+    for data in iter_decompress(chunks, compression):
+        buffer += data
+    return buffer
+
+
+def read_to_bytearray(chunks, size):
+    """Read an iterable of chunks into a bytearray preallocated to ``size``
+
+    The buffer still grows or shrinks if the chunks don't add up to ``size``.
+
+    Args:
+        chunks(iterable): bytes chunks
+        size(int): Expected total size, e.g. Content-Length
+    Returns:
+        bytearray. Content
+    """
+    chunks = iter(chunks)
+    buffer = bytearray(size)
+    position = 0
+    overflow = None
+    with memoryview(buffer) as view:
+        for chunk in chunks:
+            end = position + len(chunk)
+            if end > size:
+                overflow = chunk
+                break
+            view[position:end] = chunk
+            position = end
+
+    del buffer[position:]
+    if overflow is not None:
+        # more content than expected; grow the buffer with the rest.
+        buffer += overflow
+        for chunk in chunks:
+            buffer += chunk
+    return buffer
@@ -10,3 +10,14 @@ class CloudStorageType(StringEnum):
     GCS = "gcs"
     LOCAL = "local"
     S3 = "s3"
+
+
+class LocalStorageLayout(StringEnum):
+    FLAT = "flat"
+    SHARDED = "sharded"
+
+
+class Compression(StringEnum):
+    GZIP = "gzip"
+    LZ4 = "lz4"
+    ZSTD = "zstd"
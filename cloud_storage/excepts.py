@@ -26,6 +26,10 @@ class CloudStorageServerErrorException(Exception):
     pass
 
 
+class CloudStorageTooManyRequestsException(Exception):
+    pass
+
+
 class CloudStorageUnknownErrorException(Exception):
     pass
 
@@ -35,5 +39,6 @@ __all__ = (
     'CloudStorageInvalidArgumentTypeException',
     'CloudStorageNotFoundException',
     'CloudStorageServerErrorException',
+    'CloudStorageTooManyRequestsException',
     'CloudStorageUnknownErrorException',
 )
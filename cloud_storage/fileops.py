@@ -0,0 +1,125 @@
+"""
+:since: 2026-10-18
+
+File copies done by the kernel where the platform allows.
+"""
+import errno
+import os
+import sys
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# ioctl cloning a whole file, from linux/fs.h.
+FICLONE = 0x40049409
+# bytes per copy_file_range or sendfile call. Large, but below the 2 GB limit.
+KERNEL_COPY_CHUNK_SIZE = 1024 * 1024 * 1024
+READ_COPY_CHUNK_SIZE = 1024 * 1024
+
+# errors telling a copy method doesn't work for these files.
+_UNSUPPORTED_ERRNOS = frozenset(
+    getattr(errno, name) for name in (
+        'EBADF', 'EINVAL', 'ENOSYS', 'ENOTSUP', 'EOPNOTSUPP', 'EXDEV', 'ENOTSOCK')
+    if hasattr(errno, name)
+)
+
+
+def copy_fd(src_fd, dst_fd):
+    """Copy the content of a file to an empty file
+
+    Tries, in order, a reflink (copy-on-write clone), ``os.copy_file_range``
+    and ``os.sendfile``, which keep content in the kernel, then falls back to
+    reading and writing.
+
+    Args:
+        src_fd(int): File descriptor open for reading
+        dst_fd(int): File descriptor open for writing, of an empty file
+    Returns:
+        str. Method used: 'reflink', 'copy_file_range', 'sendfile' or 'read'
+    """
+    if _reflink(src_fd, dst_fd):
+        return 'reflink'
+
+    size = os.fstat(src_fd).st_size
+    for name, copy in (('copy_file_range', _copy_file_range), ('sendfile', _sendfile)):
+        try:
+            if copy(src_fd, dst_fd, size):
+                return name
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED_ERRNOS:
+                raise
+        # ranges are copied at explicit offsets, so the next method can
+        # start over whatever was copied.
+
+    _read_copy(src_fd, dst_fd)
+    return 'read'
+
+
+def copy_file(source_file_name, destination_file_name):
+    """Copy a file, creating or truncating the destination
+
+    Returns:
+        str. Method used. See ``copy_fd``
+    """
+    src_fd = os.open(source_file_name, os.O_RDONLY)
+    try:
+        dst_fd = os.open(
+            destination_file_name, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+        try:
+            return copy_fd(src_fd, dst_fd)
+        finally:
+            os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+
+
+def _reflink(src_fd, dst_fd):
+    if fcntl is None or not sys.platform.startswith('linux'):
+        return False
+    try:
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+    except OSError:
+        return False
+    return True
+
+
+def _copy_file_range(src_fd, dst_fd, size):
+    if not hasattr(os, 'copy_file_range'):
+        return False
+    offset = 0
+    while offset < size:
+        copied = os.copy_file_range(
+            src_fd, dst_fd, min(size - offset, KERNEL_COPY_CHUNK_SIZE), offset, offset)
+        if not copied:
+            break
+        offset += copied
+    return True
+
+
+def _sendfile(src_fd, dst_fd, size):
+    # sendfile writes files only on Linux.
+    if not hasattr(os, 'sendfile') or not sys.platform.startswith('linux'):
+        return False
+    os.lseek(dst_fd, 0, os.SEEK_SET)
+    offset = 0
+    while offset < size:
+        sent = os.sendfile(dst_fd, src_fd, offset, min(size - offset, KERNEL_COPY_CHUNK_SIZE))
+        if not sent:
+            break
+        offset += sent
+    return True
+
+
+def _read_copy(src_fd, dst_fd):
+    offset = 0
+    while True:
+        data = os.pread(src_fd, READ_COPY_CHUNK_SIZE, offset)
+        if not data:
+            return
+        view = memoryview(data)
+        while view:
+            written = os.pwrite(dst_fd, view, offset)
+            view = view[written:]
+            offset += written
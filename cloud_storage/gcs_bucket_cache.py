@@ -0,0 +1,119 @@
+"""
+:since: 2026-10-18
+
+Process-wide cache of GCS bucket handles.
+"""
+import concurrent.futures
+import threading
+import time
+import weakref
+
+import google.api_core.exceptions
+
+DEFAULT_BUCKET_NEGATIVE_TTL = 10
+
+
+class BucketCache(object):
+    """Thread-safe cache of ``Client.get_bucket`` results
+
+    Whether buckets exist is kept per client, for as long as the client
+    lives, and hits return a new handle from ``Client.bucket``: handles
+    reference their client, so caching them would keep the client alive.
+    Concurrent misses of one bucket share a single ``get_bucket`` call.
+    Buckets found missing are remembered for ``negative_ttl`` seconds, and
+    other errors aren't cached.
+
+    Kwargs:
+        ttl(float): Seconds a bucket stays cached. None to keep it
+        negative_ttl(float): Seconds a missing bucket stays cached
+    """
+
+    def __init__(self, ttl=None, negative_ttl=DEFAULT_BUCKET_NEGATIVE_TTL):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        # client to {bucket_name: (expires_at, not_found_message)}. message
+        # is None for existing buckets.
+        self._entries = weakref.WeakKeyDictionary()
+        # (client id, bucket_name) to Future of the get_bucket call in flight
+        self._loading = {}
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        """Return cache counters
+
+        Returns:
+            dict. hits and misses
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+    def get(self, client, bucket_name):
+        """Return the bucket. Only a miss loads its metadata
+
+        Raises:
+            google.api_core.exceptions.NotFound: the bucket doesn't exist
+        """
+        key = (id(client), bucket_name)
+        with self._lock:
+            entry = self._entries.setdefault(client, {}).get(bucket_name)
+            if entry is not None and (entry[0] is None or entry[0] > time.monotonic()):
+                self.hits += 1
+                not_found_message = entry[1]
+                if not_found_message is not None:
+                    raise google.api_core.exceptions.NotFound(not_found_message)
+                return client.bucket(bucket_name)
+
+            self.misses += 1
+            future = self._loading.get(key)
+            loading = future is None
+            if loading:
+                future = concurrent.futures.Future()
+                self._loading[key] = future
+
+        if not loading:
+            future.result()
+            return client.bucket(bucket_name)
+
+        try:
+            bucket = client.get_bucket(bucket_name)
+        except google.api_core.exceptions.NotFound as e:
+            if self.negative_ttl > 0:
+                self._set(client, bucket_name, self.negative_ttl, str(e))
+            future.set_exception(e)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            self._set(client, bucket_name, self.ttl, None)
+            # waiters build their own handle.
+            future.set_result(None)
+            return bucket
+        finally:
+            with self._lock:
+                del self._loading[key]
+
+    def invalidate(self, client, bucket_name):
+        """Forget a bucket, e.g. after it's created or deleted"""
+        with self._lock:
+            self._entries.get(client, {}).pop(bucket_name, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _set(self, client, bucket_name, ttl, not_found_message):
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._entries.setdefault(client, {})[bucket_name] = (
+                expires_at, not_found_message)
+
+
+# shared by GoogleCloudStorage instances, unless given another one.
+DEFAULT_BUCKET_CACHE = BucketCache()
+
+__all__ = (
+    'BucketCache',
+)
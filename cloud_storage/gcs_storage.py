@@ -2,21 +2,70 @@
 :author: Henley Kuang
 :since: 06/12/2019
 """
+import base64
 import logging
 import os
+import uuid
 
 import google.api_core.exceptions
-import google.cloud.storage
 
-from google import resumable_media
+from http import HTTPStatus
 
+from cloud_storage.base import (
+    DEFAULT_BATCH_MAX_WORKERS,
+    STORAGE_EXCEPTIONS,
+    BaseStorage,
+    run_many,
+)
+from cloud_storage.clients import create_gcs_client, get_shared_client
+from cloud_storage.compression import (
+    CODEC_MAGIC_SIZE,
+    Decoder,
+    compress,
+    decompress_to_bytearray,
+    get_codec,
+    guess_codec,
+    iter_compress,
+)
+from cloud_storage.enums import Compression
 from cloud_storage.excepts import (
     CloudStorageBadRequestException,
     CloudStorageInvalidArgumentTypeException,
     CloudStorageNotFoundException,
     CloudStorageServerErrorException,
+    CloudStorageTooManyRequestsException,
     CloudStorageUnknownErrorException,
 )
+from cloud_storage.gcs_bucket_cache import DEFAULT_BUCKET_CACHE
+from cloud_storage.instrumentation import (
+    buffer_size,
+    counted_bytes_sent,
+    destination_file_size,
+    instrumented,
+    report_bytes_sent,
+    result_size,
+    source_file_size,
+)
+from cloud_storage.memory_cache import (
+    invalidates_memory_cache,
+    invalidates_memory_cache_copied,
+    invalidates_memory_cache_many,
+    invalidates_memory_cache_renamed,
+    memory_cached_content,
+    memory_cached_exists,
+    object_token,
+)
+from cloud_storage.models import BatchItemResult, ObjectInfo
+from cloud_storage.parallel import (
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_MULTIPART_THRESHOLD,
+    DEFAULT_PART_SIZE,
+    download_ranges_to_file,
+    iter_prefetched,
+    upload_file_parts,
+)
+from cloud_storage.retry import retried, retried_hedged
+from cloud_storage.streams import IterableReader, RangedReader, iter_chunks
 
 
 """
@@ -30,41 +79,243 @@ https://github.com/googleapis/google-cloud-python/blob/master/storage/google/clo
 
 LOGGER = logging.getLogger(__name__)
 
+# Max number of calls GCS accepts in one batch request.
+BATCH_MAX_CALLS = 100
+# Max number of source objects of one compose request.
+COMPOSE_MAX_SOURCES = 32
+RESUMABLE_CHUNK_UNIT = 256 * 1024
+
+
+class _BytearrayWriter(object):
+    """Minimal writable file-like object collecting content into a bytearray
+
+    ``io.BytesIO.getvalue()`` copies its buffer, this one hands it over.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer += data
+        return len(data)
+
+
+class _DecodingWriter(object):
+    """Writable file-like object decoding content into another one"""
+
+    def __init__(self, file_obj, codec):
+        self.file_obj = file_obj
+        self.decoder = Decoder(codec)
+
+    def write(self, data):
+        for piece in self.decoder.decode(data):
+            self.file_obj.write(piece)
+        return len(data)
+
+    def finish(self):
+        self.decoder.finish()
+
+
+class _GuessingDecodingWriter(object):
+    """Writable file-like object collecting content into a bytearray,
+    decoding it on the fly if it starts like compressed content
+
+    Downloads report the content encoding only once they are over, so the
+    codec is guessed from the leading bytes. Callers check ``codec`` against
+    the encoding; ``failed`` is set if the content didn't decode.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.codec = None
+        self.failed = False
+        # leading bytes, until the codec is guessed.
+        self._head = bytearray()
+        self._decoder = None
+
+    def write(self, data):
+        size = len(data)
+        if self._head is not None:
+            self._head += data
+            if len(self._head) < CODEC_MAGIC_SIZE:
+                return size
+            data, self._head = self._head, None
+            self._start(data)
+        self._feed(data)
+        return size
+
+    def finish(self):
+        if self._head is not None:
+            # too short to be compressed.
+            self.buffer, self._head = self._head, None
+        elif self._decoder is not None and not self.failed:
+            try:
+                self._decoder.finish()
+            except EOFError:
+                self._fail()
+
+    def _start(self, head):
+        codec = guess_codec(head)
+        if codec is None:
+            return
+        try:
+            self._decoder = Decoder(codec)
+        except ImportError:
+            # collected as is, and decoded by the caller if it can be.
+            return
+        self.codec = codec
+
+    def _feed(self, data):
+        if self.failed:
+            return
+        if self._decoder is None:
+            self.buffer += data
+            return
+        try:
+            for piece in self._decoder.decode(data):
+                self.buffer += piece
+        except Exception:
+            self._fail()
+
+    def _fail(self):
+        self.failed = True
+        self.buffer = bytearray()
+
+
+def _blob_md5(blob):
+    """Return hex MD5 of blob content, or None for composite objects"""
+    if not blob.md5_hash:
+        return None
+    return base64.b64decode(blob.md5_hash).hex()
+
+
+def _blob_info(blob):
+    return ObjectInfo(
+        object_key=blob.name,
+        size=blob.size,
+        etag=blob.etag,
+        md5=_blob_md5(blob),
+        updated=blob.updated,
+        content_type=blob.content_type,
+        content_encoding=blob.content_encoding,
+    )
+
 
 def gcs_api_exception_handler(f):
     def decorate(*args, **kwargs):
         try:
             return f(*args, **kwargs)
-        except google.api_core.exceptions.BadRequest as e:
-            raise CloudStorageBadRequestException(str(e))
-        except (
-            google.api_core.exceptions.InternalServerError,
-            google.api_core.exceptions.ServerError,
-            google.api_core.exceptions.ServiceUnavailable,
-        ) as e:
-            raise CloudStorageServerErrorException(str(e))
-        except google.api_core.exceptions.NotFound as e:
-            raise CloudStorageNotFoundException(str(e))
-        except AssertionError as e:
-            raise CloudStorageInvalidArgumentTypeException(str(e)) from e
+        except STORAGE_EXCEPTIONS:
+            # already handled by a nested call.
+            raise
         except Exception as e:
-            raise CloudStorageUnknownErrorException(str(e)) from e
+            raise _to_storage_exception(e) from e
 
     return decorate
 
 
-class GoogleCloudStorage(object):
-    def __init__(self):
-        self.storage_client = google.cloud.storage.Client()
-        self._buckets = {}
+def _to_storage_exception(e):
+    """Map an exception of google-cloud-storage to one of ``cloud_storage.excepts``"""
+    if isinstance(e, google.api_core.exceptions.BadRequest):
+        return CloudStorageBadRequestException(str(e))
+    if isinstance(e, (
+        google.api_core.exceptions.InternalServerError,
+        google.api_core.exceptions.ServerError,
+        google.api_core.exceptions.ServiceUnavailable,
+    )):
+        return CloudStorageServerErrorException(str(e))
+    if isinstance(e, google.api_core.exceptions.NotFound):
+        return CloudStorageNotFoundException(str(e))
+    if isinstance(e, google.api_core.exceptions.TooManyRequests):
+        return CloudStorageTooManyRequestsException(str(e))
+    if isinstance(e, AssertionError):
+        return CloudStorageInvalidArgumentTypeException(str(e))
+    return CloudStorageUnknownErrorException(str(e))
+
+
+class GoogleCloudStorage(BaseStorage):
+    def __init__(self, storage_client=None,
+                 multipart_threshold=DEFAULT_MULTIPART_THRESHOLD,
+                 part_size=DEFAULT_PART_SIZE,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 memory_cache=None, shared_client=False, bucket_cache=None,
+                 load_buckets=True, retry_policy=None, instrumentation=None,
+                 **client_options):
+        """
+        Kwargs:
+            storage_client: google.cloud.storage.Client to use instead of
+                a new default one
+            multipart_threshold(int): Objects of this size or larger are
+                transferred in parts
+            part_size(int): Size of each part
+            max_concurrency(int): Max concurrent part requests per transfer
+            memory_cache(MemoryCache): Cache of existence checks and small
+                contents, can be shared by clients. Clients share its
+                entries when they share storage_client
+            shared_client(bool): True to reuse the process-wide client with the
+                same client_options, instead of creating one(default: False)
+            bucket_cache(BucketCache): Cache of bucket handles. Defaults to
+                the process-wide one
+            load_buckets(bool): False to build bucket handles without
+                requesting bucket metadata. A missing bucket is then reported
+                by the first object call(default: True)
+            retry_policy(RetryPolicy): Retries and hedging of calls failing
+                with transient errors, can be shared by clients
+            instrumentation(Instrumentation): Receives metrics of every call
+            **client_options: Options of a new client, passed to
+                ``cloud_storage.clients.create_gcs_client``. e.g. max_pool_connections,
+                connect_timeout, read_timeout, retry_mode, max_attempts,
+                tcp_keepalive, session
+        """
+        if storage_client is None:
+            if shared_client:
+                storage_client = get_shared_client(create_gcs_client, **client_options)
+            else:
+                storage_client = create_gcs_client(**client_options)
+        else:
+            assert not client_options, "client_options need storage_client to be None"
+        self.storage_client = storage_client
+        self.multipart_threshold = multipart_threshold
+        self.part_size = part_size
+        self.max_concurrency = max_concurrency
+        self.memory_cache = memory_cache
+        self.bucket_cache = DEFAULT_BUCKET_CACHE if bucket_cache is None else bucket_cache
+        self.load_buckets = load_buckets
+        self.retry_policy = retry_policy
+        self.instrumentation = instrumentation
+
+    def _to_storage_exception(self, e):
+        if isinstance(e, STORAGE_EXCEPTIONS):
+            return e
+        return _to_storage_exception(e)
+
+    def _memory_cache_namespace(self):
+        return type(self).__name__, object_token(self.storage_client)
 
     def _get_bucket(self, bucket_name):
-        try:
-            return self._buckets[bucket_name]
-        except KeyError:
-            self._buckets[bucket_name] = self.storage_client.get_bucket(bucket_name)
-            return self._buckets[bucket_name]
-
+        if not self.load_buckets:
+            # no request; object calls work on a bare handle.
+            return self.storage_client.bucket(bucket_name)
+        return self.bucket_cache.get(self.storage_client, bucket_name)
+
+    def _get_existing_blob(self, bucket, object_key):
+        """Return blob with metadata loaded, raising NotFound if missing"""
+        blob = bucket.get_blob(object_key)
+        if blob is None:
+            raise google.api_core.exceptions.NotFound(
+                '%s/%s is not found' % (bucket.name, object_key))
+        return blob
+
+    @retried
+    def _download_range(self, bucket, object_key, generation, start, end):
+        # one blob per range; downloads update blob properties.
+        blob = bucket.blob(object_key, generation=generation)
+        # download_as_string is deprecated since 1.32 in favor of download_as_bytes.
+        download = getattr(blob, 'download_as_bytes', None) or blob.download_as_string
+        return download(start=start, end=end, raw_download=True)
+
+    @instrumented
+    @retried
     def list_bucket_names(self):
         """Get the list of buckets in GCS
         Returns:
@@ -75,8 +326,10 @@ class GoogleCloudStorage(object):
         >>> GoogleCloudStorage().list_bucket_names()
         ["bucket1", "bucket2"]
         """
-        return list(self.storage_client.list_buckets())
+        return [bucket.name for bucket in self.storage_client.list_buckets()]
 
+    @instrumented(bytes_sent=source_file_size)
+    @invalidates_memory_cache
     @gcs_api_exception_handler
     def upload_file(
         self,
@@ -85,9 +338,17 @@ class GoogleCloudStorage(object):
         source_file_name,
         content_type=None,
         content_encoding=None,
+        compression=None,
+        compression_level=None,
     ):
         """Upload a file to a bucket
 
+        Files of multipart_threshold or larger are uploaded as a parallel
+        composite upload: parts are uploaded concurrently as temporary objects,
+        composed into the object, then deleted. Failed parts are uploaded
+        again on their own, rather than the whole file. Compressed files are
+        streamed as ``upload_stream`` does.
+
         Args:
             bucket_name (str):  Bucket name to use
             source_file_name (str): Local file path
@@ -95,9 +356,45 @@ class GoogleCloudStorage(object):
         Kwargs:
             content_type (str): Type of Content
             content_encoding(str): Encoding used on content for uploading
+            compression(str): 'gzip', 'zstd' or 'lz4' to compress content while
+                uploading. content_encoding is set to it
+            compression_level(int): Defaults to the codec's
         Returns:
             None
         """
+        if compression:
+            self._upload_file_compressed(
+                bucket_name, object_key, source_file_name, content_type,
+                compression, compression_level)
+            return
+
+        if os.path.getsize(source_file_name) >= self.multipart_threshold:
+            bucket = self._get_bucket(bucket_name)
+            blob = bucket.blob(object_key)
+            if content_encoding is not None:
+                blob.content_encoding = content_encoding
+            if content_type is not None:
+                blob.content_type = content_type
+            # not retried as a whole: parts and requests are on their own.
+            self._upload_file_composite(bucket, blob, source_file_name)
+            return
+
+        self._upload_file_single(
+            bucket_name, object_key, source_file_name, content_type, content_encoding)
+
+    @retried
+    def _upload_file_compressed(self, bucket_name, object_key, source_file_name,
+                                content_type, compression, compression_level):
+        with open(source_file_name, 'rb') as f:
+            self._upload_chunks(
+                bucket_name, object_key,
+                counted_bytes_sent(iter_compress(
+                    iter_chunks(f), compression, compression_level)),
+                content_type, str(compression))
+
+    @retried
+    def _upload_file_single(self, bucket_name, object_key, source_file_name,
+                            content_type, content_encoding):
         bucket = self._get_bucket(bucket_name)
         blob = bucket.blob(object_key)
         if content_encoding is not None:
@@ -105,9 +402,58 @@ class GoogleCloudStorage(object):
 
         blob.upload_from_filename(source_file_name, content_type=content_type)
 
+    def _upload_file_composite(self, bucket, blob, source_file_name):
+        """Upload a file as a parallel composite upload to ``blob``
+
+        Composite objects have no MD5, only CRC32C. Temporary objects which
+        can't be deleted are logged.
+        """
+        prefix = '%s.parts-%s/' % (blob.name, uuid.uuid4().hex)
+        # names, once each though parts may be uploaded again.
+        temporary_blob_names = set()
+
+        def upload_part(part_number, data):
+            part_blob = bucket.blob('%s%05d' % (prefix, part_number))
+            temporary_blob_names.add(part_blob.name)
+            part_blob.upload_from_string(data)
+            return part_blob
+
+        try:
+            sources = upload_file_parts(
+                upload_part, source_file_name, part_size=self.part_size,
+                max_concurrency=self.max_concurrency,
+                retry_policy=self.retry_policy,
+            )
+            # compose takes up to 32 sources, so compose parts in levels.
+            level = 0
+            while len(sources) > COMPOSE_MAX_SOURCES:
+                level += 1
+                composed_blobs = []
+                for i in range(0, len(sources), COMPOSE_MAX_SOURCES):
+                    composed_blob = bucket.blob('%slevel-%d-%05d' % (prefix, level, i))
+                    temporary_blob_names.add(composed_blob.name)
+                    self._compose(composed_blob, sources[i:i + COMPOSE_MAX_SOURCES])
+                    composed_blobs.append(composed_blob)
+                sources = composed_blobs
+            self._compose(blob, sources)
+        finally:
+            # left over objects don't fail the upload, but are reported.
+            for result in self.delete_many(bucket.name, sorted(temporary_blob_names)):
+                if not result.ok:
+                    LOGGER.warning('failed to delete temporary object %s/%s: %s',
+                                   bucket.name, result.object_key, result.error)
+
+    @retried
+    def _compose(self, blob, sources):
+        blob.compose(sources)
+
+    @instrumented(bytes_sent=buffer_size)
+    @invalidates_memory_cache
+    @retried
     @gcs_api_exception_handler
     def upload(
-        self, bucket_name, object_key, buffer, content_type=None, content_encoding=None
+        self, bucket_name, object_key, buffer, content_type=None, content_encoding=None,
+        compression=None, compression_level=None,
     ):
         """Upload content to a bucket
 
@@ -118,10 +464,17 @@ class GoogleCloudStorage(object):
         Kwargs:
             content_type (str): Type of Content
             content_encoding(str): Encoding used on content for uploading
+            compression(str): 'gzip', 'zstd' or 'lz4' to compress content
+                before uploading. content_encoding is set to it
+            compression_level(int): Defaults to the codec's
         Returns:
             None
         """
         assert isinstance(buffer, bytes)
+        if compression:
+            buffer = compress(buffer, compression, compression_level)
+            report_bytes_sent(len(buffer))
+            content_encoding = str(compression)
         bucket = self._get_bucket(bucket_name)
         blob = bucket.blob(object_key)
 
@@ -130,6 +483,53 @@ class GoogleCloudStorage(object):
 
         blob.upload_from_string(buffer, content_type=content_type)
 
+    @instrumented
+    @invalidates_memory_cache
+    @gcs_api_exception_handler
+    def upload_stream(self, bucket_name, object_key, stream,
+                      content_type=None, content_encoding=None, do_gzip=False,
+                      compression=None, compression_level=None):
+        """Upload content of a file-like object or an iterable to a bucket
+
+        Content is sent as a resumable upload, one part_size chunk at a time.
+
+        Args:
+            bucket_name (str):  Bucket name to use
+            object_key (str): Object key stored in bucket
+            stream: Readable binary file-like object, or iterable of bytes
+        Kwargs:
+            content_type (str): Type of Content
+            content_encoding(str): Encoding used on content for uploading
+            do_gzip(bool): True to gzip content while uploading. content_encoding
+                is set to gzip(default: False)
+            compression(str): 'gzip', 'zstd' or 'lz4' to compress content while
+                uploading. content_encoding is set to it
+            compression_level(int): Defaults to the codec's
+        Returns:
+            None
+        """
+        chunks = iter_chunks(stream)
+        if do_gzip:
+            compression = compression or Compression.GZIP
+        if compression:
+            chunks = iter_compress(chunks, compression, compression_level)
+            content_encoding = str(compression)
+        self._upload_chunks(bucket_name, object_key, chunks, content_type, content_encoding)
+
+    def _upload_chunks(self, bucket_name, object_key, chunks, content_type,
+                       content_encoding):
+        bucket = self._get_bucket(bucket_name)
+        blob = bucket.blob(object_key)
+        # chunk size of resumable uploads must be a multiple of 256 KB.
+        blob.chunk_size = max(1, self.part_size // RESUMABLE_CHUNK_UNIT) * RESUMABLE_CHUNK_UNIT
+        if content_encoding is not None:
+            blob.content_encoding = content_encoding
+
+        blob.upload_from_file(IterableReader(chunks), content_type=content_type)
+
+    @instrumented
+    @memory_cached_exists
+    @retried_hedged
     @gcs_api_exception_handler
     def is_exists(self, bucket_name, object_key):
         """Check if an object exists in bucket
@@ -152,10 +552,31 @@ class GoogleCloudStorage(object):
         blob = bucket.blob(object_key)
         return blob.exists()
 
+    @instrumented
+    @retried_hedged
+    @gcs_api_exception_handler
+    def stat(self, bucket_name, object_key):
+        """Get metadata of an object
+
+        Args:
+            bucket_name (str):  Bucket name to use
+            object_key (str): Object key stored in bucket
+        Returns:
+            ObjectInfo. md5 is None for composite objects
+        """
+        bucket = self._get_bucket(bucket_name)
+        return _blob_info(self._get_existing_blob(bucket, object_key))
+
+    @instrumented
+    @invalidates_memory_cache_renamed
     @gcs_api_exception_handler
     def rename(self, bucket_name, object_key, new_object_key):
         """Renames an object
 
+        The object is copied with ``copy``, then deleted. Not retried as a
+        whole, since a repeated rename would miss the deleted source; the copy
+        and the delete are retried on their own.
+
         Args:
             bucket_name (str):  Bucket name to use
             object_key (str): Object Key to rename
@@ -167,51 +588,121 @@ class GoogleCloudStorage(object):
             object_key != new_object_key
         ), "object_key can't be same to new_object_key"
 
-        bucket = self._get_bucket(bucket_name)
-        blob = bucket.blob(object_key)
         # Since this is not atomic operation, deleting current key might fail.
-        bucket.rename_blob(blob, new_object_key)
+        self.copy(bucket_name, object_key, bucket_name, new_object_key)
+        self.delete(bucket_name, object_key)
 
+    @instrumented
+    @invalidates_memory_cache_copied
+    @retried
+    @gcs_api_exception_handler
+    def copy(self, bucket_name, object_key, dst_bucket_name, dst_object_key,
+             callback=None):
+        """Copy an object on the server side, within or across buckets
+
+        The copy is a rewrite, which GCS may carry out over many requests for
+        large objects or across locations and storage classes; requests are
+        repeated with the returned token until it completes. The source is
+        pinned to its generation at the first request.
+
+        Args:
+            bucket_name(str):  Bucket name of the source
+            object_key(str): Object Key of the source
+            dst_bucket_name(str): Bucket name of the copy
+            dst_object_key(str): Object Key of the copy
+        Kwargs:
+            callback(callable): callback(bytes_copied) called as the rewrite
+                progresses
+        Returns:
+            None
+        """
+        bucket = self._get_bucket(bucket_name)
+        source_blob = self._get_existing_blob(bucket, object_key)
+        if dst_bucket_name != bucket_name:
+            bucket = self._get_bucket(dst_bucket_name)
+        dst_blob = bucket.blob(dst_object_key)
+
+        token = None
+        copied = 0
+        while True:
+            token, bytes_rewritten, _ = dst_blob.rewrite(source_blob, token=token)
+            if callback is not None and bytes_rewritten > copied:
+                callback(bytes_rewritten - copied)
+            copied = bytes_rewritten
+            if token is None:
+                return
+
+    @instrumented(bytes_received=destination_file_size)
+    @retried
     @gcs_api_exception_handler
     def download_gzipped_to_file(
         self, bucket_name, object_key, destination_file_name, do_gunzip=False
     ):
         """Download an object to local
 
+        Raw content of large objects is fetched as concurrent byte ranges.
+
         Args:
             bucket_name (str):  Bucket name to use
             object_key (str): Object Key to rename
             destination_file_name (str): Local file path
         Kwargs:
-            do_gunzip(bool): True to gunzip(default: False)
+            do_gunzip(bool): True to decode gzip, zstd or lz4 encoded content.
+                Content stored with another encoding is written as is
+                (default: False)
         Returns:
             None
         """
         bucket = self._get_bucket(bucket_name)
-        blob = bucket.blob(object_key)
+        blob = self._get_existing_blob(bucket, object_key)
+        codec = get_codec(blob.content_encoding) if do_gunzip else None
+        if codec is None and blob.size >= self.multipart_threshold:
+            download_ranges_to_file(
+                lambda start, end: self._download_range(
+                    bucket, object_key, blob.generation, start, end),
+                blob.size, destination_file_name, expected_md5=_blob_md5(blob),
+                part_size=self.part_size,
+                max_concurrency=self.max_concurrency,
+            )
+            return
 
         # blob.download_to_filename(destination_file_name)
         # https://googleapis.github.io/google-cloud-python/latest/_modules/google/cloud/storage/blob.html#Blob.download_to_file
-        raw_download = not do_gunzip
+        # content is downloaded as stored, and decoded here.
         try:
             with open(destination_file_name, "wb") as file_obj:
-                blob.download_to_file(file_obj, raw_download=raw_download)
-        except resumable_media.DataCorruption:
-            # Delete the corrupt downloaded file.
-            os.remove(destination_file_name)
+                if codec is None:
+                    blob.download_to_file(file_obj, raw_download=True)
+                else:
+                    writer = _DecodingWriter(file_obj, codec)
+                    blob.download_to_file(writer, raw_download=True)
+                    writer.finish()
+        except Exception:
+            # Delete the corrupt or partial downloaded file.
+            if os.path.exists(destination_file_name):
+                os.remove(destination_file_name)
             raise
 
+    @instrumented(bytes_received=result_size)
+    @memory_cached_content
+    @retried
     @gcs_api_exception_handler
-    def download_gzipped(self, bucket_name, object_key, do_gunzip=False):
+    def download_gzipped(self, bucket_name, object_key, do_gunzip=False,
+                         as_bytearray=False):
         """Download an object to memory
 
         Args:
             bucket_name (str):  Bucket name to use
             object_key (str): Object Key to rename
         Kwargs:
-            do_gunzip(bool): True to gunzip(default: False)
+            do_gunzip(bool): True to decode gzip, zstd or lz4 encoded content.
+                Content stored with another encoding is returned as is
+                (default: False)
+            as_bytearray(bool): True to collect content into one bytearray
+                and return it without a final bytes copy(default: False)
         Returns:
             bytes. Content stored in the object
+            bytearray. if as_bytearray is True
 
         Example.
         >>> GoogleCloudStorage().download_gzipped("my_bucket", "my_object_key")
@@ -220,14 +711,112 @@ class GoogleCloudStorage(object):
         bucket = self._get_bucket(bucket_name)
         blob = bucket.blob(object_key)
 
-        # Google uses python-requests.
-        # And, The gzip and deflate transfer-encodings are automatically decoded.
-        # ref: https://github.com/googleapis/google-resumable-media-python/blob/master/google/resumable_media/requests/download.py#L120
-        if do_gunzip:
-            return blob.download_as_string()
+        # content is downloaded as stored, and decoded here; downloads set
+        # blob.content_encoding from the response headers.
+        if not do_gunzip:
+            if not as_bytearray:
+                return blob.download_as_string(raw_download=True)
+            writer = _BytearrayWriter()
+            blob.download_to_file(writer, raw_download=True)
+            return writer.buffer
+
+        # decoded while downloading, so compressed content isn't kept whole.
+        writer = _GuessingDecodingWriter()
+        blob.download_to_file(writer, raw_download=True)
+        writer.finish()
+        codec = get_codec(blob.content_encoding)
+        buffer = writer.buffer
+        decoded = writer.codec is not None
+        if decoded and (writer.failed or writer.codec != codec):
+            # guessed wrong: fetch the content as stored, of the same generation.
+            raw_writer = _BytearrayWriter()
+            bucket.blob(object_key, generation=blob.generation).download_to_file(
+                raw_writer, raw_download=True)
+            buffer, decoded = raw_writer.buffer, False
+        if codec is not None and not decoded:
+            buffer = decompress_to_bytearray([buffer], codec)
+        return buffer if as_bytearray else bytes(buffer)
+
+    @instrumented
+    @gcs_api_exception_handler
+    def open_read(self, bucket_name, object_key, **kwargs):
+        """Open an object for reading without downloading it
+
+        Reads are served with byte range requests pinned to the object's
+        current generation, through a small block cache.
+
+        Args:
+            bucket_name (str):  Bucket name to use
+            object_key (str): Object Key to read
+        Kwargs:
+            **kwargs: Passed to ``RangedReader``. e.g. block_size
+        Returns:
+            RangedReader. Seekable raw binary file-like object of raw content
+        """
+        bucket = self._get_bucket(bucket_name)
+        blob = self._get_existing_blob(bucket, object_key)
+        return RangedReader(
+            lambda start, end: self._download_range(
+                bucket, object_key, blob.generation, start, end),
+            blob.size, **kwargs)
 
-        return blob.download_as_string(raw_download=True)
+    def iter_objects(self, bucket_name, prefix=None, delimiter=None, page_size=None):
+        """Iterate objects of a bucket lazily, in key order
 
+        Pages are listed one request at a time, and the next page is requested
+        while the current one is consumed.
+
+        Args:
+            bucket_name (str):  Bucket name to use
+        Kwargs:
+            prefix (str): Only objects whose key starts with prefix
+            delimiter (str): Group keys containing delimiter after prefix into
+                common prefixes
+            page_size (int): Max keys per listing request(default: 1000)
+        Yields:
+            ObjectInfo. Common prefixes are yielded with size None.
+        """
+        pages = self._iter_object_pages(bucket_name, prefix, delimiter, page_size)
+        for page in iter_prefetched(pages):
+            for info in page:
+                yield info
+
+    def _iter_object_pages(self, bucket_name, prefix, delimiter, page_size):
+        list_kwargs = {}
+        if prefix:
+            list_kwargs['prefix'] = prefix
+        if delimiter:
+            list_kwargs['delimiter'] = delimiter
+        if page_size:
+            list_kwargs['page_size'] = page_size
+
+        page_token = None
+        while True:
+            # pages are requested by token, so a failed request can be retried.
+            page, page_token = self._list_blobs_page(bucket_name, page_token, list_kwargs)
+            if page is None:
+                return
+            infos = [_blob_info(blob) for blob in page]
+            infos.extend(
+                ObjectInfo(x, None, None, None, None, None, None)
+                for x in sorted(page.prefixes)
+            )
+            yield infos
+            if page_token is None:
+                return
+
+    @instrumented(operation='list_page')
+    @retried
+    @gcs_api_exception_handler
+    def _list_blobs_page(self, bucket_name, page_token, list_kwargs):
+        blobs = self.storage_client.list_blobs(
+            bucket_name, page_token=page_token, **list_kwargs)
+        page = next(blobs.pages, None)
+        return page, blobs.next_page_token
+
+    @instrumented
+    @invalidates_memory_cache
+    @retried
     @gcs_api_exception_handler
     def delete(self, bucket_name, object_key):
         """Delete an object from bucket.
@@ -247,3 +836,67 @@ class GoogleCloudStorage(object):
         except google.api_core.exceptions.NotFound:
             # slience if object_key doesn't exists
             pass
+
+    @instrumented
+    @invalidates_memory_cache_many
+    def delete_many(self, bucket_name, object_keys,
+                    max_workers=DEFAULT_BATCH_MAX_WORKERS):
+        """Delete many objects from bucket
+
+        Keys are sent in batch requests of up to 100 calls, which run
+        concurrently; the client keeps batches per thread.
+
+        Args:
+            bucket_name(str):  Bucket name to use
+            object_keys(iterable): Object keys to delete
+        Kwargs:
+            max_workers(int): Max concurrent batch requests
+        Returns:
+            list. BatchItemResult per item
+        @note: No error is reported for objects which don't exist.
+        """
+        object_keys = list(object_keys)
+        key_batches = [
+            object_keys[i:i + BATCH_MAX_CALLS]
+            for i in range(0, len(object_keys), BATCH_MAX_CALLS)
+        ]
+        batch_results = run_many(
+            lambda key_batch: self._delete_blobs(bucket_name, key_batch),
+            [(None, (key_batch,)) for key_batch in key_batches],
+            max_workers, self._to_storage_exception,
+        )
+
+        results = []
+        for key_batch, batch_result in zip(key_batches, batch_results):
+            for object_key in key_batch:
+                if batch_result.error is not None:
+                    error = batch_result.error
+                else:
+                    error = batch_result.result.get(object_key)
+                results.append(BatchItemResult(object_key, None, error))
+        return results
+
+    @retried
+    @gcs_api_exception_handler
+    def _delete_blobs(self, bucket_name, object_keys):
+        """Delete up to 100 objects with one batch request
+
+        Returns:
+            dict. object_key to exception, for calls that failed
+        """
+        bucket = self._get_bucket(bucket_name)
+        # raise_exception and _responses exist since google-cloud-storage 2.10.0.
+        batch = self.storage_client.batch(raise_exception=False)
+        with batch:
+            for object_key in object_keys:
+                bucket.delete_blob(object_key)
+
+        errors = {}
+        # one response per call, in order. The batch keeps them once finished.
+        for object_key, response in zip(object_keys, batch._responses):
+            if 200 <= response.status_code < 300 or \
+                    response.status_code == HTTPStatus.NOT_FOUND:
+                continue
+            errors[object_key] = _to_storage_exception(
+                google.api_core.exceptions.from_http_response(response))
+        return errors
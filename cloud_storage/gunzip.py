@@ -0,0 +1,207 @@
+"""
+:since: 2026-10-18
+
+Pipelined and parallel decoding of downloaded content.
+
+Fetching and decoding overlap: the next chunk is fetched in the background
+while the current one is decoded. gzip streams made of members recording
+their size, as written by ``iter_gzip_blocks`` ('CS' extra subfield) or by
+bgzip ('BC' extra subfield), are split without inflating them, and members
+are inflated on threads; zlib releases the GIL while inflating. Other gzip
+streams, or the rest of a stream from its first member without a recorded
+size, are gunzipped sequentially.
+"""
+import collections
+import concurrent.futures
+import itertools
+import os
+import zlib
+
+from cloud_storage.compression import (
+    DEFAULT_CHUNK_SIZE,
+    GZIP_FLAG_EXTRA,
+    GZIP_MEMBER_SUBFIELD_ID,
+    GZIP_WBITS,
+    iter_decompress,
+)
+from cloud_storage.enums import Compression
+from cloud_storage.parallel import iter_prefetched
+
+BGZF_SUBFIELD_ID = b'BC'
+# fixed header fields, up to XLEN.
+GZIP_FIXED_HEADER_SIZE = 12
+GZIP_TRAILER_SIZE = 8
+
+
+def member_size(header):
+    """Return the total size of the gzip member starting ``header``
+
+    Args:
+        header(bytes): Start of a gzip member, at least up to its extra field
+    Returns:
+        int. Size recorded in a 'CS' or 'BC' extra subfield. 0 if header is
+        too short to tell, None if the member doesn't record its size
+    """
+    if len(header) < GZIP_FIXED_HEADER_SIZE:
+        return 0
+    if header[0] != 0x1f or header[1] != 0x8b or header[2] != zlib.DEFLATED \
+            or not header[3] & GZIP_FLAG_EXTRA:
+        return None
+    extra_end = GZIP_FIXED_HEADER_SIZE + int.from_bytes(header[10:12], 'little')
+    if len(header) < extra_end:
+        return 0
+
+    position = GZIP_FIXED_HEADER_SIZE
+    while position + 4 <= extra_end:
+        subfield_id = bytes(header[position:position + 2])
+        length = int.from_bytes(header[position + 2:position + 4], 'little')
+        data = header[position + 4:position + 4 + length]
+        position += 4 + length
+        if subfield_id == GZIP_MEMBER_SUBFIELD_ID and length == 4:
+            size = int.from_bytes(data, 'little')
+        elif subfield_id == BGZF_SUBFIELD_ID and length == 2:
+            # BSIZE is the member size minus 1.
+            size = int.from_bytes(data, 'little') + 1
+        else:
+            continue
+        return size if size >= extra_end + GZIP_TRAILER_SIZE else None
+    return None
+
+
+class _MemberSplitter(object):
+    """Cut gzip members recording their size out of chunks
+
+    Once iterated, ``rest`` holds the chunks left from the first member
+    without a recorded size, if any.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.rest = ()
+
+    def __iter__(self):
+        buffer = bytearray()
+        ended = False
+        while True:
+            size = member_size(buffer)
+            if size is None:
+                break
+            if size == 0 or len(buffer) < size:
+                if ended:
+                    break
+                chunk = next(self.chunks, None)
+                if chunk is None:
+                    ended = True
+                else:
+                    buffer += chunk
+                continue
+            member = bytes(buffer[:size])
+            del buffer[:size]
+            yield member
+        self.rest = itertools.chain((bytes(buffer),), self.chunks) if buffer else self.chunks
+
+
+def inflate_member(member):
+    """Return the content of one complete gzip member
+
+    Raises:
+        zlib.error: member is corrupt, or its recorded size is wrong
+    """
+    decompressor = zlib.decompressobj(GZIP_WBITS)
+    data = decompressor.decompress(member)
+    if not decompressor.eof or decompressor.unused_data:
+        raise zlib.error('gzip member size recorded in its header is wrong')
+    return data
+
+
+def iter_gunzip_parallel(chunks, max_workers=None, max_length=DEFAULT_CHUNK_SIZE):
+    """Gunzip an iterable of gzipped chunks, inflating members on threads
+
+    Members recording their size are inflated in parallel and yielded
+    whole, in order. A few members are inflated ahead of the consumer, so
+    memory stays bounded. The stream from the first member without a
+    recorded size is gunzipped sequentially, in pieces of at most
+    ``max_length`` bytes.
+
+    Args:
+        chunks(iterable): bytes chunks of a gzip stream
+    Kwargs:
+        max_workers(int): Max threads. Defaults to the number of CPUs
+        max_length(int): Max size of each sequentially decompressed piece
+    Yields:
+        bytes. Decompressed content
+    Raises:
+        EOFError: the stream ended in the middle of a gzip member
+        zlib.error: the stream is not valid gzip
+    """
+    splitter = _MemberSplitter(chunks)
+    members = iter(splitter)
+    first = next(members, None)
+    second = None if first is None else next(members, None)
+    if second is None:
+        # no threads for one member.
+        data = inflate_member(first) if first is not None else None
+        if data:
+            yield data
+    else:
+        max_workers = max_workers or os.cpu_count() or 1
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers, thread_name_prefix='cloud-storage-gunzip') as executor:
+            pending = collections.deque(
+                executor.submit(inflate_member, x) for x in (first, second))
+            try:
+                for member in members:
+                    if len(pending) >= max_workers * 2:
+                        data = pending.popleft().result()
+                        if data:
+                            yield data
+                    pending.append(executor.submit(inflate_member, member))
+                while pending:
+                    data = pending.popleft().result()
+                    if data:
+                        yield data
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    for data in iter_decompress(splitter.rest, Compression.GZIP, max_length):
+        yield data
+
+
+def iter_decompress_parallel(chunks, compression, max_workers=None, prefetch=True):
+    """Decompress an iterable of compressed chunks, fetching the next chunk
+    while decoding
+
+    gzip is gunzipped with ``iter_gunzip_parallel``. zstd and lz4 are
+    decoded sequentially.
+
+    Args:
+        chunks(iterable): bytes chunks, e.g. of a response body
+        compression(str): 'gzip', 'zstd' or 'lz4'
+    Kwargs:
+        max_workers(int): Max threads inflating gzip members. Defaults to
+            the number of CPUs
+        prefetch(bool): True to fetch chunks in the background(default: True)
+    Yields:
+        bytes. Decompressed content
+    """
+    if prefetch:
+        chunks = iter_prefetched(chunks)
+    if Compression(compression) == Compression.GZIP:
+        return iter_gunzip_parallel(chunks, max_workers)
+    return iter_decompress(chunks, compression)
+
+
+def decompress_parallel_to_bytearray(chunks, compression, max_workers=None, prefetch=True):
+    """Decompress an iterable of compressed chunks into one bytearray
+
+    As ``iter_decompress_parallel``.
+
+    Returns:
+        bytearray. Decompressed content
+    """
+    buffer = bytearray()
+    for data in iter_decompress_parallel(chunks, compression, max_workers, prefetch):
+        buffer += data
+    return buffer
+
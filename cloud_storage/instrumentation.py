@@ -0,0 +1,337 @@
+"""
+:since: 2026-10-18
+
+Per call metrics and traces of storage clients.
+
+A client built with ``instrumentation=...`` reports each of its calls as a
+``CallEvent``: duration, content bytes sent and received, retries, hedges,
+memory cache hits and the class of the error raised. Clients without
+instrumentation pay one attribute lookup per call.
+
+Events go to a callback, Prometheus metrics or OpenTelemetry spans. The
+last two need ``prometheus_client`` and ``opentelemetry-api``.
+"""
+import functools
+import inspect
+import os
+import threading
+import time
+
+try:
+    import prometheus_client
+except ImportError:  # optional, for PrometheusInstrumentation
+    prometheus_client = None
+
+try:
+    import opentelemetry.trace as otel_trace
+except ImportError:  # optional, for OpenTelemetryInstrumentation
+    otel_trace = None
+
+DEFAULT_METRICS_NAMESPACE = 'cloud_storage'
+TRACER_NAME = 'cloud_storage'
+
+# events of the instrumented calls running in each thread, innermost last.
+_local = threading.local()
+# counters of an event may be added to by worker threads of its call.
+_count_lock = threading.Lock()
+
+
+class CallEvent(object):
+    """A storage call, as reported to instrumentation
+
+    Attributes:
+        storage(str): Client class name. e.g. 'S3CloudStorageBoto3'
+        operation(str): Method name. e.g. 'download_gzipped'
+        bucket_name(str): None if the call has none
+        object_key(str): None if the call has none
+        duration(float): Seconds, set once the call returns
+        bytes_sent(int): Content bytes uploaded, None if unknown
+        bytes_received(int): Content bytes downloaded, None if unknown
+        retries(int): Attempts made after the first
+        hedges(int): Hedged requests started
+        cache_hits(int): Answers from the memory cache
+        error(str): Class name of the exception raised. None on success
+    """
+    __slots__ = (
+        'storage', 'operation', 'bucket_name', 'object_key', 'duration',
+        'bytes_sent', 'bytes_received', 'retries', 'hedges', 'cache_hits', 'error',
+    )
+
+    def __init__(self, storage, operation, bucket_name=None, object_key=None):
+        self.storage = storage
+        self.operation = operation
+        self.bucket_name = bucket_name
+        self.object_key = object_key
+        self.duration = None
+        self.bytes_sent = None
+        self.bytes_received = None
+        self.retries = 0
+        self.hedges = 0
+        self.cache_hits = 0
+        self.error = None
+
+    def __repr__(self):
+        return 'CallEvent(%s)' % ', '.join(
+            '%s=%r' % (name, getattr(self, name)) for name in self.__slots__)
+
+
+class Instrumentation(object):
+    """Receives events of instrumented calls
+
+    ``start`` is called before each call, in the calling thread, and what it
+    returns is passed to ``finish`` once the call returns or raises.
+    """
+
+    def start(self, event):
+        return None
+
+    def finish(self, event, token):
+        pass
+
+
+class CallbackInstrumentation(Instrumentation):
+    """Pass each finished CallEvent to a callback
+
+    Args:
+        callback(callable): Takes a CallEvent. Called in the calling thread
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def finish(self, event, token):
+        self.callback(event)
+
+
+class PrometheusInstrumentation(Instrumentation):
+    """Record calls in prometheus_client metrics
+
+    Metrics are labeled by storage and operation. The duration histogram
+    is labeled by error class too, '' on success.
+
+    Kwargs:
+        registry(CollectorRegistry): Defaults to prometheus_client's
+        namespace(str): Prefix of metric names
+        buckets(tuple): Duration histogram buckets in seconds
+    """
+
+    def __init__(self, registry=None, namespace=DEFAULT_METRICS_NAMESPACE,
+                 buckets=None):
+        if prometheus_client is None:
+            raise ImportError('PrometheusInstrumentation needs prometheus_client')
+        if registry is None:
+            registry = prometheus_client.REGISTRY
+        labels = ('storage', 'operation')
+        histogram_kwargs = {} if buckets is None else {'buckets': buckets}
+        self.duration = prometheus_client.Histogram(
+            '%s_call_duration_seconds' % namespace, 'Duration of storage calls',
+            labels + ('error',), registry=registry, **histogram_kwargs)
+        self.counters = {
+            name: prometheus_client.Counter(
+                '%s_%s' % (namespace, name), description, labels, registry=registry)
+            for name, description in (
+                ('bytes_sent', 'Content bytes uploaded'),
+                ('bytes_received', 'Content bytes downloaded'),
+                ('retries', 'Retried attempts of storage calls'),
+                ('hedges', 'Hedged requests of storage calls'),
+                ('cache_hits', 'Storage calls answered by the memory cache'),
+            )
+        }
+
+    def finish(self, event, token):
+        self.duration.labels(
+            event.storage, event.operation, event.error or '').observe(event.duration)
+        for name, counter in self.counters.items():
+            value = getattr(event, name)
+            if value:
+                counter.labels(event.storage, event.operation).inc(value)
+
+
+class OpenTelemetryInstrumentation(Instrumentation):
+    """Trace each call as an OpenTelemetry client span
+
+    Spans are current while the call runs, so requests traced by SDK
+    instrumentation nest under them.
+
+    Kwargs:
+        tracer: Defaults to the global tracer provider's
+    """
+
+    def __init__(self, tracer=None):
+        if otel_trace is None:
+            raise ImportError('OpenTelemetryInstrumentation needs opentelemetry-api')
+        if tracer is None:
+            tracer = otel_trace.get_tracer(TRACER_NAME)
+        self.tracer = tracer
+
+    def start(self, event):
+        attributes = {'cloud_storage.storage': event.storage}
+        if event.bucket_name is not None:
+            attributes['cloud_storage.bucket_name'] = event.bucket_name
+        if event.object_key is not None:
+            attributes['cloud_storage.object_key'] = event.object_key
+        span_context = self.tracer.start_as_current_span(
+            '%s.%s' % (event.storage, event.operation),
+            kind=otel_trace.SpanKind.CLIENT, attributes=attributes,
+        )
+        span = span_context.__enter__()
+        return span_context, span
+
+    def finish(self, event, token):
+        span_context, span = token
+        for name in ('bytes_sent', 'bytes_received', 'retries', 'hedges', 'cache_hits'):
+            value = getattr(event, name)
+            if value:
+                span.set_attribute('cloud_storage.%s' % name, value)
+        if event.error is not None:
+            span.set_attribute('error.type', event.error)
+            span.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR, event.error))
+        span_context.__exit__(None, None, None)
+
+
+def count_event(name, value=1):
+    """Add to a counter of the instrumented call running in this thread
+
+    Args:
+        name(str): 'retries', 'hedges' or 'cache_hits'
+    """
+    event = getattr(_local, 'event', None)
+    if event is not None:
+        with _count_lock:
+            setattr(event, name, getattr(event, name) + value)
+
+
+def with_call_event(func):
+    """Bind ``func`` to the instrumented call running in this thread
+
+    Worker threads of a call run what it returns, so their retries and
+    hedges count toward the call.
+
+    Returns:
+        callable. ``func`` itself outside instrumented calls
+    """
+    event = getattr(_local, 'event', None)
+    if event is None:
+        return func
+
+    @functools.wraps(func)
+    def call(*args, **kwargs):
+        parent = getattr(_local, 'event', None)
+        _local.event = event
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _local.event = parent
+    return call
+
+
+def report_bytes_sent(size):
+    """Set bytes_sent of the instrumented call running in this thread
+
+    For calls sending other than what their arguments tell, e.g. compressed
+    content.
+    """
+    event = getattr(_local, 'event', None)
+    if event is not None:
+        event.bytes_sent = size
+
+
+def counted_bytes_sent(chunks):
+    """Report the total size of chunks as bytes_sent of the instrumented call
+    running in this thread, once they are all consumed
+
+    Chunks may be consumed by another thread, e.g. of an SDK transfer.
+
+    Returns:
+        iterable. Of chunks
+    """
+    event = getattr(_local, 'event', None)
+    if event is None:
+        return chunks
+    return _iter_counted(chunks, event)
+
+
+def _iter_counted(chunks, event):
+    total = 0
+    for chunk in chunks:
+        total += len(chunk)
+        yield chunk
+    event.bytes_sent = total
+
+
+def buffer_size(arguments, result):
+    return len(arguments['buffer'])
+
+
+def source_file_size(arguments, result):
+    return os.path.getsize(arguments['source_file_name'])
+
+
+def destination_file_size(arguments, result):
+    return os.path.getsize(arguments['destination_file_name'])
+
+
+def result_size(arguments, result):
+    if isinstance(result, (bytes, bytearray, memoryview)):
+        return len(result)
+    return None
+
+
+def instrumented(f=None, operation=None, bytes_sent=None, bytes_received=None):
+    """Report calls of a storage method to self.instrumentation
+
+    Usable bare or with arguments.
+
+    Kwargs:
+        operation(str): Name of the operation. Defaults to the method's
+        bytes_sent(callable): Takes the call's arguments, by name, and its
+            result. Returns content bytes uploaded
+        bytes_received(callable): As bytes_sent, for bytes downloaded
+    """
+    if f is None:
+        return functools.partial(
+            instrumented, operation=operation, bytes_sent=bytes_sent,
+            bytes_received=bytes_received)
+
+    signature = inspect.signature(f)
+    operation = operation or f.__name__
+
+    @functools.wraps(f)
+    def decorate(self, *args, **kwargs):
+        instrumentation = self.instrumentation
+        if instrumentation is None:
+            return f(self, *args, **kwargs)
+
+        arguments = signature.bind(self, *args, **kwargs).arguments
+        event = CallEvent(
+            type(self).__name__, operation,
+            arguments.get('bucket_name'), arguments.get('object_key'))
+        parent = getattr(_local, 'event', None)
+        _local.event = event
+        token = instrumentation.start(event)
+        started = time.perf_counter()
+        try:
+            result = f(self, *args, **kwargs)
+            # unless reported by the call.
+            if bytes_sent is not None and event.bytes_sent is None:
+                event.bytes_sent = bytes_sent(arguments, result)
+            if bytes_received is not None:
+                event.bytes_received = bytes_received(arguments, result)
+            return result
+        except BaseException as e:
+            event.error = type(e).__name__
+            raise
+        finally:
+            event.duration = time.perf_counter() - started
+            _local.event = parent
+            instrumentation.finish(event, token)
+    return decorate
+
+
+__all__ = (
+    'CallEvent',
+    'CallbackInstrumentation',
+    'Instrumentation',
+    'OpenTelemetryInstrumentation',
+    'PrometheusInstrumentation',
+)
@@ -0,0 +1,169 @@
+"""
+:since: 2026-10-18
+
+Persistent key index of LocalStorage objects, kept in SQLite.
+"""
+import collections
+import os
+import sqlite3
+import threading
+
+INDEX_FILE_NAME = '.index.sqlite3'
+DEFAULT_INDEX_PAGE_SIZE = 1000
+# seconds to wait for a write lock held by another connection.
+INDEX_BUSY_TIMEOUT = 30
+
+# the greatest code point. No key continues a prefix with anything after it.
+_MAX_CHAR = chr(0x10FFFF)
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS objects (
+    bucket_name TEXT NOT NULL,
+    object_key TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    content_type TEXT,
+    content_encoding TEXT,
+    md5 TEXT,
+    PRIMARY KEY (bucket_name, object_key)
+) WITHOUT ROWID
+'''
+
+_COLUMNS = 'object_key, path, size, mtime_ns, content_type, content_encoding, md5'
+
+
+IndexEntry = collections.namedtuple('IndexEntry', _COLUMNS.replace(',', ''))
+
+
+class LocalIndex(object):
+    """Key to path and metadata index of a LocalStorage root
+
+    Each thread, and each process after a fork, uses its own connection.
+    The database is in WAL mode, so readers don't block the writer.
+
+    Args:
+        path(str): Database file path
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connect()
+        with conn:
+            conn.execute(_SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=INDEX_BUSY_TIMEOUT)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def close(self):
+        """Close the connection of the calling thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.conn = None
+            if self._local.pid == os.getpid():
+                conn.close()
+
+    def get(self, bucket_name, object_key):
+        """
+        Returns:
+            IndexEntry. None if not indexed
+        """
+        row = self._connect().execute(
+            'SELECT %s FROM objects WHERE bucket_name = ? AND object_key = ?'
+            % _COLUMNS,
+            (bucket_name, object_key),
+        ).fetchone()
+        return None if row is None else IndexEntry(*row)
+
+    def put(self, bucket_name, entry):
+        """Add or replace the entry of ``entry.object_key``"""
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO objects (bucket_name, %s) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)' % _COLUMNS,
+                (bucket_name,) + tuple(entry),
+            )
+
+    def delete(self, bucket_name, object_key):
+        """
+        Returns:
+            bool. True if an entry was removed
+        """
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                'DELETE FROM objects WHERE bucket_name = ? AND object_key = ?',
+                (bucket_name, object_key),
+            )
+        return cursor.rowcount > 0
+
+    def rename(self, bucket_name, object_key, entry):
+        """Replace the entry of ``object_key`` with ``entry`` in one transaction"""
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                'DELETE FROM objects WHERE bucket_name = ? AND object_key = ?',
+                (bucket_name, object_key),
+            )
+            conn.execute(
+                'INSERT OR REPLACE INTO objects (bucket_name, %s) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)' % _COLUMNS,
+                (bucket_name,) + tuple(entry),
+            )
+
+    def iter_entries(self, bucket_name, prefix=None, start=None,
+                     page_size=DEFAULT_INDEX_PAGE_SIZE):
+        """Iterate entries of a bucket in key order
+
+        Entries are read a page at a time, each page seeking the primary key
+        past the previous one, so listing costs the same at any depth.
+
+        Args:
+            bucket_name(str):  Bucket name to use
+        Kwargs:
+            prefix(str): Only keys starting with prefix
+            start(str): Only keys greater than or equal to start
+            page_size(int): Max entries per query
+        Yields:
+            IndexEntry
+        """
+        lower = max(prefix or '', start or '')
+        upper = prefix_end(prefix) if prefix else None
+        query = 'SELECT %s FROM objects WHERE bucket_name = ? AND object_key >= ?' % _COLUMNS
+        if upper is not None:
+            query += ' AND object_key < ?'
+        query += ' ORDER BY object_key LIMIT ?'
+
+        while True:
+            params = [bucket_name, lower]
+            if upper is not None:
+                params.append(upper)
+            params.append(page_size)
+            rows = self._connect().execute(query, params).fetchall()
+            for row in rows:
+                yield IndexEntry(*row)
+            if len(rows) < page_size:
+                return
+            # the smallest key greater than the last one.
+            lower = rows[-1][0] + '\0'
+
+
+def prefix_end(prefix):
+    """Return the smallest string greater than every string starting with prefix
+
+    Returns:
+        str. None if there is no such string
+    """
+    prefix = prefix.rstrip(_MAX_CHAR)
+    if not prefix:
+        return None
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
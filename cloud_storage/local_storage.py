@@ -2,27 +2,226 @@
 :author: Gatsby Lee
 :since: 2019-08-09
 """
+import contextlib
+import datetime
 import hashlib
+import json
+import mmap
 import os
-import gzip
-import shutil
+import tempfile
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # not POSIX. Writes are atomic, but not serialized.
+    fcntl = None
+
+from cloud_storage.base import BaseStorage
+from cloud_storage.compression import DEFAULT_CHUNK_SIZE, get_codec, iter_compress
+from cloud_storage.enums import Compression, LocalStorageLayout
+from cloud_storage.fileops import copy_fd
+from cloud_storage.gunzip import decompress_parallel_to_bytearray, iter_decompress_parallel
+from cloud_storage.instrumentation import (
+    buffer_size,
+    counted_bytes_sent,
+    destination_file_size,
+    instrumented,
+    result_size,
+    source_file_size,
+)
+from cloud_storage.local_index import (
+    DEFAULT_INDEX_PAGE_SIZE,
+    INDEX_FILE_NAME,
+    IndexEntry,
+    LocalIndex,
+    prefix_end,
+)
+from cloud_storage.memory_cache import (
+    invalidates_memory_cache,
+    invalidates_memory_cache_copied,
+    invalidates_memory_cache_renamed,
+    memory_cached_content,
+    memory_cached_exists,
+)
+from cloud_storage.models import ObjectInfo
+from cloud_storage.retry import retried, retried_hedged
+from cloud_storage.streams import iter_chunks
 
 LOCAL_STORAGE_ROOT = '/tmp/local_storage'
+# metadata of flat layout objects sits next to them, in JSON.
+METADATA_SUFFIX = '.meta'
+# lock files of objects, shared by hash of object path, at the root.
+LOCK_DIRECTORY_NAME = '.locks'
+LOCK_STRIPES = 256
+TEMP_PREFIX = '.tmp-'
+# temporary files older than this are left by crashed writers.
+STALE_TEMP_FILE_AGE = 60 * 60
+DEFAULT_SHARD_DEPTH = 2
+DEFAULT_SHARD_WIDTH = 2
+
+
+class LocalStorage(BaseStorage):
+    """Storage on the local file system
+
+    Objects are files named by the MD5 of their key. With the default flat
+    layout, they all sit in the bucket directory. The sharded layout spreads
+    them over ``shard_depth`` levels of subdirectories named by hash prefixes,
+    e.g. ``<bucket>/ab/cd/abcd...``, and keeps keys with their metadata in a
+    SQLite index at the root, which answers ``is_exists``, ``stat`` and
+    ``iter_objects`` without touching files.
+
+    Kwargs:
+        root_dir(str): Directory to keep buckets in
+        memory_cache(MemoryCache): Optional in-process cache
+        layout(str): 'flat' or 'sharded'(default: 'flat'). Stick to the layout
+            a root was created with
+        shard_depth(int): Levels of subdirectories of the sharded layout
+        shard_width(int): Hex digits naming each subdirectory
+        fsync(bool): True to fsync written files and their directory before
+            writes return(default: False)
+        retry_policy(RetryPolicy): Retries and hedging of calls failing with
+            transient errors, e.g. on a network file system
+        instrumentation(Instrumentation): Receives metrics of every call
 
+    Writes go to a temporary file in the object's directory, which replaces
+    the object once complete, so readers never see a partial object and a
+    crash never leaves one behind. Temporary files a crash leaves are removed
+    by the first write to their directory in a later process. Writers of one key are serialized with
+    an ``flock``, across processes, on one of a fixed set of lock files under
+    ``<root_dir>/.locks`` picked by hash of the object path.
+    """
 
-class LocalStorage(object):
+    def __init__(self, root_dir=LOCAL_STORAGE_ROOT, memory_cache=None,
+                 layout=LocalStorageLayout.FLAT, shard_depth=DEFAULT_SHARD_DEPTH,
+                 shard_width=DEFAULT_SHARD_WIDTH, fsync=False, retry_policy=None,
+                 instrumentation=None):
+        assert shard_depth * shard_width < 32, \
+            "shard_depth * shard_width must be less than 32"
 
-    def __init__(self, root_dir=LOCAL_STORAGE_ROOT):
         self._root_dir = root_dir
+        self.memory_cache = memory_cache
+        self.layout = LocalStorageLayout(layout)
+        self.shard_depth = shard_depth
+        self.shard_width = shard_width
+        self.fsync = fsync
+        self.retry_policy = retry_policy
+        self.instrumentation = instrumentation
         if not os.path.exists(self._root_dir):
             os.mkdir(self._root_dir)
+        self._lock_directory = os.path.join(self._root_dir, LOCK_DIRECTORY_NAME)
+        os.makedirs(self._lock_directory, exist_ok=True)
+        # directories of objects known to exist, and swept of stale
+        # temporary files.
+        self._known_directories = set()
+
+        self._index = None
+        if self.layout == LocalStorageLayout.SHARDED:
+            self._index = LocalIndex(os.path.join(self._root_dir, INDEX_FILE_NAME))
+
+    def _memory_cache_namespace(self):
+        return type(self).__name__, os.path.realpath(self._root_dir)
 
     def _get_full_path(self, bucket_name, object_key):
         object_key_hash = hashlib.md5(object_key.encode("utf-8")).hexdigest()
         bucket_directory = os.path.join(self._root_dir, bucket_name)
-        if not os.path.exists(bucket_directory):
-            self.create_bucket(bucket_name)
-        return os.path.join(self._root_dir, bucket_name, object_key_hash)
+        if self._index is None:
+            return os.path.join(bucket_directory, object_key_hash)
+
+        shards = [
+            object_key_hash[i:i + self.shard_width]
+            for i in range(0, self.shard_depth * self.shard_width, self.shard_width)
+        ]
+        return os.path.join(bucket_directory, *shards, object_key_hash)
+
+    def _get_write_path(self, bucket_name, object_key):
+        """Return the full path of an object, creating its bucket and shard
+        directories
+
+        Only the first write to a directory in a process touches the file
+        system for it, so reads and later writes cost no extra calls.
+        """
+        full_path = self._get_full_path(bucket_name, object_key)
+        directory = os.path.dirname(full_path)
+        if directory not in self._known_directories:
+            os.makedirs(directory, exist_ok=True)
+            _remove_stale_temp_files(directory)
+            self._known_directories.add(directory)
+        return full_path
+
+    def _get_metadata(self, bucket_name, object_key):
+        """Return the recorded metadata of an object
+
+        Returns:
+            IndexEntry. None if the object wasn't written with metadata
+        """
+        if self._index is not None:
+            return self._index.get(bucket_name, object_key)
+
+        metadata_path = self._get_full_path(bucket_name, object_key) + METADATA_SUFFIX
+        try:
+            with open(metadata_path, 'r') as f:
+                return IndexEntry(**json.load(f))
+        except FileNotFoundError:
+            return None
+
+    def _put_metadata(self, bucket_name, entry):
+        if self._index is not None:
+            self._index.put(bucket_name, entry)
+            return
+
+        full_path = os.path.join(self._root_dir, entry.path)
+        _write_chunks(full_path + METADATA_SUFFIX,
+                      [json.dumps(entry._asdict()).encode('utf-8')], self.fsync)
+
+    def _write_object(self, bucket_name, object_key, full_path, chunks,
+                      content_type=None, content_encoding=None):
+        """Replace an object with chunks, and record its metadata
+
+        The caller holds the lock of the object.
+        """
+        temp_path, md5 = _write_temp_file(
+            os.path.dirname(full_path), chunks, self.fsync)
+        self._replace_object(bucket_name, object_key, full_path, temp_path, md5,
+                             content_type, content_encoding)
+
+    def _replace_object(self, bucket_name, object_key, full_path, temp_path, md5,
+                        content_type=None, content_encoding=None):
+        """Replace an object with a complete temporary file, and record its metadata
+
+        The caller holds the lock of the object.
+        """
+        if self._index is None:
+            # stale metadata mustn't outlive the content it describes.
+            _remove_file(full_path + METADATA_SUFFIX)
+        _replace_file(temp_path, full_path, self.fsync)
+        self._record_object(
+            bucket_name, object_key, full_path, md5, content_type, content_encoding)
+
+    def _record_object(self, bucket_name, object_key, full_path, md5,
+                       content_type=None, content_encoding=None):
+        """Record metadata of a written object"""
+        stat_result = os.stat(full_path)
+        self._put_metadata(bucket_name, IndexEntry(
+            object_key=object_key,
+            path=os.path.relpath(full_path, self._root_dir),
+            size=stat_result.st_size,
+            mtime_ns=stat_result.st_mtime_ns,
+            content_type=content_type or None,
+            content_encoding=content_encoding or None,
+            md5=md5,
+        ))
+
+    def _get_codec(self, bucket_name, object_key):
+        """Return the Compression content is encoded with
+
+        Content without metadata is taken as gzipped. None if metadata tells
+        content isn't gzip, zstd or lz4 encoded.
+        """
+        entry = self._get_metadata(bucket_name, object_key)
+        if entry is None:
+            return Compression.GZIP
+        return get_codec(entry.content_encoding)
 
     def create_bucket(self, bucket_name):
         """
@@ -31,6 +230,7 @@ class LocalStorage(object):
         bucket_path = os.path.join(self._root_dir, bucket_name)
         os.mkdir(bucket_path)
 
+    @instrumented
     def list_bucket_names(self):
         """Return list of bucket names
 
@@ -39,25 +239,60 @@ class LocalStorage(object):
         """
         bucket_names = []
         for x in os.listdir(self._root_dir):
-            if os.path.isdir(os.path.join(self._root_dir, x)):
+            if x != LOCK_DIRECTORY_NAME and os.path.isdir(os.path.join(self._root_dir, x)):
                 bucket_names += x,
         return bucket_names
 
+    @instrumented(bytes_sent=source_file_size)
+    @invalidates_memory_cache
+    @retried
     def upload_file(self, bucket_name, object_key, source_file_name,
-                    content_type=None, content_encoding=None):
+                    content_type=None, content_encoding=None, link=False,
+                    compression=None, compression_level=None):
         """
         Uploads a local file to a bucket
+
+        Content is compressed in chunks when compression is given, or gzipped
+        when content_encoding is 'gzip'. Otherwise it is copied by the kernel,
+        with a reflink where the file system supports it, and its MD5 isn't
+        recorded.
+
+        Kwargs:
+            link(bool): True to hard link the file instead of copying it, when
+                on the same file system. The file mustn't be modified in place
+                afterwards, or the object changes with it(default: False)
+            compression(str): 'gzip', 'zstd' or 'lz4'. content_encoding is set
+                to it
+            compression_level(int): Defaults to the codec's
         """
-        full_path = self._get_full_path(bucket_name, object_key)
-        if content_encoding == 'gzip':
-            with gzip.open(full_path, 'wb') as fw:
+        if compression is None and content_encoding == 'gzip':
+            compression = Compression.GZIP
+        full_path = self._get_write_path(bucket_name, object_key)
+        directory = os.path.dirname(full_path)
+        with _locked(self._lock_directory, full_path):
+            if compression:
                 with open(source_file_name, 'rb') as fr:
-                    fw.write(fr.read())
-        else:
-            shutil.copy(source_file_name, full_path)
+                    self._write_object(bucket_name, object_key, full_path,
+                                       counted_bytes_sent(iter_compress(
+                                           iter_chunks(fr), compression,
+                                           compression_level)),
+                                       content_type, str(compression))
+                return
 
+            temp_path = None
+            if link:
+                temp_path = _link_temp_file(source_file_name, directory)
+            if temp_path is None:
+                temp_path = _copy_temp_file(source_file_name, directory, self.fsync)
+            self._replace_object(bucket_name, object_key, full_path, temp_path, None,
+                                 content_type, content_encoding)
+
+    @instrumented(bytes_sent=buffer_size)
+    @invalidates_memory_cache
+    @retried
     def upload(self, bucket_name, object_key, buffer,
-               content_type='', content_encoding=''):
+               content_type='', content_encoding='',
+               compression=None, compression_level=None):
         """Upload content to a bucket
 
         Args:
@@ -66,20 +301,68 @@ class LocalStorage(object):
             object_key(str): Object key stored in bucket
         Kwargs:
             content_type(str): Type of Content
-            content_encoding(str): Encoding used on content for uploading
+            content_encoding(str): Encoding used on content for uploading.
+                Content is gzipped if 'gzip'
+            compression(str): 'gzip', 'zstd' or 'lz4'. content_encoding is set
+                to it
+            compression_level(int): Defaults to the codec's
         Returns:
             None
         """
         assert isinstance(buffer, bytes)
 
-        full_path = self._get_full_path(bucket_name, object_key)
-        if content_encoding == 'gzip':
-            with gzip.open(full_path, 'wb') as fw:
-                fw.write(buffer)
-        else:
-            with open(full_path, 'wb') as fw:
-                fw.write(buffer)
+        if compression is None and content_encoding == 'gzip':
+            compression = Compression.GZIP
+        chunks = [buffer]
+        if compression:
+            chunks = counted_bytes_sent(
+                iter_compress(chunks, compression, compression_level))
+            content_encoding = str(compression)
+
+        full_path = self._get_write_path(bucket_name, object_key)
+        with _locked(self._lock_directory, full_path):
+            self._write_object(bucket_name, object_key, full_path, chunks,
+                               content_type, content_encoding)
+
+    @instrumented
+    @invalidates_memory_cache
+    def upload_stream(self, bucket_name, object_key, stream,
+                      content_type=None, content_encoding=None, do_gzip=False,
+                      compression=None, compression_level=None):
+        """Upload content of a file-like object or an iterable to a bucket
+
+        Unlike ``upload``, content is gzipped only when do_gzip is True, the
+        same as the other storages.
 
+        Args:
+            bucket_name(str):  Bucket name to use
+            object_key(str): Object key stored in bucket
+            stream: Readable binary file-like object, or iterable of bytes
+        Kwargs:
+            content_type(str): Type of Content
+            content_encoding(str): Encoding used on content for uploading
+            do_gzip(bool): True to gzip content while uploading(default: False)
+            compression(str): 'gzip', 'zstd' or 'lz4'. content_encoding is set
+                to it
+            compression_level(int): Defaults to the codec's
+        Returns:
+            None
+        """
+        chunks = iter_chunks(stream)
+        if do_gzip:
+            compression = compression or Compression.GZIP
+        if compression:
+            chunks = iter_compress(chunks, compression, compression_level)
+            content_encoding = str(compression)
+
+        full_path = self._get_write_path(bucket_name, object_key)
+        with _locked(self._lock_directory, full_path):
+            self._write_object(bucket_name, object_key, full_path, chunks,
+                               content_type, content_encoding)
+
+    @instrumented
+    @memory_cached_exists
+    @retried_hedged
     def is_exists(self, bucket_name, object_key):
         """Check if an object exists in bucket
 
@@ -90,9 +373,97 @@ class LocalStorage(object):
         Returns:
             True if exists.
         """
+        if self._index is not None:
+            return self._index.get(bucket_name, object_key) is not None
+
         full_path = self._get_full_path(bucket_name, object_key)
         return os.path.exists(full_path)
 
+    @instrumented
+    @retried_hedged
+    def stat(self, bucket_name, object_key):
+        """Get metadata of an object
+
+        Metadata recorded when the object was written is used, without
+        reading the object. Objects written without it, by older versions,
+        get size and mtime of the file only.
+
+        Args:
+            bucket_name (str):  Bucket name to use
+            object_key (str): Object key stored in bucket
+        Returns:
+            ObjectInfo. etag is the MD5 of stored content if known, otherwise
+            derived from mtime and size
+        Raises:
+            FileNotFoundError: the object doesn't exist
+        """
+        entry = self._get_metadata(bucket_name, object_key)
+        if entry is not None:
+            return _entry_to_object_info(entry)
+        if self._index is not None:
+            raise FileNotFoundError(
+                'No such object: %s/%s' % (bucket_name, object_key))
+
+        full_path = self._get_full_path(bucket_name, object_key)
+        stat_result = os.stat(full_path)
+        return ObjectInfo(
+            object_key=object_key,
+            size=stat_result.st_size,
+            etag='%x-%x' % (stat_result.st_mtime_ns, stat_result.st_size),
+            md5=None,
+            updated=datetime.datetime.fromtimestamp(
+                stat_result.st_mtime, datetime.timezone.utc),
+            content_type=None,
+            content_encoding=None,
+        )
+
+    def iter_objects(self, bucket_name, prefix=None, delimiter=None,
+                     page_size=DEFAULT_INDEX_PAGE_SIZE):
+        """Iterate objects of a bucket lazily, in key order
+
+        Only the sharded layout keeps keys, so the flat layout can't list.
+
+        Args:
+            bucket_name(str):  Bucket name to use
+        Kwargs:
+            prefix(str): Only objects whose key starts with prefix
+            delimiter(str): Group keys containing delimiter after prefix into
+                common prefixes
+            page_size(int): Max entries read from the index at once
+        Yields:
+            ObjectInfo. Common prefixes are yielded with size None.
+        Raises:
+            NotImplementedError: the layout is flat
+        """
+        if self._index is None:
+            raise NotImplementedError(
+                "iter_objects needs layout='sharded'. "
+                "The flat layout doesn't keep object keys")
+
+        prefix = prefix or ''
+        start = None
+        while True:
+            entries = self._index.iter_entries(
+                bucket_name, prefix, start, page_size or DEFAULT_INDEX_PAGE_SIZE)
+            for entry in entries:
+                position = entry.object_key.find(delimiter, len(prefix)) \
+                    if delimiter else -1
+                if position < 0:
+                    yield _entry_to_object_info(entry)
+                    continue
+
+                common_prefix = entry.object_key[:position + len(delimiter)]
+                yield ObjectInfo(common_prefix, None, None, None, None, None, None)
+                # skip the rest of the common prefix with a new query.
+                start = prefix_end(common_prefix)
+                break
+            else:
+                return
+            if start is None:
+                return
+
+    @instrumented
+    @invalidates_memory_cache_renamed
     def rename(self, bucket_name, object_key, new_object_key):
         """Renames an object
 
@@ -106,52 +477,185 @@ class LocalStorage(object):
         assert(object_key != new_object_key), \
             "object_key can't be same to new_object_key"
 
-        shutil.move(
-            self._get_full_path(bucket_name, object_key),
-            self._get_full_path(bucket_name, new_object_key),
-        )
+        full_path = self._get_full_path(bucket_name, object_key)
+        new_full_path = self._get_write_path(bucket_name, new_object_key)
+        with _locked(self._lock_directory, full_path, new_full_path):
+            entry = self._get_metadata(bucket_name, object_key)
+            if entry is None and self._index is not None:
+                raise FileNotFoundError(
+                    'No such object: %s/%s' % (bucket_name, object_key))
+
+            # atomic, as both paths are in one file system.
+            os.replace(full_path, new_full_path)
+
+            if entry is None:
+                # metadata of the object replaced is stale.
+                _remove_file(new_full_path + METADATA_SUFFIX)
+                return
+            new_entry = entry._replace(
+                object_key=new_object_key,
+                path=os.path.relpath(new_full_path, self._root_dir),
+            )
+            if self._index is not None:
+                self._index.rename(bucket_name, object_key, new_entry)
+            else:
+                self._put_metadata(bucket_name, new_entry)
+                _remove_file(full_path + METADATA_SUFFIX)
 
+    @instrumented
+    @invalidates_memory_cache_copied
+    @retried
+    def copy(self, bucket_name, object_key, dst_bucket_name, dst_object_key):
+        """Copy an object, within or across buckets
+
+        Stored objects are never modified in place, so the copy is a hard link
+        sharing the source's blocks where possible, and a kernel copy
+        otherwise. Metadata is copied along.
+
+        Args:
+            bucket_name(str):  Bucket name of the source
+            object_key(str): Object Key of the source
+            dst_bucket_name(str): Bucket name of the copy
+            dst_object_key(str): Object Key of the copy
+        Returns:
+            None
+        """
+        full_path = self._get_full_path(bucket_name, object_key)
+        dst_full_path = self._get_write_path(dst_bucket_name, dst_object_key)
+        if full_path == dst_full_path:
+            return
+
+        with _locked(self._lock_directory, full_path, dst_full_path):
+            entry = self._get_metadata(bucket_name, object_key)
+            if entry is None and self._index is not None:
+                raise FileNotFoundError(
+                    'No such object: %s/%s' % (bucket_name, object_key))
+
+            directory = os.path.dirname(dst_full_path)
+            temp_path = _link_temp_file(full_path, directory)
+            if temp_path is None:
+                temp_path = _copy_temp_file(full_path, directory, self.fsync)
+
+            if entry is None:
+                _remove_file(dst_full_path + METADATA_SUFFIX)
+                _replace_file(temp_path, dst_full_path, self.fsync)
+                return
+            self._replace_object(
+                dst_bucket_name, dst_object_key, dst_full_path, temp_path,
+                entry.md5, entry.content_type, entry.content_encoding)
+
+    @instrumented(bytes_received=destination_file_size)
+    @retried
     def download_gzipped_to_file(self, bucket_name, object_key, destination_file_name,
                                  do_gunzip=False):
         """Download an object to local
 
+        Raw content is copied by the kernel, and compressed content is
+        decoded in chunks, reading ahead while decoding. gzip members recording
+        their size are inflated on several threads. The file is removed if the
+        download fails.
+
          Args:
              bucket_name(str):  Bucket name to use
              object_key(str): Object Key to rename
              destination_file_name(str): Local file path
         Kwargs:
-            do_gunzip(bool): True to gunzip(default: False)
+            do_gunzip(bool): True to decode gzip, zstd or lz4 encoded
+                content(default: False)
         Returns:
             None
          """
+        codec = self._get_codec(bucket_name, object_key) if do_gunzip else None
         src_full_path = self._get_full_path(bucket_name, object_key)
-        dest_full_path = self._get_full_path(bucket_name, object_key)
-        if do_gunzip:
-            with gzip.open(src_full_path, 'rb') as fr:
-                with open(dest_full_path, 'wb') as fw:
-                    fw.write(fr.read())
-        else:
-            shutil.copy(src_full_path, dest_full_path)
+        with open(src_full_path, 'rb') as fr:
+            try:
+                if codec is not None:
+                    with open(destination_file_name, 'wb') as fw:
+                        for data in iter_decompress_parallel(
+                                iter_chunks(fr), codec, prefetch=_is_multi_chunk(fr)):
+                            fw.write(data)
+                else:
+                    fd = os.open(destination_file_name,
+                                 os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+                    try:
+                        copy_fd(fr.fileno(), fd)
+                    finally:
+                        os.close(fd)
+            except BaseException:
+                _remove_file(destination_file_name)
+                raise
 
-    def download_gzipped(self, bucket_name, object_key, do_gunzip=False):
+    @instrumented(bytes_received=result_size)
+    @memory_cached_content
+    @retried
+    def download_gzipped(self, bucket_name, object_key, do_gunzip=False,
+                         as_bytearray=False):
         """Download an gzipped object content to memory
 
+        Compressed content is decoded as ``download_gzipped_to_file`` does.
+
         Args:
             bucket_name(str):  Bucket name to use
             object_key(str): Object Key to rename
         Kwargs:
-            do_gunzip(bool): True to gunzip(default: False)
+            do_gunzip(bool): True to decode gzip, zstd or lz4 encoded content
+                (default: False). Content stored with another encoding is
+                returned as is
+            as_bytearray(bool): True to read content into one bytearray and
+                return it without a final bytes copy(default: False)
         Returns:
             bytes. Content stored in the object
+            bytearray. if as_bytearray is True
         """
+        codec = self._get_codec(bucket_name, object_key) if do_gunzip else None
         full_path = self._get_full_path(bucket_name, object_key)
-        if do_gunzip:
-            with gzip.open(full_path, 'rb') as fr:
-                return fr.read()
-        else:
-            with open(full_path, 'rb') as fr:
+        with open(full_path, 'rb') as fr:
+            if codec is not None:
+                buffer = decompress_parallel_to_bytearray(
+                    iter_chunks(fr), codec, prefetch=_is_multi_chunk(fr))
+                return buffer if as_bytearray else bytes(buffer)
+            if not as_bytearray:
                 return fr.read()
+            buffer = bytearray(os.fstat(fr.fileno()).st_size)
+            del buffer[fr.readinto(buffer):]
+            return buffer
 
+    @instrumented
+    def open_read(self, bucket_name, object_key):
+        """Open an object for reading without loading it
+
+        Args:
+            bucket_name(str):  Bucket name to use
+            object_key(str): Object Key to read
+        Returns:
+            io.FileIO. Seekable raw binary file-like object of stored content
+        """
+        full_path = self._get_full_path(bucket_name, object_key)
+        return open(full_path, 'rb', buffering=0)
+
+    @instrumented
+    def open_mmap(self, bucket_name, object_key, random_access=True):
+        """Map an object into memory, for zero-copy random access
+
+        Content is stored content, i.e. still gzipped if stored gzipped. The
+        mapping keeps showing the object as it was when opened, even if it is
+        overwritten or deleted meanwhile, and its pages are shared with other
+        processes mapping or reading it.
+
+        Args:
+            bucket_name(str):  Bucket name to use
+            object_key(str): Object Key to map
+        Kwargs:
+            random_access(bool): True to advise the kernel against read-ahead,
+                for scattered small reads(default: True)
+        Returns:
+            MappedObject. Close it, or use it as a context manager
+        """
+        return MappedObject(self._get_full_path(bucket_name, object_key), random_access)
+
+    @instrumented
+    @invalidates_memory_cache
+    @retried
     def delete(self, bucket_name, object_key):
         """Delete an object from bucket
 
@@ -163,4 +667,289 @@ class LocalStorage(object):
         @note: No exception raises although object doesn't exist.
         """
         full_path = self._get_full_path(bucket_name, object_key)
+        with _locked(self._lock_directory, full_path):
+            # metadata goes first. An object left without it is still served.
+            if self._index is None:
+                _remove_file(full_path + METADATA_SUFFIX)
+            else:
+                self._index.delete(bucket_name, object_key)
+            os.remove(full_path)
+
+
+class MappedObject(object):
+    """Read-only memory map of a stored object
+
+    ``view`` is a memoryview of the whole content; slicing it copies nothing.
+    Release memoryviews taken from it before closing.
+
+    Args:
+        full_path(str): File path
+    Kwargs:
+        random_access(bool): True to advise the kernel against read-ahead
+    """
+
+    def __init__(self, full_path, random_access=True):
+        fd = os.open(full_path, os.O_RDONLY)
+        try:
+            self.size = os.fstat(fd).st_size
+            # empty files can't be mapped.
+            self._mmap = None
+            if self.size:
+                self._mmap = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        finally:
+            # the mapping keeps its own reference to the file.
+            os.close(fd)
+
+        if self._mmap is None:
+            self._view = memoryview(b'')
+        else:
+            if random_access and hasattr(self._mmap, 'madvise'):
+                self._mmap.madvise(mmap.MADV_RANDOM)
+            self._view = memoryview(self._mmap)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        return self.view[index]
+
+    @property
+    def closed(self):
+        return self._view is None
+
+    @property
+    def view(self):
+        if self._view is None:
+            raise ValueError('mapped object is closed')
+        return self._view
+
+    def read(self, offset, size):
+        """Return a copy of ``size`` bytes from ``offset``
+
+        Returns:
+            bytes. Shorter at the end of content
+        """
+        return self.view[offset:offset + size].tobytes()
+
+    def close(self):
+        """Unmap content
+
+        Raises:
+            BufferError: memoryviews taken from ``view`` are still alive
+        """
+        if self._view is None:
+            return
+        self._view.release()
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                self._view = memoryview(self._mmap)
+                raise BufferError(
+                    'memoryviews of the mapped object must be released before closing')
+        self._view = None
+
+
+def _write_chunks(full_path, chunks, fsync=False):
+    """Write chunks to a file as a whole, so readers never see it half written
+
+    Args:
+        full_path(str): File path
+        chunks(iterable): bytes chunks
+    Kwargs:
+        fsync(bool): True to flush the file and the directory to disk
+    Returns:
+        str. Hex MD5 of written content
+    """
+    temp_path, md5 = _write_temp_file(os.path.dirname(full_path), chunks, fsync)
+    _replace_file(temp_path, full_path, fsync)
+    return md5
+
+
+def _make_temp_file(directory):
+    """Create a temporary file in a directory, with the mode open() gives
+
+    mkstemp makes files readable by their owner only, and they become
+    objects and metadata files.
+
+    Returns:
+        tuple. File descriptor and path
+    """
+    fd, temp_path = tempfile.mkstemp(prefix=TEMP_PREFIX, dir=directory)
+    try:
+        os.fchmod(fd, _FILE_MODE)
+    except BaseException:
+        os.close(fd)
+        _remove_file(temp_path)
+        raise
+    return fd, temp_path
+
+
+def _remove_stale_temp_files(directory):
+    """Remove temporary files which crashed writers left in a directory"""
+    stale_before = time.time() - STALE_TEMP_FILE_AGE
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.name.startswith(TEMP_PREFIX):
+                    continue
+                try:
+                    if entry.stat().st_mtime < stale_before:
+                        _remove_file(entry.path)
+                except FileNotFoundError:
+                    pass
+    except FileNotFoundError:
+        pass
+
+
+def _write_temp_file(directory, chunks, fsync=False):
+    """Write chunks to a new temporary file in a directory
+
+    Returns:
+        tuple. Path of the file and hex MD5 of written content
+    """
+    fd, temp_path = _make_temp_file(directory)
+    try:
+        md5 = hashlib.md5()
+        with os.fdopen(fd, 'wb') as fw:
+            for chunk in chunks:
+                md5.update(chunk)
+                fw.write(chunk)
+            if fsync:
+                fw.flush()
+                os.fsync(fw.fileno())
+    except BaseException:
+        _remove_file(temp_path)
+        raise
+    return temp_path, md5.hexdigest()
+
+
+def _replace_file(temp_path, full_path, fsync=False):
+    try:
+        os.replace(temp_path, full_path)
+    except BaseException:
+        _remove_file(temp_path)
+        raise
+    if fsync:
+        _fsync_directory(os.path.dirname(full_path))
+
+
+def _copy_temp_file(source_file_name, directory, fsync=False):
+    """Copy a file to a new temporary file in a directory, in the kernel
+
+    Returns:
+        str. Path of the copy
+    """
+    fd, temp_path = _make_temp_file(directory)
+    try:
+        try:
+            src_fd = os.open(source_file_name, os.O_RDONLY)
+            try:
+                copy_fd(src_fd, fd)
+            finally:
+                os.close(src_fd)
+            if fsync:
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+    except BaseException:
+        _remove_file(temp_path)
+        raise
+    return temp_path
+
+
+def _link_temp_file(source_file_name, directory):
+    """Hard link a file with a new temporary name in a directory
+
+    Returns:
+        str. Path of the link. None if the file can't be linked there
+    """
+    temp_path = os.path.join(directory, TEMP_PREFIX + uuid.uuid4().hex)
+    try:
+        os.link(source_file_name, temp_path)
+    except FileNotFoundError:
+        raise
+    except OSError:
+        # other file system, or no hard links there.
+        return None
+    return temp_path
+
+
+def _fsync_directory(directory):
+    """Make renames and removals in a directory durable"""
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextlib.contextmanager
+def _locked(lock_directory, *full_paths):
+    """Hold exclusive locks of objects, across threads and processes
+
+    Objects share LOCK_STRIPES lock files in lock_directory, picked by hash
+    of their path, so lock files don't pile up. Locks are taken in lock file
+    order, so callers locking the same objects never deadlock.
+    """
+    if fcntl is None:
+        yield
+        return
+
+    stripes = sorted(set(
+        int(hashlib.md5(x.encode('utf-8')).hexdigest()[:8], 16) % LOCK_STRIPES
+        for x in full_paths))
+    fds = []
+    try:
+        for stripe in stripes:
+            fd = os.open(os.path.join(lock_directory, '%02x' % stripe),
+                         os.O_RDWR | os.O_CREAT, 0o666)
+            fds.append(fd)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        # closing releases the lock.
+        for fd in reversed(fds):
+            os.close(fd)
+
+
+def _is_multi_chunk(f):
+    """True if a file is read in more than one chunk, and worth reading ahead"""
+    return os.fstat(f.fileno()).st_size > DEFAULT_CHUNK_SIZE
+
+
+def _remove_file(full_path):
+    try:
         os.remove(full_path)
+    except FileNotFoundError:
+        pass
+
+
+def _get_umask():
+    # umask can only be read by setting it, so read it once at import.
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+
+# mode of written files, as open() creates them.
+_FILE_MODE = 0o666 & ~_get_umask()
+
+
+def _entry_to_object_info(entry):
+    return ObjectInfo(
+        object_key=entry.object_key,
+        size=entry.size,
+        etag=entry.md5 or '%x-%x' % (entry.mtime_ns, entry.size),
+        md5=entry.md5,
+        updated=datetime.datetime.fromtimestamp(
+            entry.mtime_ns / 1e9, datetime.timezone.utc),
+        content_type=entry.content_type,
+        content_encoding=entry.content_encoding,
+    )
@@ -0,0 +1,290 @@
+"""
+:since: 2026-10-18
+
+In-process cache of existence checks and small object contents.
+
+A client built with ``memory_cache=MemoryCache(...)`` answers ``is_exists``
+and ``download_gzipped`` from memory while entries are fresh, and drops the
+entries of keys it writes.
+
+A cache can be shared by clients. Entries are keyed by a namespace of the
+client as well: S3 and GCS clients share entries when they share their SDK
+client, and local clients when they share their root directory.
+"""
+import collections
+import functools
+import itertools
+import threading
+import time
+import weakref
+
+from cloud_storage.instrumentation import count_event
+
+DEFAULT_MEMORY_CACHE_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MEMORY_CACHE_TTL = 60
+DEFAULT_MEMORY_CACHE_MAX_OBJECT_SIZE = 256 * 1024
+
+# accounted size of an existence entry.
+EXISTS_ENTRY_SIZE = 64
+# keys share this many version counters, by hash.
+VERSION_STRIPES = 4096
+
+_EXISTS = 'exists'
+_CONTENT = 'content'
+
+
+class MemoryCache(object):
+    """Thread-safe LRU cache with TTL under a byte budget
+
+    Kwargs:
+        max_bytes(int): Budget of cached contents and entries
+        ttl(float): Seconds an entry stays fresh
+        negative_ttl(float): Seconds a "doesn't exist" entry stays fresh.
+            Defaults to ttl
+        max_object_size(int): Larger contents aren't cached
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MEMORY_CACHE_MAX_BYTES,
+                 ttl=DEFAULT_MEMORY_CACHE_TTL, negative_ttl=None,
+                 max_object_size=DEFAULT_MEMORY_CACHE_MAX_OBJECT_SIZE):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.max_object_size = max_object_size
+        self._lock = threading.Lock()
+        # (kind, namespace, bucket_name, object_key, do_gunzip) to
+        # (expires_at, value, size)
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        # bumped by invalidations of the keys hashing to each. A value fetched
+        # while its key's counter changed may be stale, and isn't cached.
+        # Keys sharing a counter only skip caching now and then.
+        self._versions = [0] * VERSION_STRIPES
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        """Return cache counters
+
+        Returns:
+            dict. hits, misses, evictions, entries and bytes
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+            }
+
+    def version(self, bucket_name, object_key, namespace=None):
+        """Return the version of an object's entries, to pass to ``set_*``
+        once its value is fetched
+        """
+        return self._versions[self._stripe(namespace, bucket_name, object_key)]
+
+    def get_exists(self, bucket_name, object_key, namespace=None):
+        """
+        Returns:
+            bool. None if not cached
+        """
+        return self._get((_EXISTS, namespace, bucket_name, object_key, None))
+
+    def set_exists(self, bucket_name, object_key, exists, version, namespace=None):
+        ttl = self.ttl if exists else self.negative_ttl
+        self._set((_EXISTS, namespace, bucket_name, object_key, None),
+                  exists, EXISTS_ENTRY_SIZE, ttl, version)
+
+    def get_content(self, bucket_name, object_key, do_gunzip, namespace=None):
+        """
+        Returns:
+            bytes. None if not cached
+        """
+        return self._get((_CONTENT, namespace, bucket_name, object_key, bool(do_gunzip)))
+
+    def set_content(self, bucket_name, object_key, do_gunzip, content, version,
+                    namespace=None):
+        if len(content) > self.max_object_size:
+            return
+        self._set((_CONTENT, namespace, bucket_name, object_key, bool(do_gunzip)),
+                  bytes(content), len(content), self.ttl, version)
+
+    def invalidate(self, bucket_name, object_key, namespace=None):
+        """Drop every entry of an object"""
+        with self._lock:
+            self._versions[self._stripe(namespace, bucket_name, object_key)] += 1
+            for key in ((_EXISTS, namespace, bucket_name, object_key, None),
+                        (_CONTENT, namespace, bucket_name, object_key, False),
+                        (_CONTENT, namespace, bucket_name, object_key, True)):
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self._bytes -= entry[2]
+
+    def clear(self):
+        with self._lock:
+            self._versions = [x + 1 for x in self._versions]
+            self._entries.clear()
+            self._bytes = 0
+
+    @staticmethod
+    def _stripe(namespace, bucket_name, object_key):
+        return hash((namespace, bucket_name, object_key)) % VERSION_STRIPES
+
+    def _get(self, key):
+        with self._lock:
+            try:
+                expires_at, value, size = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def _set(self, key, value, size, ttl, version):
+        if ttl <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            if version != self._versions[self._stripe(*key[1:4])]:
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._entries[key] = (time.monotonic() + ttl, value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+
+def memory_cached_exists(f):
+    """Answer ``is_exists(bucket_name, object_key)`` from self.memory_cache"""
+    @functools.wraps(f)
+    def decorate(self, bucket_name, object_key):
+        memory_cache = self.memory_cache
+        if memory_cache is None:
+            return f(self, bucket_name, object_key)
+
+        namespace = self._memory_cache_namespace()
+        exists = memory_cache.get_exists(bucket_name, object_key, namespace)
+        if exists is None:
+            version = memory_cache.version(bucket_name, object_key, namespace)
+            exists = f(self, bucket_name, object_key)
+            memory_cache.set_exists(bucket_name, object_key, exists, version, namespace)
+        else:
+            count_event('cache_hits')
+        return exists
+    return decorate
+
+
+def memory_cached_content(f):
+    """Answer ``download_gzipped`` from self.memory_cache
+
+    Calls with as_bytearray skip the cache, as the caller owns the buffer.
+    """
+    @functools.wraps(f)
+    def decorate(self, bucket_name, object_key, do_gunzip=False, **kwargs):
+        memory_cache = self.memory_cache
+        if memory_cache is None or kwargs.get('as_bytearray'):
+            return f(self, bucket_name, object_key, do_gunzip, **kwargs)
+
+        namespace = self._memory_cache_namespace()
+        content = memory_cache.get_content(bucket_name, object_key, do_gunzip, namespace)
+        if content is None:
+            version = memory_cache.version(bucket_name, object_key, namespace)
+            content = f(self, bucket_name, object_key, do_gunzip, **kwargs)
+            memory_cache.set_content(
+                bucket_name, object_key, do_gunzip, content, version, namespace)
+        else:
+            count_event('cache_hits')
+        return content
+    return decorate
+
+
+_object_tokens = weakref.WeakKeyDictionary()
+_object_token_counter = itertools.count()
+_object_tokens_lock = threading.Lock()
+
+
+def object_token(obj):
+    """Return a number identifying a live object
+
+    Unlike ``id``, it is never reused by another object, so cache entries
+    of a collected client can't be served to a new one.
+    """
+    with _object_tokens_lock:
+        token = _object_tokens.get(obj)
+        if token is None:
+            token = _object_tokens[obj] = next(_object_token_counter)
+        return token
+
+
+def invalidates_memory_cache(f):
+    """Drop self.memory_cache entries of the key a write call touches"""
+    @functools.wraps(f)
+    def decorate(self, bucket_name, object_key, *args, **kwargs):
+        try:
+            return f(self, bucket_name, object_key, *args, **kwargs)
+        finally:
+            if self.memory_cache is not None:
+                self.memory_cache.invalidate(
+                    bucket_name, object_key, self._memory_cache_namespace())
+    return decorate
+
+
+def invalidates_memory_cache_renamed(f):
+    """Drop self.memory_cache entries of both keys of a rename call"""
+    @functools.wraps(f)
+    def decorate(self, bucket_name, object_key, new_object_key, *args, **kwargs):
+        try:
+            return f(self, bucket_name, object_key, new_object_key, *args, **kwargs)
+        finally:
+            if self.memory_cache is not None:
+                self.memory_cache.invalidate(
+                    bucket_name, object_key, self._memory_cache_namespace())
+                self.memory_cache.invalidate(
+                    bucket_name, new_object_key, self._memory_cache_namespace())
+    return decorate
+
+
+def invalidates_memory_cache_copied(f):
+    """Drop self.memory_cache entries of the destination key of a copy call"""
+    @functools.wraps(f)
+    def decorate(self, bucket_name, object_key, dst_bucket_name, dst_object_key,
+                 *args, **kwargs):
+        try:
+            return f(self, bucket_name, object_key, dst_bucket_name, dst_object_key,
+                     *args, **kwargs)
+        finally:
+            if self.memory_cache is not None:
+                self.memory_cache.invalidate(
+                    dst_bucket_name, dst_object_key, self._memory_cache_namespace())
+    return decorate
+
+
+def invalidates_memory_cache_many(f):
+    """Drop self.memory_cache entries of every key a batch write call touches"""
+    @functools.wraps(f)
+    def decorate(self, bucket_name, object_keys, *args, **kwargs):
+        object_keys = list(object_keys)
+        try:
+            return f(self, bucket_name, object_keys, *args, **kwargs)
+        finally:
+            if self.memory_cache is not None:
+                for object_key in object_keys:
+                    self.memory_cache.invalidate(
+                        bucket_name, object_key, self._memory_cache_namespace())
+    return decorate
+
+
+__all__ = (
+    'MemoryCache',
+)
@@ -0,0 +1,36 @@
+"""
+:since: 2026-10-18
+"""
+import collections
+
+
+class BatchItemResult(
+        collections.namedtuple('BatchItemResult', 'object_key result error')):
+    """Outcome of one item in a batch call
+
+    ``error`` is one of ``cloud_storage.excepts`` exceptions, or None on
+    success.
+    """
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class ObjectInfo(collections.namedtuple(
+        'ObjectInfo',
+        'object_key size etag md5 updated content_type content_encoding')):
+    """Metadata of a stored object
+
+    ``etag`` changes whenever the object is overwritten. ``md5`` is the hex
+    MD5 of stored content, or None when the storage doesn't know it.
+    ``updated`` is a timezone aware datetime.
+    """
+    __slots__ = ()
+
+
+__all__ = (
+    'BatchItemResult',
+    'ObjectInfo',
+)
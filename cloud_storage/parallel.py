@@ -0,0 +1,410 @@
+"""
+:since: 2026-10-18
+
+Ranged parallel transfers shared by cloud storage clients.
+"""
+import collections
+import concurrent.futures
+import functools
+import hashlib
+import os
+import queue
+import threading
+
+from cloud_storage.compression import DEFAULT_CHUNK_SIZE
+from cloud_storage.instrumentation import with_call_event
+from cloud_storage.retry import is_transient_error
+
+DEFAULT_MULTIPART_THRESHOLD = 8 * 1024 * 1024
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+DEFAULT_MAX_CONCURRENCY = 10
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+_END = object()
+
+
+class IntegrityError(IOError):
+    pass
+
+
+def split_ranges(size, part_size):
+    """Split ``size`` bytes into inclusive (start, end) ranges
+
+    Args:
+        size(int): Total size
+        part_size(int): Size of each range but the last one
+    Returns:
+        list. (start, end) tuples
+    """
+    return [
+        (start, min(start + part_size, size) - 1)
+        for start in range(0, size, part_size)
+    ]
+
+
+def run_parts(func, args_list, max_concurrency):
+    """Call ``func`` for every args in ``args_list`` concurrently
+
+    The first error cancels pending calls and is raised.
+
+    Returns:
+        list. Results in the order of ``args_list``
+    """
+    if not args_list:
+        return []
+    max_concurrency = max(1, min(max_concurrency, len(args_list)))
+    func = with_call_event(func)
+    with concurrent.futures.ThreadPoolExecutor(max_concurrency) as executor:
+        futures = [executor.submit(func, *args) for args in args_list]
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                future.result()
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        return [future.result() for future in futures]
+
+
+def download_ranges(fetch_range, size, write, part_size=DEFAULT_PART_SIZE,
+                    max_concurrency=DEFAULT_MAX_CONCURRENCY):
+    """Fetch ``size`` bytes as concurrent byte ranges
+
+    Args:
+        fetch_range(callable): fetch_range(start, end) returns bytes of the
+            inclusive range
+        size(int): Total size
+        write(callable): write(offset, data) stores a fetched range
+    Kwargs:
+        part_size(int): Size of each range
+        max_concurrency(int): Max concurrent range requests
+    Raises:
+        IntegrityError: a range came back with an unexpected length
+    """
+    def fetch_and_write(start, end):
+        write(start, _fetch_checked(fetch_range, start, end))
+
+    run_parts(fetch_and_write, split_ranges(size, part_size), max_concurrency)
+
+
+def iter_ranges(fetch_range, size, part_size=DEFAULT_PART_SIZE,
+                max_concurrency=DEFAULT_MAX_CONCURRENCY):
+    """Yield ``size`` bytes as byte ranges fetched concurrently, in order
+
+    At most max_concurrency ranges are fetched or waiting to be yielded at
+    once, so memory stays bounded while the consumer processes content.
+
+    Args:
+        fetch_range(callable): fetch_range(start, end) returns bytes of the
+            inclusive range
+        size(int): Total size
+    Kwargs:
+        part_size(int): Size of each range
+        max_concurrency(int): Max concurrent range requests
+    Yields:
+        bytes. Content of each range
+    Raises:
+        IntegrityError: a range came back with an unexpected length
+    """
+    ranges = split_ranges(size, part_size)
+    if not ranges:
+        return
+    max_concurrency = max(1, min(max_concurrency, len(ranges)))
+    fetch_checked = with_call_event(_fetch_checked)
+    with concurrent.futures.ThreadPoolExecutor(max_concurrency) as executor:
+        pending = collections.deque()
+        try:
+            for start, end in ranges:
+                if len(pending) >= max_concurrency:
+                    yield pending.popleft().result()
+                pending.append(executor.submit(fetch_checked, fetch_range, start, end))
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _fetch_checked(fetch_range, start, end):
+    data = fetch_range(start, end)
+    if len(data) != end - start + 1:
+        raise IntegrityError(
+            'range %d-%d returned %d bytes' % (start, end, len(data)))
+    return data
+
+
+def download_ranges_to_file(fetch_range, size, destination_file_name,
+                            expected_md5=None, part_size=DEFAULT_PART_SIZE,
+                            max_concurrency=DEFAULT_MAX_CONCURRENCY):
+    """Fetch ``size`` bytes as concurrent byte ranges into a file
+
+    The file's blocks are allocated up front with ``os.posix_fallocate``
+    where the platform and file system support it, so concurrent writes
+    don't fragment it; elsewhere it is only extended to ``size``. Each range
+    is then written at its offset with ``os.pwrite``. The file is removed if
+    anything fails.
+
+    Args:
+        fetch_range(callable): fetch_range(start, end) returns bytes of the
+            inclusive range
+        size(int): Total size
+        destination_file_name(str): Local file path
+    Kwargs:
+        expected_md5(str): Hex MD5 to verify the file with, if known
+        part_size(int): Size of each range
+        max_concurrency(int): Max concurrent range requests
+    Raises:
+        IntegrityError: the file doesn't match ``size`` or ``expected_md5``
+    """
+    fd = os.open(destination_file_name, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        try:
+            _allocate(fd, size)
+            written_lock = threading.Lock()
+            total_written = [0]
+
+            def write(offset, data):
+                view = memoryview(data)
+                while view:
+                    written = os.pwrite(fd, view, offset)
+                    view = view[written:]
+                    offset += written
+                with written_lock:
+                    total_written[0] += len(data)
+
+            download_ranges(fetch_range, size, write, part_size, max_concurrency)
+            if total_written[0] != size:
+                raise IntegrityError('%d bytes of %d were written to %s' % (
+                    total_written[0], size, destination_file_name))
+        finally:
+            os.close(fd)
+
+        if expected_md5 is not None:
+            md5 = hashlib.md5()
+            with open(destination_file_name, 'rb') as f:
+                for chunk in iter(lambda: f.read(DEFAULT_CHUNK_SIZE), b''):
+                    md5.update(chunk)
+            _verify_md5(md5.hexdigest(), expected_md5)
+    except BaseException:
+        os.remove(destination_file_name)
+        raise
+
+
+def _allocate(fd, size):
+    """Allocate ``size`` bytes of a file, or at least extend it to ``size``"""
+    if size and hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(fd, 0, size)
+            return
+        except OSError:
+            # e.g. not supported by the file system.
+            pass
+    os.ftruncate(fd, size)
+
+
+def download_ranges_to_bytearray(fetch_range, size, expected_md5=None,
+                                 part_size=DEFAULT_PART_SIZE,
+                                 max_concurrency=DEFAULT_MAX_CONCURRENCY):
+    """Fetch ``size`` bytes as concurrent byte ranges into a bytearray
+
+    Args:
+        fetch_range(callable): fetch_range(start, end) returns bytes of the
+            inclusive range
+        size(int): Total size
+    Kwargs:
+        expected_md5(str): Hex MD5 to verify content with, if known
+        part_size(int): Size of each range
+        max_concurrency(int): Max concurrent range requests
+    Returns:
+        bytearray. Content
+    Raises:
+        IntegrityError: content doesn't match ``expected_md5``
+    """
+    buffer = bytearray(size)
+    with memoryview(buffer) as view:
+        def write(offset, data):
+            view[offset:offset + len(data)] = data
+
+        download_ranges(fetch_range, size, write, part_size, max_concurrency)
+
+    if expected_md5 is not None:
+        _verify_md5(hashlib.md5(buffer).hexdigest(), expected_md5)
+    return buffer
+
+
+def upload_file_parts(upload_part, source_file_name, part_size=DEFAULT_PART_SIZE,
+                      max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                      max_attempts=DEFAULT_MAX_ATTEMPTS, retry_policy=None):
+    """Upload a file as concurrent parts
+
+    Parts that fail with transient errors are uploaded again, up to
+    ``max_attempts`` times in total, or as ``retry_policy`` retries calls,
+    while parts which succeeded are kept.
+
+    Args:
+        upload_part(callable): upload_part(part_number, data) uploads one part
+            and returns a token to assemble the object with. part_number
+            starts from 1.
+        source_file_name(str): Local file path
+    Kwargs:
+        part_size(int): Size of each part
+        max_concurrency(int): Max concurrent part uploads
+        max_attempts(int): Max times to upload each part
+        retry_policy(RetryPolicy): Retries each part instead of max_attempts
+    Returns:
+        list. Token of each part, in part order
+    """
+    fd = os.open(source_file_name, os.O_RDONLY)
+    try:
+        ranges = split_ranges(os.fstat(fd).st_size, part_size)
+        return run_parts_with_retries(
+            lambda part_number, start, end: upload_part(
+                part_number, os.pread(fd, end - start + 1, start)),
+            [(part_number, start, end)
+             for part_number, (start, end) in enumerate(ranges, 1)],
+            max_concurrency, max_attempts, retry_policy,
+        )
+    finally:
+        os.close(fd)
+
+
+def run_parts_with_retries(func, args_list, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                           max_attempts=DEFAULT_MAX_ATTEMPTS, retry_policy=None):
+    """Call ``func`` for every args in ``args_list`` concurrently
+
+    Calls that fail with transient errors are made again, up to
+    ``max_attempts`` times in total, while results of calls which succeeded
+    are kept. Given a ``retry_policy``, each call is retried by it instead,
+    with its backoff and budget. A permanent error cancels pending calls and
+    is raised.
+
+    Returns:
+        list. Results in the order of ``args_list``
+    """
+    if retry_policy is not None:
+        # calls run in worker threads, so the policy retries each on its own.
+        func = functools.partial(retry_policy.call, func)
+        max_attempts = 1
+    results = [None] * len(args_list)
+
+    def call(index):
+        results[index] = func(*args_list[index])
+
+    pending = list(range(len(args_list)))
+    for _ in range(max_attempts):
+        errors = _run_all(call, pending, max_concurrency)
+        if not errors:
+            return results
+        pending = sorted(errors)
+        for index in pending:
+            if not is_transient_error(errors[index]):
+                raise errors[index]
+    raise errors[pending[0]]
+
+
+def _run_all(func, args, max_concurrency):
+    """Call ``func(arg)`` for every arg concurrently, whether others fail
+
+    Transient errors don't stop other calls, but the first permanent error
+    cancels pending ones, as the transfer fails anyway.
+
+    Returns:
+        dict. arg to exception, for calls which failed
+    """
+    errors = {}
+    if not args:
+        return errors
+    max_concurrency = max(1, min(max_concurrency, len(args)))
+    func = with_call_event(func)
+    with concurrent.futures.ThreadPoolExecutor(max_concurrency) as executor:
+        futures = {executor.submit(func, arg): arg for arg in args}
+        for future in concurrent.futures.as_completed(futures):
+            if future.cancelled():
+                continue
+            error = future.exception()
+            if error is not None:
+                errors[futures[future]] = error
+                if not is_transient_error(error):
+                    for pending in futures:
+                        pending.cancel()
+    return errors
+
+
+def _verify_md5(md5, expected_md5):
+    if md5 != expected_md5:
+        raise IntegrityError('md5 mismatch: %s != %s' % (md5, expected_md5))
+
+
+def iter_prefetched(iterable):
+    """Yield items of an iterable, fetching the next one in the background
+
+    Useful over paginated listings: the next page is requested while the
+    caller processes the current one.
+    """
+    iterator = iter(iterable)
+    fetch = with_call_event(next)
+    with concurrent.futures.ThreadPoolExecutor(1) as executor:
+        future = executor.submit(fetch, iterator, _END)
+        while True:
+            item = future.result()
+            if item is _END:
+                return
+            future = executor.submit(fetch, iterator, _END)
+            yield item
+
+
+def iter_merged(iterables, max_concurrency=DEFAULT_MAX_CONCURRENCY, buffer_size=None):
+    """Yield items of many iterables consumed concurrently
+
+    Items of one iterable keep their order, but items of different ones
+    interleave. The first error stops everything and is raised.
+
+    Args:
+        iterables(list): Iterables to consume
+    Kwargs:
+        max_concurrency(int): Max iterables consumed at once
+        buffer_size(int): Max items waiting to be yielded. Defaults to
+            twice max_concurrency
+    """
+    iterables = list(iterables)
+    if not iterables:
+        return
+    max_concurrency = max(1, min(max_concurrency, len(iterables)))
+    items = queue.Queue(buffer_size or max_concurrency * 2)
+    stopped = threading.Event()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def consume(iterable):
+        try:
+            for item in iterable:
+                if stopped.is_set():
+                    return
+                put((item, None))
+        except BaseException as e:
+            put((_END, e))
+        else:
+            put((_END, None))
+
+    with concurrent.futures.ThreadPoolExecutor(max_concurrency) as executor:
+        for iterable in iterables:
+            executor.submit(consume, iterable)
+        try:
+            remaining = len(iterables)
+            while remaining:
+                item, error = items.get()
+                if error is not None:
+                    raise error
+                if item is _END:
+                    remaining -= 1
+                else:
+                    yield item
+        finally:
+            stopped.set()
@@ -0,0 +1,269 @@
+"""
+:since: 2026-10-18
+
+Retries with backoff, retry budgets and hedged reads for storage calls.
+
+A client built with ``retry_policy=RetryPolicy(...)`` retries idempotent
+calls failing with transient errors: server errors, throttling and network
+errors. Calls which aren't safe to repeat as a whole, i.e. ``rename`` and
+``upload_stream``, aren't retried; ``rename`` is made of retried copy and
+delete calls instead. Multipart uploads and copies retry each part and
+request, rather than the whole transfer.
+"""
+import concurrent.futures
+import functools
+import random
+import threading
+import time
+
+import botocore.exceptions
+import google.api_core.exceptions
+import requests.exceptions
+import urllib3.exceptions
+
+from cloud_storage.excepts import (
+    CloudStorageServerErrorException,
+    CloudStorageTooManyRequestsException,
+)
+from cloud_storage.instrumentation import count_event
+
+DEFAULT_RETRY_MAX_ATTEMPTS = 3
+DEFAULT_RETRY_BASE_DELAY = 0.1
+DEFAULT_RETRY_MAX_DELAY = 5.0
+DEFAULT_RETRY_BUDGET_RATIO = 0.1
+DEFAULT_RETRY_BUDGET_MAX_TOKENS = 10
+DEFAULT_HEDGE_MAX_WORKERS = 16
+
+# S3 error codes of throttled requests.
+THROTTLING_ERROR_CODES = frozenset((
+    'RequestLimitExceeded',
+    'SlowDown',
+    'Throttling',
+    'ThrottlingException',
+    'TooManyRequestsException',
+))
+
+TRANSIENT_EXCEPTIONS = (
+    CloudStorageServerErrorException,
+    CloudStorageTooManyRequestsException,
+    ConnectionError,
+    TimeoutError,
+    botocore.exceptions.ConnectionError,
+    botocore.exceptions.ReadTimeoutError,
+    google.api_core.exceptions.ServerError,
+    google.api_core.exceptions.TooManyRequests,
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    urllib3.exceptions.HTTPError,
+)
+
+
+def is_transient_error(e):
+    """Tell if a failed call may succeed when made again
+
+    Exceptions translated by storage clients are judged by their cause too.
+    """
+    while e is not None:
+        if isinstance(e, TRANSIENT_EXCEPTIONS):
+            return True
+        if isinstance(e, botocore.exceptions.ClientError):
+            error = e.response.get('Error', {})
+            status = e.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0)
+            return status >= 500 or status == 429 or \
+                error.get('Code') in THROTTLING_ERROR_CODES
+        e = e.__cause__
+    return False
+
+
+class RetryBudget(object):
+    """Caps retries to a share of calls, so retries can't snowball in an outage
+
+    Every call deposits ``ratio`` token and every retry takes one. The
+    budget starts full, with ``max_tokens``.
+
+    Kwargs:
+        ratio(float): Retries allowed per call over time
+        max_tokens(float): Retries allowed in a burst
+    """
+
+    def __init__(self, ratio=DEFAULT_RETRY_BUDGET_RATIO,
+                 max_tokens=DEFAULT_RETRY_BUDGET_MAX_TOKENS):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = float(max_tokens)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self):
+        """
+        Returns:
+            bool. False if the budget is spent
+        """
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class RetryPolicy(object):
+    """How storage calls are retried and hedged
+
+    Delays between attempts grow exponentially from ``base_delay`` up to
+    ``max_delay``, with full jitter. Hedged reads start a second identical
+    call if the first hasn't completed after ``hedge_delay`` seconds, and
+    return whichever succeeds first. Only small reads are hedged:
+    ``is_exists`` and ``stat``. Calls nested in a hedged attempt run inline,
+    neither retried nor hedged, so they can't wait on the hedge workers
+    running them.
+
+    Kwargs:
+        max_attempts(int): Max attempts of a call, including the first
+        base_delay(float): Seconds to wait before the first retry, at most
+        max_delay(float): Max seconds to wait before a retry
+        budget(RetryBudget): Optional limit of retries across calls
+        hedge_delay(float): Seconds before hedging a read. None to not hedge
+        hedge_max_workers(int): Max hedged calls running at once
+    """
+
+    def __init__(self, max_attempts=DEFAULT_RETRY_MAX_ATTEMPTS,
+                 base_delay=DEFAULT_RETRY_BASE_DELAY, max_delay=DEFAULT_RETRY_MAX_DELAY,
+                 budget=None, hedge_delay=None,
+                 hedge_max_workers=DEFAULT_HEDGE_MAX_WORKERS):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.hedge_delay = hedge_delay
+        self.hedge_max_workers = hedge_max_workers
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._executor = None
+        self._counts = dict.fromkeys(
+            ('calls', 'retries', 'budget_exhausted', 'hedges', 'hedge_wins'), 0)
+
+    def stats(self):
+        """Return counters
+
+        Returns:
+            dict. calls, retries, budget_exhausted (retries denied by the
+            budget), hedges and hedge_wins (hedges returning first)
+        """
+        with self._lock:
+            return dict(self._counts)
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def backoff(self, attempt):
+        """Return seconds to wait before retry number ``attempt``, from 1"""
+        return random.uniform(
+            0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def call(self, func, *args, **kwargs):
+        """Call ``func``, retrying transient errors
+
+        Calls nested in a retried call of the same thread aren't retried on
+        their own; the outer call is.
+        """
+        return self._call(func, args, kwargs, False)
+
+    def call_hedged(self, func, *args, **kwargs):
+        """Call ``func``, hedging slow attempts and retrying transient errors"""
+        return self._call(func, args, kwargs, self.hedge_delay is not None)
+
+    def _call(self, func, args, kwargs, hedged):
+        if getattr(self._local, 'active', False):
+            return func(*args, **kwargs)
+
+        self._count('calls')
+        if self.budget is not None:
+            self.budget.deposit()
+        self._local.active = True
+        try:
+            attempt = 1
+            while True:
+                try:
+                    if hedged:
+                        return self._call_hedged(func, args, kwargs)
+                    return func(*args, **kwargs)
+                except Exception as e:
+                    if attempt >= self.max_attempts or not is_transient_error(e):
+                        raise
+                    if self.budget is not None and not self.budget.withdraw():
+                        self._count('budget_exhausted')
+                        raise
+                self._count('retries')
+                count_event('retries')
+                time.sleep(self.backoff(attempt))
+                attempt += 1
+        finally:
+            self._local.active = False
+
+    def _call_hedged(self, func, args, kwargs):
+        executor = self._get_executor()
+        first = executor.submit(self._call_nested, func, args, kwargs)
+        try:
+            return first.result(timeout=self.hedge_delay)
+        except concurrent.futures.TimeoutError:
+            pass
+
+        self._count('hedges')
+        count_event('hedges')
+        hedge = executor.submit(self._call_nested, func, args, kwargs)
+        error = None
+        # the slower call keeps running, and its result is dropped.
+        for future in concurrent.futures.as_completed((first, hedge)):
+            error = future.exception()
+            if error is None:
+                if future is hedge:
+                    self._count('hedge_wins')
+                return future.result()
+        raise error
+
+    def _call_nested(self, func, args, kwargs):
+        # runs in a hedge worker, inside the calling thread's policy call.
+        self._local.active = True
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._local.active = False
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    self.hedge_max_workers, thread_name_prefix='cloud-storage-hedge')
+            return self._executor
+
+
+def retried(f):
+    """Retry a storage method which is safe to repeat, with self.retry_policy"""
+    @functools.wraps(f)
+    def decorate(self, *args, **kwargs):
+        retry_policy = self.retry_policy
+        if retry_policy is None:
+            return f(self, *args, **kwargs)
+        return retry_policy.call(f, self, *args, **kwargs)
+    return decorate
+
+
+def retried_hedged(f):
+    """Retry and hedge a small read method, with self.retry_policy"""
+    @functools.wraps(f)
+    def decorate(self, *args, **kwargs):
+        retry_policy = self.retry_policy
+        if retry_policy is None:
+            return f(self, *args, **kwargs)
+        return retry_policy.call_hedged(f, self, *args, **kwargs)
+    return decorate
+
+
+__all__ = (
+    'RetryBudget',
+    'RetryPolicy',
+)
@@ -2,23 +2,91 @@
 :author: Gatsby Lee
 :since: 06/21/2019
 """
-import gzip
-import io
 import logging
+import os
 
 import boto3
+import boto3.s3.transfer
 import botocore
 
 from http import HTTPStatus
 
+from cloud_storage.base import (
+    DEFAULT_BATCH_MAX_WORKERS,
+    STORAGE_EXCEPTIONS,
+    BaseStorage,
+    run_many,
+    to_storage_exception,
+)
+from cloud_storage.clients import create_s3_client, get_shared_client
+from cloud_storage.compression import (
+    DEFAULT_CHUNK_SIZE,
+    compress,
+    get_codec,
+    iter_compress,
+    read_to_bytearray,
+)
+from cloud_storage.enums import Compression
 from cloud_storage.excepts import (
     CloudStorageInvalidArgumentTypeException,
     CloudStorageNotFoundException,
+    CloudStorageServerErrorException,
+    CloudStorageTooManyRequestsException,
     CloudStorageUnknownErrorException,
 )
+from cloud_storage.gunzip import decompress_parallel_to_bytearray, iter_decompress_parallel
+from cloud_storage.instrumentation import (
+    buffer_size,
+    counted_bytes_sent,
+    destination_file_size,
+    instrumented,
+    report_bytes_sent,
+    result_size,
+    source_file_size,
+)
+from cloud_storage.memory_cache import (
+    invalidates_memory_cache,
+    invalidates_memory_cache_copied,
+    invalidates_memory_cache_many,
+    invalidates_memory_cache_renamed,
+    memory_cached_content,
+    memory_cached_exists,
+    object_token,
+)
+from cloud_storage.models import BatchItemResult, ObjectInfo
+from cloud_storage.parallel import (
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_MULTIPART_THRESHOLD,
+    DEFAULT_PART_SIZE,
+    download_ranges_to_bytearray,
+    download_ranges_to_file,
+    iter_merged,
+    iter_prefetched,
+    iter_ranges,
+    run_parts_with_retries,
+    split_ranges,
+    upload_file_parts,
+)
+from cloud_storage.retry import THROTTLING_ERROR_CODES, retried, retried_hedged
+from cloud_storage.streams import IterableReader, RangedReader, iter_chunks
 
 LOGGER = logging.getLogger(__name__)
 
+# Max number of keys S3 DeleteObjects accepts in one request.
+DELETE_OBJECTS_MAX_KEYS = 1000
+# Max size of an object S3 CopyObject copies. Larger ones need a multipart copy.
+COPY_OBJECT_MAX_SIZE = 5 * 1024 * 1024 * 1024
+MULTIPART_MAX_PARTS = 10000
+# headers a multipart copy doesn't carry over from the source by itself.
+COPIED_OBJECT_HEADERS = (
+    'CacheControl',
+    'ContentDisposition',
+    'ContentEncoding',
+    'ContentLanguage',
+    'ContentType',
+    'Metadata',
+)
+
 """
 https://stackoverflow.com/questions/42809096/difference-in-boto3-between-resource-client-and-session
 https://boto3.amazonaws.com/v1/documentation/api/latest/guide/clients.html
@@ -29,23 +97,161 @@ def s3_boto3_api_exception_handler(f):
     def decorate(*args, **kwargs):
         try:
             return f(*args, **kwargs)
-        except botocore.exceptions.ClientError as e:
-            if e.response['ResponseMetadata']['HTTPStatusCode'] == HTTPStatus.NOT_FOUND:
-                raise CloudStorageNotFoundException(str(e)) from None
-            # not handled, bring up.
-            raise e
-        except AssertionError as e:
-            raise CloudStorageInvalidArgumentTypeException(str(e)) from e
+        except STORAGE_EXCEPTIONS:
+            # already handled by a nested call.
+            raise
         except Exception as e:
-            raise CloudStorageUnknownErrorException(str(e)) from e
+            error = _to_storage_exception(e)
+            if error is e:
+                # not handled, bring up.
+                raise
+            if isinstance(error, CloudStorageNotFoundException):
+                raise error from None
+            raise error from e
     return decorate
 
 
-class S3CloudStorageBoto3(object):
+def _to_storage_exception(e):
+    """Map an exception of boto3 to one of ``cloud_storage.excepts``
+
+    Returns:
+        Exception. ``e`` itself for client errors left to callers, e.g.
+        AccessDenied
+    """
+    if isinstance(e, botocore.exceptions.ClientError):
+        status = e.response['ResponseMetadata']['HTTPStatusCode']
+        if status == HTTPStatus.NOT_FOUND:
+            return CloudStorageNotFoundException(str(e))
+        if (status == HTTPStatus.TOO_MANY_REQUESTS
+                or e.response.get('Error', {}).get('Code') in THROTTLING_ERROR_CODES):
+            return CloudStorageTooManyRequestsException(str(e))
+        if status >= HTTPStatus.INTERNAL_SERVER_ERROR:
+            return CloudStorageServerErrorException(str(e))
+        return e
+    if isinstance(e, AssertionError):
+        return CloudStorageInvalidArgumentTypeException(str(e))
+    return CloudStorageUnknownErrorException(str(e))
+
+
+def _object_args(content_type, content_encoding):
+    """Return object arguments of a write request, leaving out unset ones"""
+    object_args = {}
+    if content_type:
+        object_args['ContentType'] = content_type
+    if content_encoding:
+        object_args['ContentEncoding'] = content_encoding
+    return object_args
 
-    def __init__(self):
-        self.storage_client = boto3.client('s3')
 
+def _etag_md5(etag, api_response):
+    """Return hex MD5 of content if ETag is, otherwise None"""
+    # ETag is content MD5 only for single part objects without SSE-KMS/SSE-C.
+    md5 = etag.strip('"')
+    if ('-' in md5
+            or api_response.get('ServerSideEncryption', 'AES256') != 'AES256'
+            or api_response.get('SSECustomerAlgorithm')):
+        return None
+    return md5
+
+
+class S3CloudStorageBoto3(BaseStorage):
+
+    def __init__(self, storage_client=None,
+                 multipart_threshold=DEFAULT_MULTIPART_THRESHOLD,
+                 part_size=DEFAULT_PART_SIZE,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 memory_cache=None, shared_client=False, retry_policy=None,
+                 instrumentation=None, **client_options):
+        """
+        Kwargs:
+            storage_client: boto3 S3 client to use instead of a new default one
+            multipart_threshold(int): Objects of this size or larger are
+                transferred in parts
+            part_size(int): Size of each part
+            max_concurrency(int): Max concurrent part requests per transfer
+            memory_cache(MemoryCache): Cache of existence checks and small
+                contents, can be shared by clients. Clients share its
+                entries when they share storage_client
+            shared_client(bool): True to reuse the process-wide client with the
+                same client_options, instead of creating one(default: False)
+            retry_policy(RetryPolicy): Retries and hedging of calls failing
+                with transient errors, can be shared by clients
+            instrumentation(Instrumentation): Receives metrics of every call
+            **client_options: Options of a new client, passed to
+                ``cloud_storage.clients.create_s3_client``. e.g. max_pool_connections,
+                connect_timeout, read_timeout, retry_mode, max_attempts,
+                tcp_keepalive, session
+        """
+        if storage_client is None:
+            if shared_client:
+                storage_client = get_shared_client(create_s3_client, **client_options)
+            else:
+                storage_client = create_s3_client(**client_options)
+        else:
+            assert not client_options, "client_options need storage_client to be None"
+        self.storage_client = storage_client
+        self.multipart_threshold = multipart_threshold
+        self.part_size = part_size
+        self.max_concurrency = max_concurrency
+        self.memory_cache = memory_cache
+        self.retry_policy = retry_policy
+        self.instrumentation = instrumentation
+        self.transfer_config = boto3.s3.transfer.TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=part_size,
+            max_concurrency=max_concurrency,
+        )
+
+    def _to_storage_exception(self, e):
+        if isinstance(e, STORAGE_EXCEPTIONS):
+            return e
+        # client errors left to callers are reported as unknown.
+        return to_storage_exception(_to_storage_exception(e))
+
+    def _download_gzipped_stated(self, bucket_name, object_key, info, **kwargs):
+        return self.download_gzipped(bucket_name, object_key, info=info, **kwargs)
+
+    def _memory_cache_namespace(self):
+        return type(self).__name__, object_token(self.storage_client)
+
+    @retried
+    def _get_range(self, bucket_name, object_key, etag, start, end):
+        api_response = self.storage_client.get_object(
+            Bucket=bucket_name, Key=object_key, IfMatch=etag,
+            Range='bytes=%d-%d' % (start, end))
+        body = api_response['Body']
+        try:
+            return body.read()
+        finally:
+            body.close()
+
+    def _iter_content(self, bucket_name, object_key, info):
+        """Yield stored content of an object, pinned to info.etag
+
+        Large objects are fetched as concurrent byte ranges, in order, and
+        others streamed from one request.
+        """
+        if info.size >= self.multipart_threshold:
+            return iter_ranges(
+                lambda start, end: self._get_range(
+                    bucket_name, object_key, info.etag, start, end),
+                info.size, part_size=self.part_size,
+                max_concurrency=self.max_concurrency,
+            )
+        return self._iter_body(bucket_name, object_key, info.etag)
+
+    def _iter_body(self, bucket_name, object_key, etag):
+        response = self.storage_client.get_object(
+            Bucket=bucket_name, Key=object_key, IfMatch=etag)
+        body = response['Body']
+        try:
+            for chunk in body.iter_chunks(DEFAULT_CHUNK_SIZE):
+                yield chunk
+        finally:
+            body.close()
+
+    @instrumented
+    @retried
     def list_bucket_names(self):
         """Return list of bucket names
 
@@ -59,21 +265,100 @@ class S3CloudStorageBoto3(object):
             bucket_names.append(bucket_raw_info['Name'])
         return bucket_names
 
+    @instrumented(bytes_sent=source_file_size)
+    @invalidates_memory_cache
     def upload_file(self, bucket_name, object_key, source_file_name,
-                    content_type=None, content_encoding=None):
+                    content_type=None, content_encoding=None, compression=None,
+                    compression_level=None):
         """
         Uploads a local file to a bucket
+
+        Files of multipart_threshold or larger are uploaded as concurrent parts
+        of a multipart upload. Failed parts are uploaded again on their own,
+        rather than the whole file. Compressed files are streamed as
+        ``upload_stream`` does.
+
+        Kwargs:
+            compression(str): 'gzip', 'zstd' or 'lz4' to compress content while
+                uploading. content_encoding is set to it
+            compression_level(int): Defaults to the codec's
         """
+        if compression:
+            self._upload_file_compressed(
+                bucket_name, object_key, source_file_name, content_type,
+                compression, compression_level)
+            return
+
+        extra_args = _object_args(content_type, content_encoding)
+        if os.path.getsize(source_file_name) >= self.multipart_threshold:
+            # not retried as a whole: parts and requests are on their own.
+            self._upload_file_multipart(
+                bucket_name, object_key, source_file_name, extra_args)
+            return
+
+        self._upload_file_single(bucket_name, object_key, source_file_name, extra_args)
+
+    @retried
+    def _upload_file_compressed(self, bucket_name, object_key, source_file_name,
+                                content_type, compression, compression_level):
+        with open(source_file_name, 'rb') as f:
+            self._upload_chunks(
+                bucket_name, object_key,
+                counted_bytes_sent(iter_compress(
+                    iter_chunks(f), compression, compression_level)),
+                content_type, str(compression))
+
+    @retried
+    def _upload_file_single(self, bucket_name, object_key, source_file_name,
+                            extra_args):
         # Allowed values for ExtraArgs
         # ref: https://boto3.amazonaws.com/v1/documentation/api/latest/reference/customizations/s3.html#boto3.s3.transfer.S3Transfer.ALLOWED_UPLOAD_ARGS
         self.storage_client.upload_file(
             Bucket=bucket_name, Key=object_key, Filename=source_file_name,
-            ExtraArgs={'ContentType': content_type,
-                       'ContentEncoding': content_encoding}
+            ExtraArgs=extra_args, Config=self.transfer_config,
         )
 
+    def _upload_file_multipart(self, bucket_name, object_key, source_file_name,
+                               extra_args):
+        upload_id = self._create_multipart_upload(bucket_name, object_key, extra_args)
+        try:
+            etags = upload_file_parts(
+                lambda part_number, data: self.storage_client.upload_part(
+                    Bucket=bucket_name, Key=object_key, UploadId=upload_id,
+                    PartNumber=part_number, Body=data,
+                )['ETag'],
+                source_file_name, part_size=self.part_size,
+                max_concurrency=self.max_concurrency,
+                retry_policy=self.retry_policy,
+            )
+            self._complete_multipart_upload(
+                bucket_name, object_key, upload_id, etags)
+        except BaseException:
+            self.storage_client.abort_multipart_upload(
+                Bucket=bucket_name, Key=object_key, UploadId=upload_id)
+            raise
+
+    @retried
+    def _create_multipart_upload(self, bucket_name, object_key, extra_args):
+        return self.storage_client.create_multipart_upload(
+            Bucket=bucket_name, Key=object_key, **extra_args)['UploadId']
+
+    @retried
+    def _complete_multipart_upload(self, bucket_name, object_key, upload_id, etags):
+        self.storage_client.complete_multipart_upload(
+            Bucket=bucket_name, Key=object_key, UploadId=upload_id,
+            MultipartUpload={'Parts': [
+                {'ETag': etag, 'PartNumber': part_number}
+                for part_number, etag in enumerate(etags, 1)
+            ]},
+        )
+
+    @instrumented(bytes_sent=buffer_size)
+    @invalidates_memory_cache
+    @retried
     def upload(self, bucket_name, object_key, buffer,
-               content_type='', content_encoding=''):
+               content_type='', content_encoding='', compression=None,
+               compression_level=None):
         """Upload content to a bucket
 
         Args:
@@ -83,15 +368,69 @@ class S3CloudStorageBoto3(object):
         Kwargs:
             content_type(str): Type of Content
             content_encoding(str): Encoding used on content for uploading
+            compression(str): 'gzip', 'zstd' or 'lz4' to compress content
+                before uploading. content_encoding is set to it
+            compression_level(int): Defaults to the codec's
         Returns:
             None
         """
         assert isinstance(buffer, bytes)
+        if compression:
+            buffer = compress(buffer, compression, compression_level)
+            report_bytes_sent(len(buffer))
+            content_encoding = str(compression)
         self.storage_client.put_object(
             Bucket=bucket_name, Key=object_key, Body=buffer,
             ContentType=content_type, ContentEncoding=content_encoding
         )
 
+    @instrumented
+    @invalidates_memory_cache
+    @s3_boto3_api_exception_handler
+    def upload_stream(self, bucket_name, object_key, stream,
+                      content_type=None, content_encoding=None, do_gzip=False,
+                      compression=None, compression_level=None):
+        """Upload content of a file-like object or an iterable to a bucket
+
+        Content is sent as a multipart upload, and only a few parts are
+        buffered in memory at a time.
+
+        Args:
+            bucket_name(str):  Bucket name to use
+            object_key(str): Object key stored in bucket
+            stream: Readable binary file-like object, or iterable of bytes
+        Kwargs:
+            content_type(str): Type of Content
+            content_encoding(str): Encoding used on content for uploading
+            do_gzip(bool): True to gzip content while uploading. content_encoding
+                is set to gzip(default: False)
+            compression(str): 'gzip', 'zstd' or 'lz4' to compress content while
+                uploading. content_encoding is set to it
+            compression_level(int): Defaults to the codec's
+        Returns:
+            None
+        """
+        chunks = iter_chunks(stream)
+        if do_gzip:
+            compression = compression or Compression.GZIP
+        if compression:
+            chunks = iter_compress(chunks, compression, compression_level)
+            content_encoding = str(compression)
+        self._upload_chunks(bucket_name, object_key, chunks, content_type, content_encoding)
+
+    def _upload_chunks(self, bucket_name, object_key, chunks, content_type,
+                       content_encoding):
+        # s3transfer reads unseekable streams part by part, holding up to
+        # max_in_memory_upload_chunks parts.
+        self.storage_client.upload_fileobj(
+            Fileobj=IterableReader(chunks), Bucket=bucket_name, Key=object_key,
+            ExtraArgs=_object_args(content_type, content_encoding),
+            Config=self.transfer_config,
+        )
+
+    @instrumented
+    @memory_cached_exists
+    @retried_hedged
     def is_exists(self, bucket_name, object_key):
         """Check if an object exists in bucket
 
@@ -111,10 +450,41 @@ class S3CloudStorageBoto3(object):
             # not handled, bring up.
             raise e
 
+    @instrumented
+    @retried_hedged
+    @s3_boto3_api_exception_handler
+    def stat(self, bucket_name, object_key):
+        """Get metadata of an object
+
+        Args:
+            bucket_name (str):  Bucket name to use
+            object_key (str): Object key stored in bucket
+        Returns:
+            ObjectInfo. md5 is None unless ETag is content MD5
+        """
+        api_response = self.storage_client.head_object(
+            Bucket=bucket_name, Key=object_key)
+        etag = api_response['ETag']
+        return ObjectInfo(
+            object_key=object_key,
+            size=api_response['ContentLength'],
+            etag=etag,
+            md5=_etag_md5(etag, api_response),
+            updated=api_response['LastModified'],
+            content_type=api_response.get('ContentType'),
+            content_encoding=api_response.get('ContentEncoding'),
+        )
+
+    @instrumented
+    @invalidates_memory_cache_renamed
     @s3_boto3_api_exception_handler
     def rename(self, bucket_name, object_key, new_object_key):
         """Renames an object
 
+        The object is copied with ``copy``, then deleted. Not retried as a
+        whole, since a repeated rename would miss the deleted source; the copy
+        and the delete are retried on their own.
+
         Args:
             bucket_name (str):  Bucket name to use
             object_key (str): Object Key to rename
@@ -126,61 +496,315 @@ class S3CloudStorageBoto3(object):
             "object_key can't be same to new_object_key"
 
         # Since this is not atomic operation, deleting current key might fail.
+        self.copy(bucket_name, object_key, bucket_name, new_object_key)
+        self.delete(bucket_name, object_key)
+
+    @instrumented
+    @invalidates_memory_cache_copied
+    @s3_boto3_api_exception_handler
+    def copy(self, bucket_name, object_key, dst_bucket_name, dst_object_key,
+             callback=None):
+        """Copy an object on the server side, within or across buckets
+
+        Objects of multipart_threshold or larger, or over 5 GB, are copied as
+        concurrent ranges of a multipart upload, with their headers and user
+        metadata. Every request is conditional on the source's ETag, so an
+        object overwritten meanwhile fails the copy instead of mixing versions.
+        Requests are retried on their own, rather than the whole copy.
+
+        Args:
+            bucket_name(str):  Bucket name of the source
+            object_key(str): Object Key of the source
+            dst_bucket_name(str): Bucket name of the copy
+            dst_object_key(str): Object Key of the copy
+        Kwargs:
+            callback(callable): callback(bytes_copied) called as parts are
+                copied, possibly from other threads
+        Returns:
+            None
+        """
+        api_response = self._head_object(bucket_name, object_key)
+        size = api_response['ContentLength']
+        copy_source = {'Bucket': bucket_name, 'Key': object_key}
+        if size < min(self.multipart_threshold, COPY_OBJECT_MAX_SIZE):
+            self._copy_object(
+                copy_source, api_response['ETag'], dst_bucket_name, dst_object_key)
+            if callback is not None:
+                callback(size)
+            return
+
+        self._copy_multipart(
+            copy_source, api_response, dst_bucket_name, dst_object_key, callback)
+
+    @retried
+    def _head_object(self, bucket_name, object_key):
+        return self.storage_client.head_object(Bucket=bucket_name, Key=object_key)
+
+    @retried
+    def _copy_object(self, copy_source, etag, dst_bucket_name, dst_object_key):
         self.storage_client.copy_object(
-            Bucket=bucket_name, Key=new_object_key,
-            CopySource={
-                'Bucket': bucket_name, 'Key': object_key},
+            Bucket=dst_bucket_name, Key=dst_object_key, CopySource=copy_source,
+            CopySourceIfMatch=etag,
         )
-        self.delete(bucket_name, object_key)
 
+    def _copy_multipart(self, copy_source, api_response, dst_bucket_name,
+                        dst_object_key, callback):
+        size = api_response['ContentLength']
+        etag = api_response['ETag']
+        extra_args = {
+            name: api_response[name]
+            for name in COPIED_OBJECT_HEADERS if api_response.get(name)
+        }
+        upload_id = self._create_multipart_upload(
+            dst_bucket_name, dst_object_key, extra_args)
+
+        def copy_part(part_number, start, end):
+            part_etag = self.storage_client.upload_part_copy(
+                Bucket=dst_bucket_name, Key=dst_object_key, UploadId=upload_id,
+                PartNumber=part_number, CopySource=copy_source,
+                CopySourceRange='bytes=%d-%d' % (start, end),
+                CopySourceIfMatch=etag,
+            )['CopyPartResult']['ETag']
+            if callback is not None:
+                callback(end - start + 1)
+            return part_etag
+
+        # S3 takes up to 10000 parts.
+        part_size = max(self.part_size, -(-size // MULTIPART_MAX_PARTS))
+        try:
+            etags = run_parts_with_retries(
+                copy_part,
+                [(part_number, start, end) for part_number, (start, end)
+                 in enumerate(split_ranges(size, part_size), 1)],
+                self.max_concurrency, retry_policy=self.retry_policy,
+            )
+            self._complete_multipart_upload(
+                dst_bucket_name, dst_object_key, upload_id, etags)
+        except BaseException:
+            self.storage_client.abort_multipart_upload(
+                Bucket=dst_bucket_name, Key=dst_object_key, UploadId=upload_id)
+            raise
+
+    @instrumented(bytes_received=destination_file_size)
+    @retried
     @s3_boto3_api_exception_handler
     def download_gzipped_to_file(self, bucket_name, object_key, destination_file_name,
                                  do_gunzip=False):
         """Download an object to local
 
+        Content of large objects is fetched as concurrent byte ranges.
+        Decoding overlaps fetching, and gzip members recording their size are
+        inflated on several threads.
+
          Args:
              bucket_name(str):  Bucket name to use
              object_key(str): Object Key to rename
              destination_file_name(str): Local file path
         Kwargs:
-            do_gunzip(bool): True to gunzip(default: False)
+            do_gunzip(bool): True to decode content. zstd and lz4 encoded
+                content is decoded with its codec, anything else is gunzipped
+                (default: False)
         Returns:
             None
          """
+        info = self.stat(bucket_name, object_key)
         if do_gunzip:
-            object_content = self.download_gzipped(
-                bucket_name, object_key, do_gunzip)
-            with open(destination_file_name, 'wb') as f:
-                f.write(object_content)
+            # stream content through the decoder, so memory doesn't grow with
+            # object size.
+            codec = get_codec(info.content_encoding, Compression.GZIP)
+            try:
+                with open(destination_file_name, 'wb') as f:
+                    for data in iter_decompress_parallel(
+                            self._iter_content(bucket_name, object_key, info), codec):
+                        f.write(data)
+            except Exception:
+                # Delete the corrupt or partial downloaded file.
+                if os.path.exists(destination_file_name):
+                    os.remove(destination_file_name)
+                raise
         else:
-            self.storage_client.download_file(
-                Bucket=bucket_name, Key=object_key, Filename=destination_file_name)
+            if info.size >= self.multipart_threshold:
+                download_ranges_to_file(
+                    lambda start, end: self._get_range(
+                        bucket_name, object_key, info.etag, start, end),
+                    info.size, destination_file_name, expected_md5=info.md5,
+                    part_size=self.part_size,
+                    max_concurrency=self.max_concurrency,
+                )
+                return
 
+            response = self.storage_client.get_object(
+                Bucket=bucket_name, Key=object_key, IfMatch=info.etag)
+            body = response['Body']
+            try:
+                with open(destination_file_name, 'wb') as f:
+                    for chunk in body.iter_chunks(DEFAULT_CHUNK_SIZE):
+                        f.write(chunk)
+            finally:
+                body.close()
+
+    @instrumented(bytes_received=result_size)
+    @memory_cached_content
+    @retried
     @s3_boto3_api_exception_handler
-    def download_gzipped(self, bucket_name, object_key, do_gunzip=False):
+    def download_gzipped(self, bucket_name, object_key, do_gunzip=False,
+                         as_bytearray=False, info=None):
         """Download an gzipped object content to memory
 
+        Content is decoded into one buffer as chunks arrive, gzip members
+        recording their size on several threads, and raw content is read into
+        a buffer preallocated from Content-Length. Content of large objects is
+        fetched as concurrent byte ranges.
+
         Args:
             bucket_name(str):  Bucket name to use
             object_key(str): Object Key to rename
         Kwargs:
-            do_gunzip(bool): True to gunzip(default: False)
+            do_gunzip(bool): True to decode content. zstd and lz4 encoded
+                content is decoded with its codec, anything else is gunzipped
+                (default: False)
+            as_bytearray(bool): True to return the download buffer itself
+                instead of a bytes copy of it(default: False)
+            info(ObjectInfo): The object's ``stat``, if the caller has it, to
+                save a HEAD request. Content of its ETag is downloaded
         Returns:
             bytes. Content stored in the object
+            bytearray. if as_bytearray is True
         """
+        if info is None:
+            info = self.stat(bucket_name, object_key)
         if do_gunzip:
-            with io.BytesIO() as bytes_buffer:
-                with gzip.GzipFile(fileobj=bytes_buffer, mode='rb') as rgzip_buffer:
-                    self.storage_client.download_fileobj(
-                        Bucket=bucket_name, Key=object_key, Fileobj=bytes_buffer)
-                    bytes_buffer.seek(0)
-                    return rgzip_buffer.read()
-
-        with io.BytesIO() as bytes_buffer:
-            self.storage_client.download_fileobj(
-                Bucket=bucket_name, Key=object_key, Fileobj=bytes_buffer)
-            return bytes_buffer.getvalue()
+            buffer = decompress_parallel_to_bytearray(
+                self._iter_content(bucket_name, object_key, info),
+                get_codec(info.content_encoding, Compression.GZIP))
+        elif info.size >= self.multipart_threshold:
+            buffer = download_ranges_to_bytearray(
+                lambda start, end: self._get_range(
+                    bucket_name, object_key, info.etag, start, end),
+                info.size, expected_md5=info.md5, part_size=self.part_size,
+                max_concurrency=self.max_concurrency,
+            )
+        else:
+            response = self.storage_client.get_object(
+                Bucket=bucket_name, Key=object_key, IfMatch=info.etag)
+            body = response['Body']
+            try:
+                buffer = read_to_bytearray(
+                    body.iter_chunks(DEFAULT_CHUNK_SIZE), response['ContentLength'])
+            finally:
+                body.close()
+
+        if as_bytearray:
+            return buffer
+        return bytes(buffer)
+
+    @instrumented
+    @s3_boto3_api_exception_handler
+    def open_read(self, bucket_name, object_key, **kwargs):
+        """Open an object for reading without downloading it
+
+        Reads are served with byte range requests pinned to the object's
+        current ETag, through a small block cache.
+
+        Args:
+            bucket_name(str):  Bucket name to use
+            object_key(str): Object Key to read
+        Kwargs:
+            **kwargs: Passed to ``RangedReader``. e.g. block_size
+        Returns:
+            RangedReader. Seekable raw binary file-like object of raw content
+        """
+        info = self.stat(bucket_name, object_key)
+        return RangedReader(
+            lambda start, end: self._get_range(
+                bucket_name, object_key, info.etag, start, end),
+            info.size, **kwargs)
+
+    def iter_objects(self, bucket_name, prefix=None, delimiter=None, page_size=None):
+        """Iterate objects of a bucket lazily, in key order
 
+        Pages are listed one request at a time, and the next page is requested
+        while the current one is consumed.
+
+        Args:
+            bucket_name(str):  Bucket name to use
+        Kwargs:
+            prefix(str): Only objects whose key starts with prefix
+            delimiter(str): Group keys containing delimiter after prefix into
+                common prefixes
+            page_size(int): Max keys per listing request(default: 1000)
+        Yields:
+            ObjectInfo. md5, content_type and content_encoding are None.
+            Common prefixes are yielded with size None.
+        """
+        pages = self._iter_object_pages(bucket_name, prefix, delimiter, page_size)
+        for page in iter_prefetched(pages):
+            for info in page:
+                yield info
+
+    def iter_objects_parallel(self, bucket_name, shard_prefixes, delimiter=None,
+                              page_size=None, max_concurrency=None):
+        """Iterate objects of many key prefixes, listed concurrently
+
+        Objects of one shard come in key order, but shards interleave. Shard
+        prefixes shouldn't overlap, or objects are yielded more than once.
+
+        Args:
+            bucket_name(str):  Bucket name to use
+            shard_prefixes(list): Key prefixes to list. e.g. '0'...'f'
+        Kwargs:
+            delimiter(str): Group keys containing delimiter after prefix into
+                common prefixes
+            page_size(int): Max keys per listing request(default: 1000)
+            max_concurrency(int): Max shards listed at once. Defaults to
+                client's max_concurrency
+        Yields:
+            ObjectInfo. Same as ``iter_objects``
+        """
+        return iter_merged(
+            [self.iter_objects(bucket_name, shard_prefix, delimiter, page_size)
+             for shard_prefix in shard_prefixes],
+            max_concurrency or self.max_concurrency,
+        )
+
+    def _iter_object_pages(self, bucket_name, prefix, delimiter, page_size):
+        list_kwargs = {'Bucket': bucket_name}
+        if prefix:
+            list_kwargs['Prefix'] = prefix
+        if delimiter:
+            list_kwargs['Delimiter'] = delimiter
+        if page_size:
+            list_kwargs['MaxKeys'] = page_size
+
+        while True:
+            api_response = self._list_objects(**list_kwargs)
+            page = [
+                # listings don't tell SSE, so ETag can't be trusted as MD5.
+                ObjectInfo(
+                    object_key=x['Key'], size=x['Size'], etag=x['ETag'], md5=None,
+                    updated=x['LastModified'], content_type=None,
+                    content_encoding=None,
+                )
+                for x in api_response.get('Contents', [])
+            ]
+            page.extend(
+                ObjectInfo(x['Prefix'], None, None, None, None, None, None)
+                for x in api_response.get('CommonPrefixes', [])
+            )
+            yield page
+            if not api_response.get('IsTruncated'):
+                return
+            list_kwargs['ContinuationToken'] = api_response['NextContinuationToken']
+
+    @instrumented(operation='list_page')
+    @retried
+    @s3_boto3_api_exception_handler
+    def _list_objects(self, **kwargs):
+        return self.storage_client.list_objects_v2(**kwargs)
+
+    @instrumented
+    @invalidates_memory_cache
+    @retried
     @s3_boto3_api_exception_handler
     def delete(self, bucket_name, object_key):
         """Delete an object from bucket
@@ -196,3 +820,65 @@ class S3CloudStorageBoto3(object):
             Bucket=bucket_name,
             Key=object_key,
         )
+
+    @instrumented
+    @invalidates_memory_cache_many
+    def delete_many(self, bucket_name, object_keys,
+                    max_workers=DEFAULT_BATCH_MAX_WORKERS):
+        """Delete many objects from bucket
+
+        Keys are sent in DeleteObjects requests of up to 1000 keys,
+        which run concurrently.
+
+        Args:
+            bucket_name(str):  Bucket name to use
+            object_keys(iterable): Object keys to delete
+        Kwargs:
+            max_workers(int): Max concurrent DeleteObjects requests
+        Returns:
+            list. BatchItemResult per item
+        @note: No error is reported for objects which don't exist.
+        """
+        object_keys = list(object_keys)
+        key_batches = [
+            object_keys[i:i + DELETE_OBJECTS_MAX_KEYS]
+            for i in range(0, len(object_keys), DELETE_OBJECTS_MAX_KEYS)
+        ]
+        batch_results = run_many(
+            lambda key_batch: self._delete_objects(bucket_name, key_batch),
+            [(None, (key_batch,)) for key_batch in key_batches],
+            max_workers, self._to_storage_exception,
+        )
+
+        results = []
+        for key_batch, batch_result in zip(key_batches, batch_results):
+            for object_key in key_batch:
+                if batch_result.error is not None:
+                    error = batch_result.error
+                else:
+                    error = batch_result.result.get(object_key)
+                results.append(BatchItemResult(object_key, None, error))
+        return results
+
+    @retried
+    def _delete_objects(self, bucket_name, object_keys):
+        """Delete up to 1000 objects with one DeleteObjects request
+
+        Returns:
+            dict. object_key to exception, for keys that failed
+        """
+        api_response = self.storage_client.delete_objects(
+            Bucket=bucket_name,
+            Delete={
+                'Objects': [{'Key': object_key} for object_key in object_keys],
+                'Quiet': True,
+            },
+        )
+        errors = {}
+        for error in api_response.get('Errors', []):
+            message = '%s: %s' % (error.get('Code'), error.get('Message'))
+            if error.get('Code') == 'NoSuchKey':
+                errors[error['Key']] = CloudStorageNotFoundException(message)
+            else:
+                errors[error['Key']] = CloudStorageUnknownErrorException(message)
+        return errors
@@ -0,0 +1,163 @@
+"""
+:since: 2026-10-18
+
+File-like helpers for streaming transfers.
+"""
+import collections
+import io
+import threading
+
+from cloud_storage.compression import DEFAULT_CHUNK_SIZE
+from cloud_storage.parallel import IntegrityError
+
+DEFAULT_BLOCK_SIZE = 256 * 1024
+DEFAULT_READAHEAD_BLOCKS = 4
+DEFAULT_CACHE_BLOCKS = 32
+
+
+def iter_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Iterate bytes chunks of a file-like object or an iterable
+
+    Args:
+        source: Readable binary file-like object, or iterable of bytes
+    Kwargs:
+        chunk_size(int): Size to read at a time from a file-like object
+    Yields:
+        bytes. Non-empty chunks
+    """
+    if hasattr(source, 'read'):
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        for chunk in source:
+            assert isinstance(chunk, (bytes, bytearray, memoryview)), \
+                'chunks must be bytes-like, not %s' % type(chunk).__name__
+            if chunk:
+                yield chunk
+
+
+class IterableReader(io.RawIOBase):
+    """Unseekable raw reader over an iterable of bytes chunks
+
+    ``tell`` is supported, since upload clients check the stream position.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._pending = b''
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def readinto(self, b):
+        while not self._pending:
+            try:
+                self._pending = memoryview(next(self._chunks)).cast('B')
+            except StopIteration:
+                return 0
+        size = min(len(b), len(self._pending))
+        b[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        self._position += size
+        return size
+
+
+class RangedReader(io.RawIOBase):
+    """Seekable raw reader over an object fetched with byte range requests
+
+    Content is fetched in blocks kept in a small LRU cache. Sequential reads
+    fetch the following ``readahead_blocks`` blocks with the same request.
+
+    Args:
+        fetch_range(callable): fetch_range(start, end) returns bytes of the
+            inclusive range
+        size(int): Object size
+    Kwargs:
+        block_size(int): Size of a cached block
+        readahead_blocks(int): Max blocks fetched at once on sequential reads
+        cache_blocks(int): Max blocks kept in cache
+    """
+
+    def __init__(self, fetch_range, size, block_size=DEFAULT_BLOCK_SIZE,
+                 readahead_blocks=DEFAULT_READAHEAD_BLOCKS,
+                 cache_blocks=DEFAULT_CACHE_BLOCKS):
+        self._fetch_range = fetch_range
+        self.size = size
+        self._block_size = block_size
+        self._readahead_blocks = max(1, readahead_blocks)
+        self._cache_blocks = max(self._readahead_blocks, cache_blocks)
+        self._cache = collections.OrderedDict()
+        self._last_block_index = None
+        self._position = 0
+        self._lock = threading.Lock()
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError('invalid whence (%r)' % whence)
+        if position < 0:
+            raise ValueError('negative seek position %d' % position)
+        self._position = position
+        return position
+
+    def readinto(self, b):
+        with self._lock, memoryview(b) as view:
+            view = view.cast('B')
+            filled = 0
+            while filled < len(view) and self._position < self.size:
+                block_index, block_offset = divmod(self._position, self._block_size)
+                block = self._get_block(block_index)[block_offset:]
+                size = min(len(view) - filled, len(block))
+                view[filled:filled + size] = block[:size]
+                filled += size
+                self._position += size
+            return filled
+
+    def _get_block(self, block_index):
+        try:
+            block = self._cache[block_index]
+            self._cache.move_to_end(block_index)
+        except KeyError:
+            block = self._fetch_blocks(block_index)
+        self._last_block_index = block_index
+        return block
+
+    def _fetch_blocks(self, block_index):
+        count = 1
+        if self._last_block_index is not None and \
+                block_index == self._last_block_index + 1:
+            count = self._readahead_blocks
+        start = block_index * self._block_size
+        end = min(start + count * self._block_size, self.size) - 1
+        data = memoryview(self._fetch_range(start, end))
+        if len(data) != end - start + 1:
+            raise IntegrityError('range %d-%d returned %d bytes' % (start, end, len(data)))
+
+        for i in range(0, len(data), self._block_size):
+            index = block_index + i // self._block_size
+            self._cache[index] = data[i:i + self._block_size]
+            self._cache.move_to_end(index)
+        while len(self._cache) > self._cache_blocks:
+            self._cache.popitem(last=False)
+        return self._cache[block_index]
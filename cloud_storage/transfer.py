@@ -0,0 +1,271 @@
+"""
+:since: 2026-10-18
+
+Stream objects between storage clients of any backend.
+
+Objects are read with ``open_read`` and written with ``upload_stream``, so
+only a few blocks of each object are in memory at a time. Usable from the
+command line too::
+
+    python -m cloud_storage.transfer s3://bucket/prefix/ gs://bucket/prefix/
+"""
+import argparse
+import collections
+import concurrent.futures
+import logging
+import sys
+
+from cloud_storage import create_storage_client
+from cloud_storage.base import to_storage_exception
+from cloud_storage.enums import CloudStorageType, LocalStorageLayout
+from cloud_storage.excepts import CloudStorageNotFoundException
+from cloud_storage.local_storage import LOCAL_STORAGE_ROOT, LocalStorage
+from cloud_storage.models import BatchItemResult
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_TRANSFER_MAX_WORKERS = 8
+
+TRANSFERRED = 'transferred'
+SKIPPED = 'skipped'
+
+URL_SCHEMES = {
+    'gs': CloudStorageType.GCS,
+    'local': CloudStorageType.LOCAL,
+    's3': CloudStorageType.S3,
+}
+
+
+def is_unchanged(info, dst_info):
+    """Tell if a copy matches its source
+
+    MD5s are compared when both sides know them. Otherwise, e.g. for S3
+    multipart objects whose ETag isn't an MD5, the copy matches if it has
+    the same size and wasn't written before the source was last updated; a
+    source rewritten with the same size since is copied again.
+
+    Args:
+        info(ObjectInfo): Source object
+        dst_info(ObjectInfo): Copy
+    Returns:
+        bool
+    """
+    if info.size != dst_info.size:
+        return False
+    if info.md5 and dst_info.md5:
+        return info.md5 == dst_info.md5
+    if info.updated is not None and dst_info.updated is not None:
+        return dst_info.updated >= info.updated
+    return True
+
+
+def transfer(source, bucket_name, object_key, destination, dst_bucket_name,
+             dst_object_key=None, info=None):
+    """Stream one object from a storage client to another
+
+    Content is copied as stored, keeping content_type and content_encoding;
+    gzipped objects stay gzipped.
+
+    Args:
+        source: Storage client to read from
+        bucket_name(str): Bucket name of the source
+        object_key(str): Object Key of the source
+        destination: Storage client to write to
+        dst_bucket_name(str): Bucket name to write to
+    Kwargs:
+        dst_object_key(str): Object Key to write. Defaults to object_key
+        info(ObjectInfo): Source's ``stat``, if already known
+    Returns:
+        ObjectInfo. Of the source
+    """
+    if dst_object_key is None:
+        dst_object_key = object_key
+    if info is None:
+        info = source.stat(bucket_name, object_key)
+
+    with source.open_read(bucket_name, object_key) as reader:
+        destination.upload_stream(
+            dst_bucket_name, dst_object_key, reader,
+            content_type=info.content_type, content_encoding=info.content_encoding,
+        )
+    return info
+
+
+def iter_sync(source, bucket_name, destination, dst_bucket_name, prefix=None,
+              dst_prefix=None, max_workers=DEFAULT_TRANSFER_MAX_WORKERS,
+              dry_run=False):
+    """Transfer objects of a prefix whose copy is missing or differs
+
+    Objects are listed with ``iter_objects`` and transferred by a pool of
+    workers. Listing stays only a little ahead of the workers, so any number
+    of objects can be synced. Sources are compared and copied with the
+    metadata listed, and ``stat`` only for what a listing lacks, e.g. MD5
+    and content type of S3 objects.
+
+    Args:
+        source: Storage client to read from
+        bucket_name(str): Bucket name of the source
+        destination: Storage client to write to
+        dst_bucket_name(str): Bucket name to write to
+    Kwargs:
+        prefix(str): Only objects whose key starts with prefix
+        dst_prefix(str): Prefix replacing ``prefix`` in copied keys.
+            Defaults to prefix
+        max_workers(int): Max concurrent transfers
+        dry_run(bool): True to compare only(default: False)
+    Yields:
+        BatchItemResult. Per source object, in completion order. result is
+        'transferred' or 'skipped'
+    """
+    prefix = prefix or ''
+    dst_prefix = prefix if dst_prefix is None else dst_prefix
+
+    def sync_object(info):
+        object_key = info.object_key
+        dst_object_key = dst_prefix + object_key[len(prefix):]
+        stated = False
+        try:
+            dst_info = destination.stat(dst_bucket_name, dst_object_key)
+        except Exception as e:
+            if not isinstance(to_storage_exception(e), CloudStorageNotFoundException):
+                raise
+        else:
+            if info.md5 is None and dst_info.md5:
+                info, stated = source.stat(bucket_name, object_key), True
+            if is_unchanged(info, dst_info):
+                return SKIPPED
+        if not dry_run:
+            if not stated and info.content_type is None:
+                # maybe not listed; transfer stats the source.
+                info = None
+            transfer(source, bucket_name, object_key, destination, dst_bucket_name,
+                     dst_object_key, info)
+        return TRANSFERRED
+
+    infos = (
+        x for x in source.iter_objects(bucket_name, prefix or None)
+        # common prefixes have no size.
+        if x.size is not None
+    )
+    for result in _iter_bounded(sync_object, infos, max_workers):
+        yield result
+
+
+def sync(source, bucket_name, destination, dst_bucket_name, **kwargs):
+    """Transfer objects of a prefix whose copy is missing or differs
+
+    See ``iter_sync``.
+
+    Returns:
+        tuple. collections.Counter of results with 'failed', and
+        BatchItemResult of failed objects
+    """
+    counts = collections.Counter({TRANSFERRED: 0, SKIPPED: 0, 'failed': 0})
+    failures = []
+    for item in iter_sync(source, bucket_name, destination, dst_bucket_name, **kwargs):
+        if item.ok:
+            counts[item.result] += 1
+        else:
+            counts['failed'] += 1
+            failures.append(item)
+    return counts, failures
+
+
+def _iter_bounded(func, infos, max_workers):
+    """Call ``func(info)`` on a worker pool, keeping few calls queued
+
+    Yields:
+        BatchItemResult. In completion order
+    """
+    def call(info):
+        try:
+            return BatchItemResult(info.object_key, func(info), None)
+        except Exception as e:
+            return BatchItemResult(info.object_key, None, to_storage_exception(e))
+
+    max_pending = max_workers * 2
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+        pending = set()
+        for info in infos:
+            pending.add(executor.submit(call, info))
+            if len(pending) >= max_pending:
+                done, pending = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in concurrent.futures.as_completed(pending):
+            yield future.result()
+
+
+def parse_url(url):
+    """Split a storage URL into its parts
+
+    Args:
+        url(str): e.g. 's3://bucket/prefix/', 'gs://bucket', 'local://bucket/a/'
+    Returns:
+        tuple. CloudStorageType, bucket name and key prefix
+    """
+    scheme, separator, path = url.partition('://')
+    if not separator or scheme not in URL_SCHEMES:
+        raise ValueError(
+            '%s is not a storage URL. e.g. s3://bucket/prefix/' % url)
+    bucket_name, _, prefix = path.partition('/')
+    if not bucket_name:
+        raise ValueError('%s has no bucket name' % url)
+    return URL_SCHEMES[scheme], bucket_name, prefix
+
+
+def _create_client(storage_type, args):
+    if storage_type == CloudStorageType.LOCAL:
+        return LocalStorage(args.local_root, layout=args.local_layout)
+    return create_storage_client(storage_type)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='cloud-storage-sync',
+        description='Copy objects missing or different at the destination, '
+                    'streaming them between any storages.')
+    parser.add_argument('source', help='s3://, gs:// or local:// bucket and prefix')
+    parser.add_argument('destination', help='s3://, gs:// or local:// bucket and prefix')
+    parser.add_argument('--workers', type=int, default=DEFAULT_TRANSFER_MAX_WORKERS,
+                        help='Max concurrent transfers')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Report what would be transferred')
+    parser.add_argument('--local-root', default=LOCAL_STORAGE_ROOT,
+                        help='Root directory of local:// storage')
+    parser.add_argument('--local-layout', default=LocalStorageLayout.FLAT.value,
+                        choices=[x.value for x in LocalStorageLayout],
+                        help='Layout local:// storage was created with, as for '
+                             'LocalStorage(default: flat). A local:// source '
+                             'must be sharded, to be listed')
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    try:
+        source_type, bucket_name, prefix = parse_url(args.source)
+        dst_type, dst_bucket_name, dst_prefix = parse_url(args.destination)
+    except ValueError as e:
+        parser.error(str(e))
+
+    counts = collections.Counter()
+    for item in iter_sync(
+            _create_client(source_type, args), bucket_name,
+            _create_client(dst_type, args), dst_bucket_name,
+            prefix=prefix, dst_prefix=dst_prefix, max_workers=args.workers,
+            dry_run=args.dry_run):
+        if item.ok:
+            counts[item.result] += 1
+            LOGGER.info('%s %s', item.result, item.object_key)
+        else:
+            counts['failed'] += 1
+            print('failed %s: %s' % (item.object_key, item.error), file=sys.stderr)
+
+    print('%d transferred, %d skipped, %d failed' % (
+        counts[TRANSFERRED], counts[SKIPPED], counts['failed']))
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
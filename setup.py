@@ -15,7 +15,7 @@ with open(path.join(here, "cloud_storage/__about__.py"), encoding="utf-8") as f:
 
 requires = [
     "boto3",
-    "google-cloud-storage >= 1.24.0",
+    "google-cloud-storage >= 2.10.0",
     "six >= 1.15.0",
 ]
 
@@ -25,6 +25,10 @@ test_requires = [
     "moto",
 ]
 
+benchmark_requires = [
+    "moto[server]",
+]
+
 dev_requires = test_requires + [
     "wheel",
     "bpython",
@@ -62,7 +66,6 @@ setup(
         # that you indicate whether you support Python 2, Python 3 or both.
         "Programming Language :: Python",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.6",
         "Programming Language :: Python :: 3.7",
         "Topic :: Utilities",
     ],
@@ -70,15 +73,25 @@ setup(
     keywords="cloud storage gcs s3",
     # You can just specify the packages manually here if your project is
     # simple. Or you can use find_packages().
-    packages=find_packages(exclude=["contrib", "docs", "tests*", "playground*"]),
+    packages=find_packages(exclude=["contrib", "docs", "tests*", "playground*", "benchmarks*"]),
     # List run-time dependencies here.  These will be installed by pip when your
     # project is installed. For an analysis of "install_requires" vs pip's
     # requirements files see:
     # https://packaging.python.org/en/latest/technical.html#install-requires-vs-requirements-files
-    python_requires=">=3.6",
+    python_requires=">=3.7",
     install_requires=requires,
     extras_require={
         "dev": dev_requires,
         "test": test_requires,
+        "benchmark": benchmark_requires,
+        "prometheus": ["prometheus-client"],
+        "opentelemetry": ["opentelemetry-api"],
+        "zstd": ["zstandard"],
+        "lz4": ["lz4"],
+    },
+    entry_points={
+        "console_scripts": [
+            "cloud-storage-sync = cloud_storage.transfer:main",
+        ],
     },
 )
@@ -0,0 +1,80 @@
+import asyncio
+import shutil
+import threading
+
+import pytest
+
+from cloud_storage import LocalStorage, create_async_storage_client
+from cloud_storage.aio import AsyncLocalStorage
+from cloud_storage.retry import RetryPolicy
+
+LOCAL_STORAGE_ROOT_DIR = '/tmp/local_storage_test'
+
+
+@pytest.fixture
+def storage():
+    try:
+        shutil.rmtree(LOCAL_STORAGE_ROOT_DIR)
+    except FileNotFoundError:
+        pass
+    storage = AsyncLocalStorage(LocalStorage(LOCAL_STORAGE_ROOT_DIR), max_in_flight=4)
+    yield storage
+    storage.close()
+
+
+def _run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def test_create_async_storage_client():
+    storage = create_async_storage_client('local', max_in_flight=2)
+    assert isinstance(storage, AsyncLocalStorage)
+    assert storage.max_in_flight == 2
+    storage.close()
+
+    # other options are passed to the storage client.
+    retry_policy = RetryPolicy()
+    storage = create_async_storage_client(
+        's3', max_in_flight=2, retry_policy=retry_policy, read_timeout=5)
+    assert storage.storage.retry_policy is retry_policy
+    assert storage.storage.storage_client.meta.config.read_timeout == 5
+    assert storage.storage.storage_client.meta.config.max_pool_connections == 2
+    storage.close()
+
+
+def test_upload_download(storage):
+    async def run():
+        bucket_name = 'abc'
+        await asyncio.gather(*[
+            storage.upload(bucket_name, 'key-%d' % i, b'value-%d' % i)
+            for i in range(10)
+        ])
+        assert await storage.is_exists(bucket_name, 'key-0') is True
+        return await asyncio.gather(*[
+            storage.download_gzipped(bucket_name, 'key-%d' % i)
+            for i in range(10)
+        ])
+
+    assert _run(run()) == [b'value-%d' % i for i in range(10)]
+
+
+def test_exit_doesnt_block_loop():
+    event = threading.Event()
+
+    async def run():
+        storage = AsyncLocalStorage(LocalStorage(LOCAL_STORAGE_ROOT_DIR), max_in_flight=1)
+        async with storage:
+            waiting = asyncio.ensure_future(storage._run(event.wait, 5))
+            await asyncio.sleep(0.01)
+        # set by the loop while __aexit__ waits for the running call.
+        return await waiting
+
+    async def main():
+        asyncio.get_running_loop().call_later(0.05, event.set)
+        return await run()
+
+    assert _run(main()) is True
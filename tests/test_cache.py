@@ -0,0 +1,125 @@
+import os
+import shutil
+
+import boto3
+import pytest
+from moto import mock_s3
+
+from cloud_storage import CachedStorage, LocalStorage, S3CloudStorageBoto3
+from cloud_storage.excepts import CloudStorageNotFoundException
+from cloud_storage.retry import RetryPolicy
+
+LOCAL_STORAGE_ROOT_DIR = '/tmp/local_storage_test'
+CACHE_DIR = '/tmp/local_storage_test_cache'
+
+
+@pytest.fixture
+def storage():
+    for directory in (LOCAL_STORAGE_ROOT_DIR, CACHE_DIR):
+        try:
+            shutil.rmtree(directory)
+        except FileNotFoundError:
+            pass
+    return LocalStorage(LOCAL_STORAGE_ROOT_DIR)
+
+
+def test_download_gzipped(storage):
+    cached_storage = CachedStorage(storage, CACHE_DIR)
+    cached_storage.upload('abc', 'hello.txt', b'hello')
+    assert cached_storage.download_gzipped('abc', 'hello.txt') == b'hello'
+    assert cached_storage.download_gzipped('abc', 'hello.txt') == b'hello'
+    assert cached_storage.stats()['hits'] == 1
+    assert cached_storage.stats()['misses'] == 1
+
+    # written behind the cache's back, caught by revalidation.
+    storage.upload('abc', 'hello.txt', b'hello world')
+    assert cached_storage.download_gzipped('abc', 'hello.txt') == b'hello world'
+    assert cached_storage.stats()['misses'] == 2
+
+    # invalidated by writes through the cache.
+    cached_storage.delete('abc', 'hello.txt')
+    assert cached_storage.stats()['entries'] == 0
+    result = cached_storage.download_many('abc', ['hello.txt'])[0]
+    assert isinstance(result.error, CloudStorageNotFoundException)
+
+
+def test_eviction(storage):
+    cached_storage = CachedStorage(storage, CACHE_DIR, max_bytes=25, revalidate=False)
+    for i in range(3):
+        cached_storage.upload('abc', 'key-%d' % i, b'0123456789')
+        cached_storage.download_gzipped('abc', 'key-%d' % i)
+    stats = cached_storage.stats()
+    assert stats['evictions'] == 1
+    assert stats['bytes'] == 20
+
+    # cached content is picked up by a new cache on the same directory.
+    assert CachedStorage(storage, CACHE_DIR, max_bytes=25).stats()['entries'] == 2
+
+
+def test_invalidated_download_isnt_cached(storage):
+    cached_storage = CachedStorage(storage, CACHE_DIR, revalidate=False)
+    storage.upload('abc', 'hello.txt', b'hello')
+    download_gzipped = storage.download_gzipped
+
+    def download_during_write(*args, **kwargs):
+        content = download_gzipped(*args, **kwargs)
+        # a write through the cache lands while the old content is in flight.
+        cached_storage.upload('abc', 'hello.txt', b'hello world')
+        return content
+
+    storage.download_gzipped = download_during_write
+    assert cached_storage.download_gzipped('abc', 'hello.txt') == b'hello'
+    assert cached_storage.stats()['entries'] == 0
+
+    storage.download_gzipped = download_gzipped
+    assert cached_storage.download_gzipped('abc', 'hello.txt') == b'hello world'
+    assert cached_storage.download_gzipped('abc', 'hello.txt') == b'hello world'
+
+
+def test_passthrough(storage):
+    storage = LocalStorage(LOCAL_STORAGE_ROOT_DIR, layout='sharded', retry_policy=RetryPolicy())
+    cached_storage = CachedStorage(storage, CACHE_DIR)
+    cached_storage.upload('abc', 'a', b'a')
+    cached_storage.upload('abc', 'b', b'b')
+    assert [x.object_key for x in cached_storage.iter_objects('abc')] == ['a', 'b']
+    assert cached_storage.retry_policy is storage.retry_policy
+    assert cached_storage.memory_cache is None
+
+
+def test_namespace(storage):
+    cached_storage = CachedStorage(storage, CACHE_DIR)
+    cached_storage.upload('abc', 'hello.txt', b'hello')
+    cached_storage.download_gzipped('abc', 'hello.txt')
+    assert os.listdir(CACHE_DIR) == ['LocalStorage']
+
+    # content of other clients isn't served.
+    assert CachedStorage(storage, CACHE_DIR).stats()['entries'] == 1
+    assert CachedStorage(storage, CACHE_DIR, namespace='other').stats()['entries'] == 0
+
+
+class HeadCountingClient(object):
+
+    def __init__(self, client):
+        self.client = client
+        self.heads = 0
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def head_object(self, **kwargs):
+        self.heads += 1
+        return self.client.head_object(**kwargs)
+
+
+@mock_s3
+def test_miss_stats_once(storage):
+    conn = boto3.resource('s3', region_name='us-east-1')
+    conn.create_bucket(Bucket='cloud-storage-test')
+    client = HeadCountingClient(boto3.client('s3', region_name='us-east-1'))
+    cached_storage = CachedStorage(S3CloudStorageBoto3(storage_client=client), CACHE_DIR)
+    cached_storage.upload('cloud-storage-test', 'hello.txt', b'hello')
+
+    assert cached_storage.download_gzipped('cloud-storage-test', 'hello.txt') == b'hello'
+    assert client.heads == 1
+    assert cached_storage.download_gzipped('cloud-storage-test', 'hello.txt') == b'hello'
+    assert client.heads == 2
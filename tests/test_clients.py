@@ -0,0 +1,72 @@
+import threading
+
+import google.auth.credentials
+import pytest
+
+from cloud_storage import create_storage_client
+from cloud_storage.clients import (
+    PooledSession,
+    clear_shared_clients,
+    create_gcs_client,
+    create_s3_client,
+    get_shared_client,
+)
+from cloud_storage.excepts import UnsupportedStorage
+
+
+@pytest.fixture(autouse=True)
+def shared_clients():
+    clear_shared_clients()
+    yield
+    clear_shared_clients()
+
+
+def test_create_s3_client():
+    client = create_s3_client(
+        max_pool_connections=64, connect_timeout=1, read_timeout=2,
+        retry_mode='adaptive', max_attempts=5, tcp_keepalive=True,
+        region_name='us-west-2')
+    config = client.meta.config
+    assert config.max_pool_connections == 64
+    assert (config.connect_timeout, config.read_timeout) == (1, 2)
+    assert config.retries == {'mode': 'adaptive', 'total_max_attempts': 5}
+    assert config.tcp_keepalive is True
+    assert client.meta.region_name == 'us-west-2'
+
+
+def test_create_gcs_client():
+    client = create_gcs_client(
+        max_pool_connections=64, read_timeout=30, max_attempts=3, tcp_keepalive=True,
+        project='test', credentials=google.auth.credentials.AnonymousCredentials())
+    session = client._http
+    assert isinstance(session, PooledSession)
+    adapter = session.get_adapter('https://storage.googleapis.com')
+    assert adapter._pool_maxsize == 64
+    assert adapter.max_retries.total == 2
+    assert adapter.poolmanager.connection_pool_kw['socket_options'][-1][2] == 1
+    assert session.read_timeout == 30
+
+
+def test_shared_client():
+    clients = []
+    threads = [
+        threading.Thread(target=lambda: clients.append(get_shared_client(
+            create_s3_client, max_pool_connections=64, region_name='us-east-1')))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(map(id, clients))) == 1
+
+    storage = create_storage_client(
+        's3', shared_client=True, max_pool_connections=64, region_name='us-east-1')
+    assert storage.storage_client is clients[0]
+    other = create_storage_client('s3', max_pool_connections=64, region_name='us-east-1')
+    assert other.storage_client is not clients[0]
+
+
+def test_create_storage_client_unsupported():
+    with pytest.raises(UnsupportedStorage):
+        create_storage_client('ftp')
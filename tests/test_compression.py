@@ -0,0 +1,105 @@
+import gzip
+
+import pytest
+
+from cloud_storage.compression import (
+    GZIP_MEMBER_HEADER,
+    compress,
+    decompress_to_bytearray,
+    get_codec,
+    gunzip_to_bytearray,
+    iter_compress,
+    iter_decompress,
+    iter_gunzip,
+    iter_gzip,
+    iter_gzip_blocks,
+    read_to_bytearray,
+)
+from cloud_storage.enums import Compression
+
+
+def _split(buffer, size):
+    return [buffer[i:i + size] for i in range(0, len(buffer), size)]
+
+
+def test_iter_gunzip():
+    content = b'hello world' * 10000
+    chunks = _split(gzip.compress(content), 7)
+    assert b''.join(iter_gunzip(chunks)) == content
+
+
+def test_iter_gunzip_bounded_output():
+    content = b'\0' * (1024 * 1024)
+    pieces = list(iter_gunzip([gzip.compress(content)], max_length=4096))
+    assert max(len(x) for x in pieces) <= 4096
+    assert b''.join(pieces) == content
+
+
+def test_iter_gunzip_multi_member():
+    buffer = gzip.compress(b'hello ') + gzip.compress(b'world')
+    assert b''.join(iter_gunzip(_split(buffer, 5))) == b'hello world'
+
+
+def test_iter_gunzip_truncated():
+    buffer = gzip.compress(b'hello world' * 100)
+    with pytest.raises(EOFError):
+        b''.join(iter_gunzip([buffer[:-10]]))
+
+
+def test_gunzip_to_bytearray():
+    buffer = gzip.compress(b'hello world')
+    assert gunzip_to_bytearray(_split(buffer, 3)) == bytearray(b'hello world')
+
+
+@pytest.mark.parametrize('size', [0, 5, 11, 20])
+def test_read_to_bytearray(size):
+    buffer = read_to_bytearray(_split(b'hello world', 3), size)
+    assert isinstance(buffer, bytearray)
+    assert buffer == b'hello world'
+
+
+def test_iter_gzip():
+    content = [b'hello world %d' % i for i in range(1000)]
+    assert gzip.decompress(b''.join(iter_gzip(content))) == b''.join(content)
+    assert gzip.decompress(b''.join(iter_gzip([]))) == b''
+
+
+def test_iter_gzip_blocks():
+    content = b''.join(b'hello world %d\n' % i for i in range(100000))
+    buffer = b''.join(iter_gzip_blocks(_split(content, 100000), block_size=256 * 1024,
+                                       max_workers=4))
+    assert gzip.decompress(buffer) == content
+
+    # independent members, each recording its size.
+    size = GZIP_MEMBER_HEADER.unpack_from(buffer)[-1]
+    assert gzip.decompress(buffer[:size]) == content[:256 * 1024]
+    assert gzip.decompress(b''.join(iter_gzip_blocks([]))) == b''
+
+
+def test_compress_level():
+    content = b'hello world' * 10000
+    assert len(compress(content, 'gzip', 9)) < len(compress(content, 'gzip', 1))
+    assert gzip.decompress(compress(content, Compression.GZIP)) == content
+
+
+@pytest.mark.parametrize('compression, module', [
+    ('gzip', 'zlib'),
+    ('zstd', 'zstandard'),
+    ('lz4', 'lz4.frame'),
+])
+def test_iter_compress_iter_decompress(compression, module):
+    pytest.importorskip(module)
+    content = [b'hello world %d' % i for i in range(10000)]
+    buffer = b''.join(iter_compress(content, compression))
+    assert b''.join(iter_decompress(_split(buffer, 1000), compression)) == b''.join(content)
+    assert decompress_to_bytearray([buffer], compression) == b''.join(content)
+    assert b''.join(iter_decompress(iter_compress([], compression), compression)) == b''
+    with pytest.raises(EOFError):
+        b''.join(iter_decompress([buffer[:-10]], compression))
+
+
+def test_get_codec():
+    assert get_codec('gzip') is Compression.GZIP
+    assert get_codec('zstd') is Compression.ZSTD
+    assert get_codec('br') is None
+    assert get_codec(None, Compression.GZIP) is Compression.GZIP
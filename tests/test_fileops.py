@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+from cloud_storage import fileops
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'source'
+    path.write_bytes(os.urandom(3 * 1024 * 1024 + 7))
+    return path
+
+
+def test_copy_file(source, tmp_path):
+    destination = tmp_path / 'destination'
+    method = fileops.copy_file(str(source), str(destination))
+    assert method in ('reflink', 'copy_file_range', 'sendfile', 'read')
+    assert destination.read_bytes() == source.read_bytes()
+
+
+@pytest.mark.parametrize('unsupported', [
+    ('_copy_file_range',),
+    ('_copy_file_range', '_sendfile'),
+])
+def test_copy_file_falls_back(source, tmp_path, monkeypatch, unsupported):
+    def fail(*args):
+        raise OSError(fileops.errno.EXDEV, 'unsupported')
+
+    monkeypatch.setattr(fileops, '_reflink', lambda *args: False)
+    for name in unsupported:
+        monkeypatch.setattr(fileops, name, fail)
+
+    destination = tmp_path / 'destination'
+    fileops.copy_file(str(source), str(destination))
+    assert destination.read_bytes() == source.read_bytes()
+
+
+def test_copy_file_raises_other_errors(source, tmp_path, monkeypatch):
+    def fail(*args):
+        raise OSError(fileops.errno.EIO, 'io error')
+
+    monkeypatch.setattr(fileops, '_reflink', lambda *args: False)
+    monkeypatch.setattr(fileops, '_copy_file_range', fail)
+    with pytest.raises(OSError):
+        fileops.copy_file(str(source), str(tmp_path / 'destination'))
@@ -0,0 +1,105 @@
+import gc
+import threading
+import time
+import weakref
+
+import google.api_core.exceptions
+import pytest
+
+from cloud_storage import GoogleCloudStorage
+from cloud_storage.gcs_bucket_cache import BucketCache
+
+
+class SlowClient(object):
+
+    def __init__(self, missing=()):
+        self.missing = missing
+        self.calls = 0
+
+    def get_bucket(self, bucket_name):
+        self.calls += 1
+        time.sleep(0.05)
+        if bucket_name in self.missing:
+            raise google.api_core.exceptions.NotFound('%s is not found' % bucket_name)
+        return 'bucket:%s' % bucket_name
+
+    def bucket(self, bucket_name):
+        return 'handle:%s' % bucket_name
+
+
+def test_single_flight():
+    cache = BucketCache()
+    client = SlowClient()
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get(client, 'a')))
+        for _ in range(32)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # one call loads the bucket, the others get a handle.
+    assert sorted(results) == ['bucket:a'] + ['handle:a'] * 31
+    assert client.calls == 1
+
+    # handles are per client.
+    other = SlowClient()
+    assert cache.get(other, 'a') == 'bucket:a'
+    assert other.calls == 1
+
+
+def test_negative_ttl():
+    cache = BucketCache(negative_ttl=0.1)
+    client = SlowClient(missing=('a',))
+    for _ in range(3):
+        with pytest.raises(google.api_core.exceptions.NotFound):
+            cache.get(client, 'a')
+    assert client.calls == 1
+
+    time.sleep(0.1)
+    with pytest.raises(google.api_core.exceptions.NotFound):
+        cache.get(client, 'a')
+    assert client.calls == 2
+
+
+def test_invalidate():
+    cache = BucketCache()
+    client = SlowClient()
+    cache.get(client, 'a')
+    cache.invalidate(client, 'a')
+    cache.get(client, 'a')
+    assert client.calls == 2
+    assert cache.stats() == {'hits': 0, 'misses': 2}
+
+
+def test_load_buckets():
+    client = SlowClient()
+    storage = GoogleCloudStorage(storage_client=client, bucket_cache=BucketCache())
+    assert storage._get_bucket('a') == 'bucket:a'
+    assert storage._get_bucket('a') == 'handle:a'
+    assert client.calls == 1
+
+    storage = GoogleCloudStorage(storage_client=client, load_buckets=False)
+    assert storage._get_bucket('a') == 'handle:a'
+    assert client.calls == 1
+
+
+class BucketClient(SlowClient):
+
+    def get_bucket(self, bucket_name):
+        super().get_bucket(bucket_name)
+        # as google.cloud.storage.Bucket does.
+        return {'client': self, 'name': bucket_name}
+
+
+def test_client_is_collected():
+    cache = BucketCache()
+    client = BucketClient()
+    cache.get(client, 'a')
+    cache.get(client, 'a')
+    client_ref = weakref.ref(client)
+    del client
+    gc.collect()
+    assert client_ref() is None
+    assert len(cache._entries) == 0
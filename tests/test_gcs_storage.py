@@ -0,0 +1,235 @@
+import gzip
+import threading
+
+import requests
+
+from cloud_storage import GoogleCloudStorage
+from cloud_storage.compression import compress
+from cloud_storage.excepts import CloudStorageUnknownErrorException
+
+
+class FakeBlob(object):
+
+    def __init__(self, bucket, name, generation=None):
+        self.bucket = bucket
+        self.name = name
+        self.generation = generation
+        self.content_type = None
+        self.content_encoding = None
+
+    def upload_from_string(self, data, content_type=None):
+        suffix = self.name[-5:]
+        if suffix in self.bucket.failing_suffixes:
+            self.bucket.failing_suffixes.remove(suffix)
+            raise ConnectionResetError('connection reset')
+        self.bucket.objects[self.name] = bytes(data)
+
+    def download_to_file(self, file_obj, raw_download=False):
+        assert raw_download
+        self.bucket.downloads += 1
+        content = self.bucket.objects[self.name]
+        for i in range(0, len(content), 7):
+            file_obj.write(content[i:i + 7])
+        # set from response headers once the download is over.
+        self.content_encoding = self.bucket.encodings.get(self.name)
+        self.generation = 1
+
+    def upload_from_filename(self, filename, content_type=None):
+        with open(filename, 'rb') as f:
+            self.upload_from_string(f.read(), content_type)
+
+    def rewrite(self, source, token=None):
+        # two requests per rewrite, as for a large object.
+        content = self.bucket.client.get_bucket(source.bucket.name).objects[source.name]
+        if token is None:
+            return 'token', len(content) // 2, len(content)
+        self.bucket.objects[self.name] = content
+        return None, len(content), len(content)
+
+    def delete(self):
+        self.bucket.delete_blob(self.name)
+
+    def compose(self, sources):
+        assert len(sources) <= 32
+        self.bucket.composed.append(self.name)
+        self.bucket.objects[self.name] = b''.join(
+            self.bucket.objects[x.name] for x in sources)
+
+
+class FakeBucket(object):
+
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self.objects = {}
+        self.encodings = {}
+        self.composed = []
+        self.failing_suffixes = set()
+        self.deleted = []
+        self.downloads = 0
+
+    def blob(self, name, generation=None):
+        return FakeBlob(self, name, generation)
+
+    def get_blob(self, name):
+        if name in self.objects:
+            return FakeBlob(self, name, generation=1)
+        return None
+
+    def delete_blob(self, name):
+        self.deleted.append(name)
+        batch = getattr(self.client.local, 'batch', None)
+        if batch is None:
+            del self.objects[name]
+            return
+        if name.startswith('forbidden'):
+            batch.respond(403)
+        elif self.objects.pop(name, None) is None:
+            batch.respond(404)
+        else:
+            batch.respond(204)
+
+
+class FakeBatch(object):
+
+    def __init__(self, client, raise_exception=True):
+        assert not raise_exception
+        self.client = client
+        self._responses = []
+
+    def __enter__(self):
+        # batches are per thread, as google-cloud-storage keeps them.
+        assert getattr(self.client.local, 'batch', None) is None
+        self.client.local.batch = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.client.local.batch = None
+        self.client.batch_requests += 1
+
+    def respond(self, status_code):
+        response = requests.Response()
+        response.status_code = status_code
+        response.request = requests.Request('BATCH', 'contentid://1').prepare()
+        response._content = b'{"error": {"message": "denied"}}'
+        self._responses.append(response)
+
+
+class FakeClient(object):
+
+    def __init__(self):
+        self.buckets = {}
+        self.local = threading.local()
+        self.batch_requests = 0
+
+    def get_bucket(self, bucket_name):
+        if bucket_name not in self.buckets:
+            self.buckets[bucket_name] = FakeBucket(self, bucket_name)
+        return self.buckets[bucket_name]
+
+    def bucket(self, bucket_name):
+        return self.get_bucket(bucket_name)
+
+    def batch(self, raise_exception=True):
+        return FakeBatch(self, raise_exception)
+
+
+def test_upload_file_composite(tmp_path):
+    storage = GoogleCloudStorage(
+        storage_client=FakeClient(), multipart_threshold=100, part_size=10)
+    content = bytes(range(256)) * 2
+    source_file_name = str(tmp_path / 'source')
+    with open(source_file_name, 'wb') as f:
+        f.write(content)
+
+    storage.upload_file('bucket', 'object', source_file_name)
+
+    bucket = storage.storage_client.get_bucket('bucket')
+    # 52 parts are composed in two levels.
+    assert len(bucket.composed) == 3
+    assert bucket.objects == {'object': content}
+
+
+def test_upload_file_composite_retried_part(tmp_path):
+    storage = GoogleCloudStorage(
+        storage_client=FakeClient(), multipart_threshold=100, part_size=10)
+    content = bytes(range(100))
+    source_file_name = str(tmp_path / 'source')
+    with open(source_file_name, 'wb') as f:
+        f.write(content)
+    bucket = storage.storage_client.get_bucket('bucket')
+    # the first upload of part 3 fails.
+    bucket.failing_suffixes.add('00003')
+
+    storage.upload_file('bucket', 'object', source_file_name)
+
+    assert bucket.objects == {'object': content}
+    # parts uploaded again are deleted once.
+    assert len(bucket.deleted) == len(set(bucket.deleted)) == 10
+
+
+def test_upload_file_composite_logs_failed_deletes(tmp_path, caplog):
+    storage = GoogleCloudStorage(
+        storage_client=FakeClient(), multipart_threshold=100, part_size=10)
+    source_file_name = str(tmp_path / 'source')
+    with open(source_file_name, 'wb') as f:
+        f.write(bytes(range(100)))
+
+    # deleting objects named forbidden* is denied.
+    storage.upload_file('bucket', 'forbidden', source_file_name)
+
+    bucket = storage.storage_client.get_bucket('bucket')
+    assert bucket.objects['forbidden'] == bytes(range(100))
+    warnings = [r for r in caplog.records if r.levelname == 'WARNING']
+    assert len(warnings) == 10
+    assert 'forbidden.parts-' in warnings[0].getMessage()
+
+
+def test_copy_rename():
+    storage = GoogleCloudStorage(storage_client=FakeClient())
+    bucket = storage.storage_client.get_bucket('bucket')
+    bucket.objects['object'] = b'0123456789'
+
+    copied = []
+    storage.copy('bucket', 'object', 'other', 'copied', callback=copied.append)
+    assert copied == [5, 5]
+    assert storage.storage_client.get_bucket('other').objects == {'copied': b'0123456789'}
+
+    storage.rename('bucket', 'object', 'renamed')
+    assert bucket.objects == {'renamed': b'0123456789'}
+
+
+def test_delete_many():
+    storage = GoogleCloudStorage(storage_client=FakeClient())
+    bucket = storage.storage_client.get_bucket('bucket')
+    object_keys = ['key-%d' % i for i in range(250)] + ['missing', 'forbidden']
+    for object_key in object_keys[:250]:
+        bucket.objects[object_key] = b'x'
+
+    results = storage.delete_many('bucket', object_keys, max_workers=4)
+    assert [x.object_key for x in results] == object_keys
+    assert all(x.ok for x in results[:-1])
+    assert isinstance(results[-1].error, CloudStorageUnknownErrorException)
+    assert bucket.objects == {}
+    # one failed call doesn't send its batch again key by key.
+    assert storage.storage_client.batch_requests == 3
+
+
+def test_download_gzipped_decoded():
+    storage = GoogleCloudStorage(storage_client=FakeClient())
+    bucket = storage.storage_client.get_bucket('bucket')
+    content = b'0123456789' * 100
+    bucket.objects['encoded'] = compress(content, 'gzip')
+    bucket.encodings['encoded'] = 'gzip'
+    # gzip file stored as is.
+    bucket.objects['file.gz'] = gzip.compress(content)
+    bucket.objects['plain'] = content
+
+    assert storage.download_gzipped('bucket', 'encoded', do_gunzip=True) == content
+    assert storage.download_gzipped('bucket', 'plain', do_gunzip=True) == content
+    assert bucket.downloads == 2
+    assert storage.download_gzipped(
+        'bucket', 'file.gz', do_gunzip=True, as_bytearray=True) == bytearray(
+            bucket.objects['file.gz'])
+    # downloaded again as stored.
+    assert bucket.downloads == 4
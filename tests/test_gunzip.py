@@ -0,0 +1,89 @@
+import gzip
+import struct
+import zlib
+
+import pytest
+
+from cloud_storage.compression import compress, iter_gzip_blocks
+from cloud_storage.gunzip import (
+    decompress_parallel_to_bytearray,
+    iter_decompress_parallel,
+    iter_gunzip_parallel,
+    member_size,
+)
+
+CONTENT = b''.join(b'{"id": %d, "name": "row %d"}\n' % (i, i) for i in range(200000))
+
+
+def _split(buffer, size):
+    return [buffer[i:i + size] for i in range(0, len(buffer), size)]
+
+
+def _bgzf_member(data):
+    """A BGZF block, as written by bgzip"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+    body = compressor.compress(data) + compressor.flush()
+    header = struct.pack('<BBBBIBBHBBHH', 0x1f, 0x8b, 8, 4, 0, 0, 255, 6,
+                         ord('B'), ord('C'), 2, 18 + len(body) + 8 - 1)
+    return header + body + struct.pack('<II', zlib.crc32(data), len(data))
+
+
+def _blocks(content, block_size=64 * 1024):
+    return b''.join(iter_gzip_blocks([content], block_size=block_size))
+
+
+def test_member_size():
+    buffer = _blocks(CONTENT)
+    size = member_size(buffer)
+    assert gzip.decompress(buffer[:size]) == CONTENT[:64 * 1024]
+    assert member_size(buffer[:10]) == 0
+    assert member_size(gzip.compress(b'hello')) is None
+
+    member = _bgzf_member(b'hello')
+    assert member_size(member) == len(member)
+
+
+@pytest.mark.parametrize('chunk_size', [100, 1000003])
+def test_iter_gunzip_parallel(chunk_size):
+    pieces = list(iter_gunzip_parallel(_split(_blocks(CONTENT), chunk_size), max_workers=4))
+    assert b''.join(pieces) == CONTENT
+    assert len(pieces) > 1
+
+
+def test_iter_gunzip_parallel_bgzf():
+    buffer = b''.join(_bgzf_member(x) for x in _split(CONTENT, 60000))
+    assert b''.join(iter_gunzip_parallel(_split(buffer, 5000))) == CONTENT
+
+
+def test_iter_gunzip_parallel_falls_back():
+    # ordinary gzip, and sized members followed by an ordinary member.
+    assert b''.join(iter_gunzip_parallel(_split(gzip.compress(CONTENT), 7000))) == CONTENT
+    buffer = _blocks(CONTENT) + gzip.compress(b'tail')
+    assert b''.join(iter_gunzip_parallel(_split(buffer, 7000))) == CONTENT + b'tail'
+    assert list(iter_gunzip_parallel([])) == []
+
+
+def test_iter_gunzip_parallel_corrupt():
+    buffer = _blocks(CONTENT)
+    with pytest.raises(EOFError):
+        b''.join(iter_gunzip_parallel([buffer[:-10]]))
+
+    # a member recording a wrong size.
+    member = bytearray(_blocks(b'hello'))
+    member[16:20] = struct.pack('<I', len(member) - 1)
+    with pytest.raises(zlib.error):
+        b''.join(iter_gunzip_parallel([bytes(member) * 2]))
+
+
+@pytest.mark.parametrize('compression, prefetch', [
+    ('gzip', True),
+    ('gzip', False),
+    ('zstd', True),
+])
+def test_iter_decompress_parallel(compression, prefetch):
+    if compression == 'zstd':
+        pytest.importorskip('zstandard')
+    buffer = compress(CONTENT, compression)
+    chunks = _split(buffer, 10000)
+    assert b''.join(iter_decompress_parallel(chunks, compression, prefetch=prefetch)) == CONTENT
+    assert decompress_parallel_to_bytearray(chunks, compression) == CONTENT
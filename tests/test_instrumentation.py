@@ -0,0 +1,179 @@
+import contextlib
+
+import pytest
+
+from cloud_storage import LocalStorage, MemoryCache
+from cloud_storage.excepts import CloudStorageServerErrorException
+from cloud_storage.compression import compress
+from cloud_storage.instrumentation import (
+    CallbackInstrumentation,
+    OpenTelemetryInstrumentation,
+    PrometheusInstrumentation,
+    instrumented,
+)
+from cloud_storage.parallel import run_parts
+from cloud_storage.retry import RetryPolicy, retried
+
+
+@pytest.fixture
+def events():
+    return []
+
+
+@pytest.fixture
+def storage(tmp_path, events):
+    storage = LocalStorage(
+        str(tmp_path), memory_cache=MemoryCache(),
+        instrumentation=CallbackInstrumentation(events.append))
+    storage.create_bucket('bucket')
+    return storage
+
+
+def test_callback(storage, events, tmp_path):
+    storage.upload('bucket', 'a', b'hello')
+    storage.download_gzipped('bucket', 'a')
+    storage.download_gzipped('bucket', 'a')
+    storage.download_gzipped_to_file('bucket', 'a', str(tmp_path / 'a'))
+    with pytest.raises(FileNotFoundError):
+        storage.stat('bucket', 'missing')
+
+    assert [(x.operation, x.object_key, x.error) for x in events] == [
+        ('upload', 'a', None),
+        ('download_gzipped', 'a', None),
+        ('download_gzipped', 'a', None),
+        ('download_gzipped_to_file', 'a', None),
+        ('stat', 'missing', 'FileNotFoundError'),
+    ]
+    assert all(x.storage == 'LocalStorage' and x.duration >= 0 for x in events)
+    assert events[0].bytes_sent == 5
+    assert [x.cache_hits for x in events[1:3]] == [0, 1]
+    assert events[2].bytes_received == 5
+    assert events[3].bytes_received == 5
+
+
+def test_nested_calls(storage, events):
+    storage.upload('bucket', 'a', b'hello')
+    storage.rename('bucket', 'a', 'b')
+    assert [x.operation for x in events] == ['upload', 'rename']
+
+
+class FlakyStorage(LocalStorage):
+
+    failures = 1
+
+    def _get_metadata(self, bucket_name, object_key):
+        if self.failures:
+            self.failures -= 1
+            raise CloudStorageServerErrorException()
+        return super()._get_metadata(bucket_name, object_key)
+
+
+def test_retries(tmp_path, events):
+    storage = FlakyStorage(
+        str(tmp_path), retry_policy=RetryPolicy(base_delay=0),
+        instrumentation=CallbackInstrumentation(events.append))
+    storage.create_bucket('bucket')
+    storage.upload('bucket', 'a', b'hello')
+    storage.stat('bucket', 'a')
+    assert [(x.operation, x.retries) for x in events] == [('upload', 0), ('stat', 1)]
+
+
+class PartsStorage(object):
+
+    def __init__(self, instrumentation):
+        self.instrumentation = instrumentation
+        self.retry_policy = RetryPolicy(base_delay=0)
+        self.failing_parts = {1, 3}
+
+    @instrumented
+    def download(self, bucket_name, object_key):
+        return run_parts(self._download_part, [(i,) for i in range(4)], 4)
+
+    @retried
+    def _download_part(self, part_number):
+        if part_number in self.failing_parts:
+            self.failing_parts.remove(part_number)
+            raise CloudStorageServerErrorException()
+        return part_number
+
+
+def test_retries_in_workers(events):
+    PartsStorage(CallbackInstrumentation(events.append)).download('bucket', 'a')
+    assert [(x.operation, x.retries) for x in events] == [('download', 2)]
+
+
+def test_compressed_bytes_sent(storage, events, tmp_path):
+    content = b'hello' * 100
+    source_file_name = str(tmp_path / 'source')
+    with open(source_file_name, 'wb') as f:
+        f.write(content)
+
+    storage.upload('bucket', 'a', content, compression='gzip')
+    storage.upload_file('bucket', 'b', source_file_name, compression='gzip')
+    storage.upload_file('bucket', 'c', source_file_name)
+    assert [x.bytes_sent for x in events] == [
+        len(compress(content, 'gzip')), len(compress(content, 'gzip')), len(content)]
+
+
+def test_disabled(tmp_path):
+    storage = LocalStorage(str(tmp_path))
+    storage.create_bucket('bucket')
+    storage.upload('bucket', 'a', b'hello')
+    assert storage.download_gzipped('bucket', 'a') == b'hello'
+
+
+def test_prometheus(storage):
+    prometheus_client = pytest.importorskip('prometheus_client')
+    registry = prometheus_client.CollectorRegistry()
+    storage.instrumentation = PrometheusInstrumentation(registry)
+    storage.upload('bucket', 'a', b'hello')
+
+    labels = {'storage': 'LocalStorage', 'operation': 'upload'}
+    assert registry.get_sample_value('cloud_storage_bytes_sent_total', labels) == 5
+    assert registry.get_sample_value(
+        'cloud_storage_call_duration_seconds_count', dict(labels, error='')) == 1
+
+
+class FakeSpan(object):
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = dict(attributes)
+        self.status = None
+        self.ended = False
+
+    def set_attribute(self, name, value):
+        self.attributes[name] = value
+
+    def set_status(self, status):
+        self.status = status
+
+
+class FakeTracer(object):
+
+    def __init__(self):
+        self.spans = []
+
+    @contextlib.contextmanager
+    def start_as_current_span(self, name, kind=None, attributes=None):
+        span = FakeSpan(name, attributes)
+        self.spans.append(span)
+        yield span
+        span.ended = True
+
+
+def test_opentelemetry(storage):
+    pytest.importorskip('opentelemetry.trace')
+    tracer = FakeTracer()
+    storage.instrumentation = OpenTelemetryInstrumentation(tracer)
+    storage.upload('bucket', 'a', b'hello')
+    with pytest.raises(FileNotFoundError):
+        storage.stat('bucket', 'missing')
+
+    upload, stat = tracer.spans
+    assert upload.name == 'LocalStorage.upload'
+    assert upload.ended
+    assert upload.attributes['cloud_storage.object_key'] == 'a'
+    assert upload.attributes['cloud_storage.bytes_sent'] == 5
+    assert stat.attributes['error.type'] == 'FileNotFoundError'
+    assert stat.status is not None
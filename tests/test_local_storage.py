@@ -5,6 +5,7 @@ import shutil
 import pytest
 
 from cloud_storage import LocalStorage
+from cloud_storage.excepts import CloudStorageNotFoundException
 
 LOCAL_STORAGE_ROOT_DIR = '/tmp/local_storage_test'
 
@@ -45,3 +46,355 @@ def test_upload(storage):
     storage.upload(bucket_name, object_key, buffer)
 
     assert storage.is_exists(bucket_name, object_key) is True
+
+
+def test_upload_many_download_many(storage):
+    bucket_name = 'abc'
+    items = [('key-%d' % i, b'value-%d' % i) for i in range(20)]
+    results = storage.upload_many(bucket_name, items, max_workers=4)
+    assert [x.object_key for x in results] == [k for k, _ in items]
+    assert all(x.ok for x in results)
+
+    results = storage.download_many(
+        bucket_name, [k for k, _ in items] + ['missing'], max_workers=4)
+    assert [x.result for x in results[:-1]] == [v for _, v in items]
+    assert isinstance(results[-1].error, CloudStorageNotFoundException)
+
+    results = storage.download_many(bucket_name, ['key-0'], as_bytearray=True)
+    assert results[0].result == bytearray(b'value-0')
+    assert isinstance(results[0].result, bytearray)
+
+
+def test_download_gzipped_as_bytearray(storage):
+    storage.upload('abc', 'a', b'hello', compression='gzip')
+    downloaded = storage.download_gzipped('abc', 'a', do_gunzip=True, as_bytearray=True)
+    assert isinstance(downloaded, bytearray)
+    assert downloaded == b'hello'
+
+
+def test_delete_many(storage):
+    bucket_name = 'abc'
+    storage.upload(bucket_name, 'a', b'a')
+    storage.upload(bucket_name, 'b', b'b')
+    results = storage.delete_many(bucket_name, ['a', 'b'])
+    assert all(x.ok for x in results)
+    assert storage.is_exists(bucket_name, 'a') is False
+    assert storage.is_exists(bucket_name, 'b') is False
+
+
+def test_upload_stream(storage):
+    bucket_name = 'abc'
+    chunks = (b'line %d\n' % i for i in range(100))
+    storage.upload_stream(bucket_name, 'lines.txt', chunks, do_gzip=True)
+    assert storage.download_gzipped(bucket_name, 'lines.txt', do_gunzip=True) == \
+        b''.join(b'line %d\n' % i for i in range(100))
+
+
+def test_open_read(storage):
+    bucket_name = 'abc'
+    storage.upload(bucket_name, 'hello.txt', b'hello world')
+    with storage.open_read(bucket_name, 'hello.txt') as reader:
+        reader.seek(6)
+        assert reader.read() == b'world'
+
+
+@pytest.fixture
+def sharded_storage():
+    try:
+        shutil.rmtree(LOCAL_STORAGE_ROOT_DIR)
+    except FileNotFoundError:
+        pass
+    return LocalStorage(LOCAL_STORAGE_ROOT_DIR, layout='sharded')
+
+
+def test_sharded_get_full_path(sharded_storage):
+    hashed_object_key = hashlib.md5(b'efg.txt').hexdigest()
+    full_path = sharded_storage._get_full_path('abc', 'efg.txt')
+    expected_path = '/tmp/local_storage_test/abc/%s/%s/%s' % (
+        hashed_object_key[:2], hashed_object_key[2:4], hashed_object_key)
+    assert os.path.normpath(full_path) == os.path.normpath(expected_path)
+
+
+def test_sharded_upload_is_exists_stat(sharded_storage):
+    bucket_name = 'abc'
+    sharded_storage.upload(bucket_name, 'hello.txt', b'world', content_type='text/plain')
+    assert sharded_storage.is_exists(bucket_name, 'hello.txt') is True
+    assert sharded_storage.is_exists(bucket_name, 'missing') is False
+    assert sharded_storage.download_gzipped(bucket_name, 'hello.txt') == b'world'
+
+    info = sharded_storage.stat(bucket_name, 'hello.txt')
+    assert info.size == 5
+    assert info.content_type == 'text/plain'
+    with pytest.raises(FileNotFoundError):
+        sharded_storage.stat(bucket_name, 'missing')
+
+    # the index persists across clients.
+    reopened = LocalStorage(LOCAL_STORAGE_ROOT_DIR, layout='sharded')
+    assert reopened.is_exists(bucket_name, 'hello.txt') is True
+    assert reopened.list_bucket_names() == [bucket_name]
+
+
+def test_sharded_rename_delete(sharded_storage):
+    bucket_name = 'abc'
+    sharded_storage.upload(bucket_name, 'a', b'a')
+    sharded_storage.rename(bucket_name, 'a', 'b')
+    assert sharded_storage.is_exists(bucket_name, 'a') is False
+    assert sharded_storage.download_gzipped(bucket_name, 'b') == b'a'
+
+    sharded_storage.delete(bucket_name, 'b')
+    assert sharded_storage.is_exists(bucket_name, 'b') is False
+    with pytest.raises(FileNotFoundError):
+        sharded_storage.rename(bucket_name, 'b', 'c')
+
+
+def test_sharded_iter_objects(sharded_storage):
+    bucket_name = 'abc'
+    keys = ['a/1', 'a/2', 'a/b/1', 'b/1', 'c']
+    for key in keys:
+        sharded_storage.upload(bucket_name, key, b'x')
+    sharded_storage.upload('other', 'a/3', b'x')
+
+    assert [x.object_key for x in sharded_storage.iter_objects(bucket_name)] == keys
+    assert [x.object_key for x in sharded_storage.iter_objects(
+        bucket_name, prefix='a/', page_size=1)] == ['a/1', 'a/2', 'a/b/1']
+
+    infos = list(sharded_storage.iter_objects(bucket_name, delimiter='/', page_size=1))
+    assert [x.object_key for x in infos] == ['a/', 'b/', 'c']
+    assert [x.size for x in infos] == [None, None, 1]
+    assert [x.object_key for x in sharded_storage.iter_objects(
+        bucket_name, prefix='a/', delimiter='/')] == ['a/1', 'a/2', 'a/b/']
+
+
+def test_flat_iter_objects_not_implemented(storage):
+    with pytest.raises(NotImplementedError):
+        list(storage.iter_objects('abc'))
+
+
+@pytest.mark.parametrize('layout', ['flat', 'sharded'])
+def test_stat_metadata(layout):
+    shutil.rmtree(LOCAL_STORAGE_ROOT_DIR, ignore_errors=True)
+    storage = LocalStorage(LOCAL_STORAGE_ROOT_DIR, layout=layout)
+    bucket_name = 'abc'
+    storage.upload(bucket_name, 'a.json', b'{}', content_type='application/json')
+
+    info = storage.stat(bucket_name, 'a.json')
+    assert info.object_key == 'a.json'
+    assert info.size == 2
+    assert info.md5 == hashlib.md5(b'{}').hexdigest()
+    assert info.etag == info.md5
+    assert info.content_type == 'application/json'
+    assert info.content_encoding is None
+
+    storage.rename(bucket_name, 'a.json', 'b.json')
+    info = storage.stat(bucket_name, 'b.json')
+    assert info.object_key == 'b.json'
+    assert info.content_type == 'application/json'
+
+    storage.delete(bucket_name, 'b.json')
+    with pytest.raises(FileNotFoundError):
+        storage.stat(bucket_name, 'b.json')
+
+
+def test_download_gzipped_gunzips_gzip_encoded_only(storage):
+    bucket_name = 'abc'
+    storage.upload(bucket_name, 'plain.txt', b'hello')
+    storage.upload(bucket_name, 'gzipped.txt', b'hello', content_encoding='gzip')
+
+    assert storage.download_gzipped(bucket_name, 'plain.txt', do_gunzip=True) == b'hello'
+    assert storage.download_gzipped(bucket_name, 'gzipped.txt', do_gunzip=True) == b'hello'
+    assert storage.download_gzipped(bucket_name, 'gzipped.txt')[:2] == b'\x1f\x8b'
+    assert storage.stat(bucket_name, 'gzipped.txt').content_encoding == 'gzip'
+
+
+def test_stat_without_metadata(storage):
+    bucket_name = 'abc'
+    storage.upload(bucket_name, 'a', b'abc')
+    os.remove(storage._get_full_path(bucket_name, 'a') + '.meta')
+
+    info = storage.stat(bucket_name, 'a')
+    assert info.size == 3
+    assert info.md5 is None
+
+
+def test_upload_stream_failure_keeps_previous_object(storage):
+    bucket_name = 'abc'
+    storage.upload(bucket_name, 'a', b'previous')
+
+    def chunks():
+        yield b'partial'
+        raise IOError('source failed')
+
+    with pytest.raises(IOError):
+        storage.upload_stream(bucket_name, 'a', chunks())
+    assert storage.download_gzipped(bucket_name, 'a') == b'previous'
+    assert storage.stat(bucket_name, 'a').md5 == hashlib.md5(b'previous').hexdigest()
+    bucket_directory = os.path.join(LOCAL_STORAGE_ROOT_DIR, bucket_name)
+    assert not [x for x in os.listdir(bucket_directory) if x.startswith('.tmp-')]
+
+
+def test_concurrent_writers_are_serialized():
+    shutil.rmtree(LOCAL_STORAGE_ROOT_DIR, ignore_errors=True)
+    storage = LocalStorage(LOCAL_STORAGE_ROOT_DIR, fsync=True)
+    contents = [bytes([i]) * 100000 for i in range(16)]
+    results = storage.upload_many('abc', [('a', x) for x in contents], max_workers=8)
+    assert all(x.ok for x in results)
+
+    content = storage.download_gzipped('abc', 'a')
+    assert content in contents
+    assert storage.stat('abc', 'a').md5 == hashlib.md5(content).hexdigest()
+
+
+def test_upload_file_download_gzipped_to_file(storage, tmp_path):
+    source = tmp_path / 'source.txt'
+    source.write_bytes(b'hello world' * 1000)
+    storage.upload_file('abc', 'plain', str(source))
+    storage.upload_file('abc', 'gzipped', str(source), content_encoding='gzip')
+    storage.upload_file('abc', 'linked', str(source), link=True)
+
+    for object_key in ('plain', 'gzipped', 'linked'):
+        destination = tmp_path / object_key
+        storage.download_gzipped_to_file('abc', object_key, str(destination), do_gunzip=True)
+        assert destination.read_bytes() == source.read_bytes()
+
+    destination = tmp_path / 'raw'
+    storage.download_gzipped_to_file('abc', 'gzipped', str(destination))
+    assert destination.read_bytes()[:2] == b'\x1f\x8b'
+
+
+@pytest.mark.parametrize('compression', ['gzip', 'zstd', 'lz4'])
+def test_upload_compression(storage, tmp_path, compression):
+    pytest.importorskip({'gzip': 'zlib', 'zstd': 'zstandard', 'lz4': 'lz4.frame'}[compression])
+    content = b'hello world' * 100000
+    source = tmp_path / 'source.txt'
+    source.write_bytes(content)
+    storage.upload('abc', 'a', content, compression=compression, compression_level=1)
+    storage.upload_file('abc', 'b', str(source), compression=compression)
+
+    for object_key in ('a', 'b'):
+        assert storage.stat('abc', object_key).content_encoding == compression
+        assert len(storage.download_gzipped('abc', object_key)) < len(content)
+        assert storage.download_gzipped('abc', object_key, do_gunzip=True) == content
+        destination = tmp_path / object_key
+        storage.download_gzipped_to_file('abc', object_key, str(destination), do_gunzip=True)
+        assert destination.read_bytes() == content
+
+
+def test_download_gzipped_to_file_missing(storage, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        storage.download_gzipped_to_file('abc', 'missing', str(tmp_path / 'x'))
+    assert not (tmp_path / 'x').exists()
+
+
+@pytest.mark.parametrize('layout', ['flat', 'sharded'])
+def test_copy(layout):
+    shutil.rmtree(LOCAL_STORAGE_ROOT_DIR, ignore_errors=True)
+    storage = LocalStorage(LOCAL_STORAGE_ROOT_DIR, layout=layout)
+    storage.upload('abc', 'a', b'hello', content_type='text/plain')
+    storage.copy('abc', 'a', 'def', 'b')
+
+    assert storage.download_gzipped('def', 'b') == b'hello'
+    info = storage.stat('def', 'b')
+    assert info.object_key == 'b'
+    assert info.content_type == 'text/plain'
+    assert info.md5 == hashlib.md5(b'hello').hexdigest()
+
+    # overwriting the source doesn't change the copy.
+    storage.upload('abc', 'a', b'world')
+    assert storage.download_gzipped('def', 'b') == b'hello'
+
+
+def test_open_mmap(storage):
+    bucket_name = 'abc'
+    storage.upload(bucket_name, 'a', b'hello world')
+    with storage.open_mmap(bucket_name, 'a') as mapped:
+        assert len(mapped) == 11
+        assert mapped.read(6, 100) == b'world'
+        view = mapped[0:5]
+        assert bytes(view) == b'hello'
+
+        # the mapping keeps content as it was opened.
+        storage.upload(bucket_name, 'a', b'HELLO WORLD')
+        assert bytes(view) == b'hello'
+        with pytest.raises(BufferError):
+            mapped.close()
+        view.release()
+    assert mapped.closed
+
+    storage.upload(bucket_name, 'empty', b'')
+    with storage.open_mmap(bucket_name, 'empty') as mapped:
+        assert len(mapped) == 0
+        assert mapped.read(0, 10) == b''
+
+    with pytest.raises(FileNotFoundError):
+        storage.open_mmap(bucket_name, 'missing')
+
+
+@pytest.mark.parametrize('layout', ['flat', 'sharded'])
+def test_delete_leaves_bucket_empty(layout):
+    shutil.rmtree(LOCAL_STORAGE_ROOT_DIR, ignore_errors=True)
+    storage = LocalStorage(LOCAL_STORAGE_ROOT_DIR, layout=layout)
+    storage.upload('abc', 'a', b'a')
+    storage.rename('abc', 'a', 'b')
+    storage.delete('abc', 'b')
+    bucket_directory = os.path.join(LOCAL_STORAGE_ROOT_DIR, 'abc')
+    assert [files for _, _, files in os.walk(bucket_directory) if files] == []
+    assert storage.list_bucket_names() == ['abc']
+
+
+def test_rename_missing_keeps_destination(storage):
+    storage.upload('abc', 'b', b'b', content_type='text/plain')
+    with pytest.raises(FileNotFoundError):
+        storage.rename('abc', 'missing', 'b')
+    assert storage.stat('abc', 'b').content_type == 'text/plain'
+
+
+def test_written_file_mode(storage, tmp_path):
+    umask = os.umask(0)
+    os.umask(umask)
+    mode = 0o666 & ~umask
+    storage.upload('abc', 'a', b'hello')
+    full_path = storage._get_full_path('abc', 'a')
+    assert os.stat(full_path).st_mode & 0o777 == mode
+    assert os.stat(full_path + '.meta').st_mode & 0o777 == mode
+
+    source_file_name = str(tmp_path / 'b')
+    with open(source_file_name, 'wb') as f:
+        f.write(b'hello')
+    os.chmod(source_file_name, 0o600)
+    storage.upload_file('abc', 'b', source_file_name)
+    assert os.stat(storage._get_full_path('abc', 'b')).st_mode & 0o777 == mode
+
+
+def test_stale_temp_files_are_removed(storage):
+    storage.create_bucket('abc')
+    stale_path = os.path.join(LOCAL_STORAGE_ROOT_DIR, 'abc', '.tmp-stale')
+    fresh_path = os.path.join(LOCAL_STORAGE_ROOT_DIR, 'abc', '.tmp-fresh')
+    for path in (stale_path, fresh_path):
+        with open(path, 'wb') as f:
+            f.write(b'partial')
+    os.utime(stale_path, (0, 0))
+
+    storage = LocalStorage(LOCAL_STORAGE_ROOT_DIR)
+    storage.upload('abc', 'a', b'hello')
+    assert not os.path.exists(stale_path)
+    # may be written by a live writer.
+    assert os.path.exists(fresh_path)
+
+
+@pytest.mark.parametrize('layout', ['flat', 'sharded'])
+def test_reads_dont_touch_bucket_directory(layout, monkeypatch):
+    shutil.rmtree(LOCAL_STORAGE_ROOT_DIR, ignore_errors=True)
+    storage = LocalStorage(LOCAL_STORAGE_ROOT_DIR, layout=layout)
+    assert storage.is_exists('abc', 'a') is False
+    # reads of a missing bucket don't create it.
+    assert storage.list_bucket_names() == []
+
+    storage.upload('abc', 'a', b'a')
+    storage.upload('abc', 'b', b'b')
+    checked = []
+    monkeypatch.setattr(os.path, 'exists', lambda path: checked.append(path))
+    monkeypatch.setattr(os, 'makedirs', lambda *args, **kwargs: checked.append(args))
+    storage.upload('abc', 'a', b'A')
+    if layout == 'sharded':
+        assert storage.is_exists('abc', 'a') is True
+    assert checked == []
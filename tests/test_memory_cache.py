@@ -0,0 +1,83 @@
+import shutil
+import time
+
+import pytest
+
+from cloud_storage import LocalStorage, MemoryCache
+
+LOCAL_STORAGE_ROOT_DIR = '/tmp/local_storage_test'
+
+
+@pytest.fixture
+def storage():
+    try:
+        shutil.rmtree(LOCAL_STORAGE_ROOT_DIR)
+    except FileNotFoundError:
+        pass
+    return LocalStorage(LOCAL_STORAGE_ROOT_DIR, memory_cache=MemoryCache())
+
+
+def test_ttl():
+    memory_cache = MemoryCache(ttl=0.05)
+    memory_cache.set_exists(
+        'abc', 'hello.txt', True, memory_cache.version('abc', 'hello.txt'))
+    assert memory_cache.get_exists('abc', 'hello.txt') is True
+    time.sleep(0.06)
+    assert memory_cache.get_exists('abc', 'hello.txt') is None
+
+
+def test_byte_budget():
+    memory_cache = MemoryCache(max_bytes=25, max_object_size=20)
+    for i in range(3):
+        object_key = 'key-%d' % i
+        memory_cache.set_content(
+            'abc', object_key, False, b'0123456789', memory_cache.version('abc', object_key))
+    memory_cache.set_content(
+        'abc', 'large', False, b'0' * 21, memory_cache.version('abc', 'large'))
+    assert memory_cache.get_content('abc', 'key-0', False) is None
+    assert memory_cache.get_content('abc', 'key-2', False) == b'0123456789'
+    assert memory_cache.get_content('abc', 'large', False) is None
+    assert memory_cache.stats()['evictions'] == 1
+
+
+def test_stale_value_isnt_cached():
+    memory_cache = MemoryCache()
+    version = memory_cache.version('abc', 'hello.txt')
+    other_version = memory_cache.version('abc', 'other.txt')
+    memory_cache.invalidate('abc', 'hello.txt')
+    memory_cache.set_exists('abc', 'hello.txt', False, version)
+    assert memory_cache.get_exists('abc', 'hello.txt') is None
+    # invalidating a key doesn't drop fills of other keys.
+    memory_cache.set_exists('abc', 'other.txt', True, other_version)
+    assert memory_cache.get_exists('abc', 'other.txt') is True
+
+
+def test_namespaces(tmp_path):
+    memory_cache = MemoryCache()
+    storage = LocalStorage(str(tmp_path / 'one'), memory_cache=memory_cache)
+    other_storage = LocalStorage(str(tmp_path / 'two'), memory_cache=memory_cache)
+    storage.upload('abc', 'hello.txt', b'world')
+    assert storage.download_gzipped('abc', 'hello.txt') == b'world'
+    assert other_storage.is_exists('abc', 'hello.txt') is False
+
+    # clients of one root share entries.
+    same_storage = LocalStorage(str(tmp_path / 'one'), memory_cache=memory_cache)
+    assert same_storage.download_gzipped('abc', 'hello.txt') == b'world'
+    assert memory_cache.stats()['hits'] == 1
+
+
+def test_storage_is_exists(storage):
+    bucket_name = 'abc'
+    assert storage.is_exists(bucket_name, 'hello.txt') is False
+    assert storage.is_exists(bucket_name, 'hello.txt') is False
+    assert storage.memory_cache.stats()['hits'] == 1
+
+    # negative entry is dropped by the upload.
+    storage.upload(bucket_name, 'hello.txt', b'world')
+    assert storage.is_exists(bucket_name, 'hello.txt') is True
+    assert storage.download_gzipped(bucket_name, 'hello.txt') == b'world'
+    assert storage.download_gzipped(bucket_name, 'hello.txt') == b'world'
+
+    storage.rename(bucket_name, 'hello.txt', 'hello2.txt')
+    assert storage.is_exists(bucket_name, 'hello.txt') is False
+    assert storage.download_gzipped(bucket_name, 'hello2.txt') == b'world'
@@ -0,0 +1,167 @@
+import hashlib
+import os
+import time
+
+import pytest
+
+from cloud_storage.parallel import (
+    IntegrityError,
+    download_ranges_to_bytearray,
+    download_ranges_to_file,
+    iter_merged,
+    iter_prefetched,
+    iter_ranges,
+    split_ranges,
+    upload_file_parts,
+)
+from cloud_storage.retry import RetryPolicy
+
+CONTENT = bytes(range(256)) * 100
+
+
+def fetch_range(start, end):
+    return CONTENT[start:end + 1]
+
+
+def test_split_ranges():
+    assert split_ranges(10, 4) == [(0, 3), (4, 7), (8, 9)]
+    assert split_ranges(8, 4) == [(0, 3), (4, 7)]
+    assert split_ranges(0, 4) == []
+
+
+def test_download_ranges_to_file(tmp_path):
+    destination_file_name = str(tmp_path / 'object')
+    download_ranges_to_file(
+        fetch_range, len(CONTENT), destination_file_name,
+        expected_md5=hashlib.md5(CONTENT).hexdigest(),
+        part_size=1000, max_concurrency=4)
+    with open(destination_file_name, 'rb') as f:
+        assert f.read() == CONTENT
+
+
+def test_download_ranges_to_empty_file(tmp_path):
+    destination_file_name = str(tmp_path / 'object')
+    download_ranges_to_file(fetch_range, 0, destination_file_name)
+    assert os.path.getsize(destination_file_name) == 0
+
+
+def test_download_ranges_to_file_md5_mismatch(tmp_path):
+    destination_file_name = str(tmp_path / 'object')
+    with pytest.raises(IntegrityError):
+        download_ranges_to_file(
+            fetch_range, len(CONTENT), destination_file_name,
+            expected_md5='0' * 32, part_size=1000)
+    assert not os.path.exists(destination_file_name)
+
+
+def test_download_ranges_to_bytearray_short_range():
+    with pytest.raises(IntegrityError):
+        download_ranges_to_bytearray(
+            lambda start, end: fetch_range(start, end)[:-1],
+            len(CONTENT), part_size=1000)
+    buffer = download_ranges_to_bytearray(fetch_range, len(CONTENT), part_size=1000)
+    assert buffer == CONTENT
+
+
+def test_upload_file_parts_retries_failed_parts(tmp_path):
+    source_file_name = str(tmp_path / 'object')
+    with open(source_file_name, 'wb') as f:
+        f.write(CONTENT)
+
+    calls = []
+    uploaded = {}
+
+    def upload_part(part_number, data):
+        calls.append(part_number)
+        if part_number == 3 and calls.count(3) == 1:
+            raise ConnectionResetError('connection reset')
+        uploaded[part_number] = data
+        return 'etag-%d' % part_number
+
+    tokens = upload_file_parts(
+        upload_part, source_file_name, part_size=1000, max_concurrency=4)
+    assert tokens == ['etag-%d' % i for i in range(1, 27)]
+    # only the failed part is uploaded again.
+    assert len(calls) == 27
+    assert b''.join(uploaded[i] for i in range(1, 27)) == CONTENT
+
+
+def test_upload_file_parts_doesnt_retry_permanent_errors(tmp_path):
+    source_file_name = str(tmp_path / 'object')
+    with open(source_file_name, 'wb') as f:
+        f.write(CONTENT)
+
+    calls = []
+
+    def upload_part(part_number, data):
+        calls.append(part_number)
+        if part_number == 3:
+            raise PermissionError('access denied')
+        time.sleep(0.01)
+        return 'etag-%d' % part_number
+
+    with pytest.raises(PermissionError):
+        upload_file_parts(
+            upload_part, source_file_name, part_size=1000, max_concurrency=2)
+    assert calls.count(3) == 1
+    # pending parts are cancelled.
+    assert len(calls) < 26
+
+
+def test_upload_file_parts_with_retry_policy(tmp_path):
+    source_file_name = str(tmp_path / 'object')
+    with open(source_file_name, 'wb') as f:
+        f.write(CONTENT)
+
+    calls = []
+
+    def upload_part(part_number, data):
+        calls.append(part_number)
+        if part_number == 3 and calls.count(3) <= 3:
+            raise ConnectionResetError('connection reset')
+        return 'etag-%d' % part_number
+
+    policy = RetryPolicy(max_attempts=4, base_delay=0)
+    tokens = upload_file_parts(
+        upload_part, source_file_name, part_size=1000, retry_policy=policy)
+    assert tokens == ['etag-%d' % i for i in range(1, 27)]
+    # the part is retried as the policy allows, not the default 3 attempts.
+    assert calls.count(3) == 4
+    assert len(calls) == 29
+    assert policy.stats()['retries'] == 3
+
+
+def test_upload_file_parts_gives_up(tmp_path):
+    source_file_name = str(tmp_path / 'object')
+    with open(source_file_name, 'wb') as f:
+        f.write(CONTENT)
+
+    def upload_part(part_number, data):
+        raise ConnectionResetError('connection reset')
+
+    with pytest.raises(IOError):
+        upload_file_parts(upload_part, source_file_name, part_size=10000)
+
+
+def test_iter_prefetched():
+    assert list(iter_prefetched(iter(range(5)))) == [0, 1, 2, 3, 4]
+
+
+def test_iter_ranges():
+    assert b''.join(iter_ranges(fetch_range, len(CONTENT), part_size=1000,
+                                max_concurrency=4)) == CONTENT
+    assert list(iter_ranges(fetch_range, 0)) == []
+    with pytest.raises(IntegrityError):
+        list(iter_ranges(lambda start, end: b'', len(CONTENT), part_size=1000))
+
+
+def test_iter_merged():
+    items = iter_merged([range(0, 100), range(100, 200)], buffer_size=1)
+    assert sorted(items) == list(range(200))
+
+    def broken():
+        yield 1
+        raise ConnectionResetError('connection reset')
+
+    with pytest.raises(IOError):
+        list(iter_merged([broken(), range(1000)]))
@@ -0,0 +1,147 @@
+import threading
+import time
+
+import botocore.exceptions
+import pytest
+
+from cloud_storage import LocalStorage
+from cloud_storage.excepts import (
+    CloudStorageNotFoundException,
+    CloudStorageServerErrorException,
+    CloudStorageTooManyRequestsException,
+    CloudStorageUnknownErrorException,
+)
+from cloud_storage.retry import (
+    RetryBudget,
+    RetryPolicy,
+    is_transient_error,
+    retried_hedged,
+)
+
+
+def client_error(status, code='Error'):
+    return botocore.exceptions.ClientError(
+        {'Error': {'Code': code}, 'ResponseMetadata': {'HTTPStatusCode': status}},
+        'GetObject')
+
+
+def test_is_transient_error():
+    assert is_transient_error(CloudStorageServerErrorException())
+    assert is_transient_error(CloudStorageTooManyRequestsException())
+    assert is_transient_error(client_error(503))
+    assert is_transient_error(client_error(400, 'SlowDown'))
+    assert not is_transient_error(client_error(403))
+    assert not is_transient_error(CloudStorageNotFoundException())
+
+    try:
+        try:
+            raise ConnectionResetError()
+        except ConnectionResetError as e:
+            raise CloudStorageUnknownErrorException(str(e)) from e
+    except CloudStorageUnknownErrorException as e:
+        assert is_transient_error(e)
+
+
+class FlakyStorage(LocalStorage):
+
+    def __init__(self, root_dir, retry_policy, failures, delays=()):
+        super().__init__(root_dir, retry_policy=retry_policy)
+        self.failures = list(failures)
+        self.delays = list(delays)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    @retried_hedged
+    def stat(self, bucket_name, object_key):
+        with self._lock:
+            self.calls += 1
+            failure = self.failures.pop(0) if self.failures else None
+            delay = self.delays.pop(0) if self.delays else 0
+        time.sleep(delay)
+        if failure is not None:
+            raise failure
+        return super().stat(bucket_name, object_key)
+
+
+@pytest.fixture
+def root_dir(tmp_path):
+    storage = LocalStorage(str(tmp_path))
+    storage.create_bucket('bucket')
+    storage.upload('bucket', 'key', b'content')
+    return str(tmp_path)
+
+
+def test_retries_transient_errors(root_dir):
+    policy = RetryPolicy(base_delay=0)
+    storage = FlakyStorage(root_dir, policy, [
+        CloudStorageServerErrorException(), CloudStorageTooManyRequestsException()])
+
+    assert storage.stat('bucket', 'key').size == 7
+    assert storage.calls == 3
+    assert policy.stats()['retries'] == 2
+
+
+def test_gives_up(root_dir):
+    policy = RetryPolicy(max_attempts=2, base_delay=0)
+    storage = FlakyStorage(root_dir, policy, [CloudStorageServerErrorException()] * 3)
+    with pytest.raises(CloudStorageServerErrorException):
+        storage.stat('bucket', 'key')
+    assert storage.calls == 2
+
+    # not transient
+    storage = FlakyStorage(root_dir, policy, [CloudStorageNotFoundException()])
+    with pytest.raises(CloudStorageNotFoundException):
+        storage.stat('bucket', 'key')
+    assert storage.calls == 1
+
+
+def test_retry_budget(root_dir):
+    policy = RetryPolicy(base_delay=0, budget=RetryBudget(ratio=0, max_tokens=1))
+    storage = FlakyStorage(root_dir, policy, [CloudStorageServerErrorException()] * 3)
+    with pytest.raises(CloudStorageServerErrorException):
+        storage.stat('bucket', 'key')
+    assert storage.calls == 2
+    assert policy.stats()['retries'] == 1
+    assert policy.stats()['budget_exhausted'] == 1
+
+
+def test_hedged(root_dir):
+    policy = RetryPolicy(hedge_delay=0.05)
+    storage = FlakyStorage(root_dir, policy, [], delays=[1, 0])
+
+    started = time.monotonic()
+    assert storage.stat('bucket', 'key').size == 7
+    assert time.monotonic() - started < 0.5
+    assert storage.calls == 2
+    assert policy.stats()['hedges'] == 1
+    assert policy.stats()['hedge_wins'] == 1
+
+
+class NestedHedgedStorage(FlakyStorage):
+
+    @retried_hedged
+    def is_exists(self, bucket_name, object_key):
+        return self.stat(bucket_name, object_key) is not None
+
+
+def test_nested_hedged_calls_run_inline(root_dir):
+    policy = RetryPolicy(hedge_delay=0.05, hedge_max_workers=2)
+    storage = NestedHedgedStorage(root_dir, policy, [], delays=[0.2] * 32)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(storage.is_exists('bucket', 'key')))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert results == [True] * 8
+    # only the outer calls are hedged.
+    assert policy.stats()['calls'] == 8
+
+
+def test_backoff():
+    policy = RetryPolicy(base_delay=1, max_delay=3)
+    assert all(0 <= policy.backoff(1) <= 1 for _ in range(100))
+    assert all(0 <= policy.backoff(10) <= 3 for _ in range(100))
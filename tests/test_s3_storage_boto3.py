@@ -2,11 +2,19 @@
 :author: Gatsby Lee
 :since: 2019-04-10
 """
+import gzip
+
 import boto3
+import botocore.exceptions
 import pytest
 
 from moto import mock_s3
 from cloud_storage import S3CloudStorageBoto3
+from cloud_storage.excepts import (
+    CloudStorageNotFoundException,
+    CloudStorageTooManyRequestsException,
+)
+from cloud_storage.retry import RetryPolicy
 
 
 def test_init_obj():
@@ -55,3 +63,355 @@ def test_is_exists():
     buffer = b'hello world'
     S3CloudStorageBoto3().upload(bucket_name, object_key, buffer)
     assert S3CloudStorageBoto3().is_exists(bucket_name, object_key) is True
+
+
+@mock_s3
+def test_download_gzipped_to_file_do_gunzip(tmp_path):
+    conn = boto3.resource('s3', region_name='us-east-1')
+    conn.create_bucket(Bucket='cloud-storage-test')
+
+    bucket_name = 'cloud-storage-test'
+    object_key = 'log.jsonl'
+    content = b'{"hello": "world"}\n' * 100000
+    # two gzip members, like appended log files.
+    buffer = gzip.compress(content) + gzip.compress(content)
+    S3CloudStorageBoto3().upload(
+        bucket_name, object_key, buffer, content_encoding='gzip')
+
+    destination_file_name = str(tmp_path / 'log.jsonl')
+    S3CloudStorageBoto3().download_gzipped_to_file(
+        bucket_name, object_key, destination_file_name, do_gunzip=True)
+    with open(destination_file_name, 'rb') as f:
+        assert f.read() == content + content
+
+
+@mock_s3
+def test_download_gzipped():
+    conn = boto3.resource('s3', region_name='us-east-1')
+    conn.create_bucket(Bucket='cloud-storage-test')
+
+    bucket_name = 'cloud-storage-test'
+    object_key = '1/2/3/4.txt'
+    content = b'hello world' * 1000
+    buffer = gzip.compress(content)
+    storage = S3CloudStorageBoto3()
+    storage.upload(bucket_name, object_key, buffer, content_encoding='gzip')
+
+    assert storage.download_gzipped(bucket_name, object_key) == buffer
+    assert storage.download_gzipped(
+        bucket_name, object_key, do_gunzip=True) == content
+
+    downloaded = storage.download_gzipped(
+        bucket_name, object_key, do_gunzip=True, as_bytearray=True)
+    assert isinstance(downloaded, bytearray)
+    assert downloaded == content
+
+
+@mock_s3
+def test_delete_many():
+    conn = boto3.resource('s3', region_name='us-east-1')
+    conn.create_bucket(Bucket='cloud-storage-test')
+
+    bucket_name = 'cloud-storage-test'
+    object_keys = ['%d.txt' % i for i in range(1005)]
+    storage = S3CloudStorageBoto3()
+    results = storage.upload_many(
+        bucket_name, [(k, b'hello world') for k in object_keys])
+    assert all(x.ok for x in results)
+
+    results = storage.delete_many(bucket_name, object_keys + ['missing.txt'])
+    assert [x.object_key for x in results] == object_keys + ['missing.txt']
+    assert all(x.ok for x in results)
+    assert storage.is_exists(bucket_name, object_keys[0]) is False
+    assert storage.is_exists(bucket_name, object_keys[-1]) is False
+
+
+@mock_s3
+def test_upload_many_missing_bucket():
+    results = S3CloudStorageBoto3().upload_many('missing-bucket', [('a', b'hello')])
+    # mapped as single object calls map errors, keeping the cause.
+    assert isinstance(results[0].error, CloudStorageNotFoundException)
+    assert isinstance(results[0].error.__cause__, botocore.exceptions.ClientError)
+
+
+@mock_s3
+def test_download_ranged(tmp_path):
+    conn = boto3.resource('s3', region_name='us-east-1')
+    conn.create_bucket(Bucket='cloud-storage-test')
+
+    bucket_name = 'cloud-storage-test'
+    object_key = 'large.bin'
+    content = bytes(range(256)) * 1000
+    storage = S3CloudStorageBoto3(
+        multipart_threshold=1024, part_size=1000, max_concurrency=4)
+    storage.upload(bucket_name, object_key, content)
+
+    assert storage.download_gzipped(bucket_name, object_key) == content
+
+    destination_file_name = str(tmp_path / 'large.bin')
+    storage.download_gzipped_to_file(
+        bucket_name, object_key, destination_file_name)
+    with open(destination_file_name, 'rb') as f:
+        assert f.read() == content
+
+
+@mock_s3
+def test_upload_file_multipart(tmp_path):
+    conn = boto3.resource('s3', region_name='us-east-1')
+    conn.create_bucket(Bucket='cloud-storage-test')
+
+    bucket_name = 'cloud-storage-test'
+    object_key = 'large.bin'
+    part_size = 5 * 1024 * 1024
+    content = bytes(range(256)) * (part_size * 2 // 256 + 10)
+    source_file_name = str(tmp_path / 'large.bin')
+    with open(source_file_name, 'wb') as f:
+        f.write(content)
+
+    storage = S3CloudStorageBoto3(
+        multipart_threshold=part_size, part_size=part_size)
+    storage.upload_file(
+        bucket_name, object_key, source_file_name, content_type='text/plain')
+
+    api_response = storage.storage_client.head_object(
+        Bucket=bucket_name, Key=object_key)
+    assert api_response['ContentType'] == 'text/plain'
+    assert api_response['ETag'].endswith('-3"')
+    assert storage.download_gzipped(bucket_name, object_key) == content
+
+
+@mock_s3
+def test_upload_stream():
+    conn = boto3.resource('s3', region_name='us-east-1')
+    conn.create_bucket(Bucket='cloud-storage-test')
+
+    bucket_name = 'cloud-storage-test'
+    object_key = 'export.csv'
+    part_size = 5 * 1024 * 1024
+    rows = [b'%d,%d\n' % (i, i * i) for i in range(1000000)]
+    storage = S3CloudStorageBoto3(
+        multipart_threshold=part_size, part_size=part_size)
+    storage.upload_stream(bucket_name, object_key, iter(rows))
+    assert storage.download_gzipped(bucket_name, object_key) == b''.join(rows)
+
+    storage.upload_stream(
+        bucket_name, object_key, iter(rows), content_type='text/csv', do_gzip=True)
+    api_response = storage.storage_client.head_object(
+        Bucket=bucket_name, Key=object_key)
+    assert api_response['ContentEncoding'] == 'gzip'
+    assert storage.download_gzipped(
+        bucket_name, object_key, do_gunzip=True) == b''.join(rows)
+
+
+@mock_s3
+def test_upload_compression(tmp_path):
+    pytest.importorskip('zstandard')
+    conn = boto3.resource('s3', region_name='us-east-1')
+    conn.create_bucket(Bucket='cloud-storage-test')
+
+    bucket_name = 'cloud-storage-test'
+    content = b'hello world' * 100000
+    source_file_name = str(tmp_path / 'source.txt')
+    with open(source_file_name, 'wb') as f:
+        f.write(content)
+
+    storage = S3CloudStorageBoto3()
+    storage.upload(bucket_name, 'a', content, compression='gzip', compression_level=9)
+    storage.upload_file(bucket_name, 'b', source_file_name, compression='zstd')
+    for object_key, compression in (('a', 'gzip'), ('b', 'zstd')):
+        api_response = storage.storage_client.head_object(
+            Bucket=bucket_name, Key=object_key)
+        assert api_response['ContentEncoding'] == compression
+        assert storage.download_gzipped(
+            bucket_name, object_key, do_gunzip=True) == content
+        destination_file_name = str(tmp_path / object_key)
+        storage.download_gzipped_to_file(
+            bucket_name, object_key, destination_file_name, do_gunzip=True)
+        with open(destination_file_name, 'rb') as f:
+            assert f.read() == content
+
+
+@mock_s3
+def test_download_gzipped_ranged_parallel_gunzip(tmp_path):
+    conn = boto3.resource('s3', region_name='us-east-1')
+    conn.create_bucket(Bucket='cloud-storage-test')
+
+    bucket_name = 'cloud-storage-test'
+    content = b''.join(b'row %d\n' % i for i in range(500000))
+    storage = S3CloudStorageBoto3(multipart_threshold=64 * 1024, part_size=64 * 1024)
+    storage.upload(bucket_name, 'blocks.gz', content, compression='gzip')
+    storage.upload(bucket_name, 'plain.gz', gzip.compress(content),
+                   content_encoding='gzip')
+    for object_key in ('blocks.gz', 'plain.gz'):
+        assert storage.download_gzipped(
+            bucket_name, object_key, do_gunzip=True) == content
+        destination_file_name = str(tmp_path / object_key)
+        storage.download_gzipped_to_file(
+            bucket_name, object_key, destination_file_name, do_gunzip=True)
+        with open(destination_file_name, 'rb') as f:
+            assert f.read() == content
+
+
+@mock_s3
+def test_open_read():
+    conn = boto3.resource('s3', region_name='us-east-1')
+    conn.create_bucket(Bucket='cloud-storage-test')
+
+    bucket_name = 'cloud-storage-test'
+    object_key = 'data.parquet'
+    content = bytes(range(256)) * 1000
+    storage = S3CloudStorageBoto3()
+    storage.upload(bucket_name, object_key, content)
+
+    with storage.open_read(bucket_name, object_key, block_size=4096) as reader:
+        assert reader.read(4) == content[:4]
+        reader.seek(-8, 2)
+        assert reader.read() == content[-8:]
+
+
+@mock_s3
+def test_stat():
+    conn = boto3.resource('s3', region_name='us-east-1')
+    conn.create_bucket(Bucket='cloud-storage-test')
+
+    bucket_name = 'cloud-storage-test'
+    storage = S3CloudStorageBoto3()
+    storage.upload(bucket_name, 'hello.txt', b'hello world', content_type='text/plain')
+    info = storage.stat(bucket_name, 'hello.txt')
+    assert info.size == 11
+    assert info.md5 == '5eb63bbbe01eeed093cb22bb8f5acdc3'
+    assert info.content_type == 'text/plain'
+
+    with pytest.raises(CloudStorageNotFoundException):
+        storage.stat(bucket_name, 'missing.txt')
+
+
+@mock_s3
+def test_iter_objects():
+    conn = boto3.resource('s3', region_name='us-east-1')
+    conn.create_bucket(Bucket='cloud-storage-test')
+
+    bucket_name = 'cloud-storage-test'
+    object_keys = ['a/1.txt', 'a/2.txt', 'a/b/3.txt', 'b/4.txt', 'c.txt']
+    storage = S3CloudStorageBoto3()
+    storage.upload_many(bucket_name, [(k, b'hello') for k in object_keys])
+
+    infos = list(storage.iter_objects(bucket_name, page_size=2))
+    assert [x.object_key for x in infos] == object_keys
+    assert all(x.size == 5 for x in infos)
+
+    infos = list(storage.iter_objects(bucket_name, prefix='a/', delimiter='/'))
+    assert [(x.object_key, x.size) for x in infos] == \
+        [('a/1.txt', 5), ('a/2.txt', 5), ('a/b/', None)]
+
+    infos = storage.iter_objects_parallel(bucket_name, ['a/', 'b/', 'c'], page_size=1)
+    assert sorted(x.object_key for x in infos) == object_keys
+
+
+@mock_s3
+def test_copy_rename():
+    conn = boto3.resource('s3', region_name='us-east-1')
+    conn.create_bucket(Bucket='cloud-storage-test')
+    conn.create_bucket(Bucket='cloud-storage-test-2')
+
+    bucket_name = 'cloud-storage-test'
+    part_size = 5 * 1024 * 1024
+    content = bytes(range(256)) * (part_size * 2 // 256 + 10)
+    storage = S3CloudStorageBoto3(
+        multipart_threshold=part_size, part_size=part_size)
+    storage.upload(bucket_name, 'small', b'hello', content_type='text/plain')
+    storage.upload(bucket_name, 'large', content, content_type='text/plain')
+
+    copied = []
+    storage.copy(bucket_name, 'small', 'cloud-storage-test-2', 'small', callback=copied.append)
+    assert copied == [5]
+    storage.copy(bucket_name, 'large', 'cloud-storage-test-2', 'large', callback=copied.append)
+    assert sum(copied[1:]) == len(content)
+    assert len(copied) == 4
+
+    assert storage.download_gzipped('cloud-storage-test-2', 'small') == b'hello'
+    assert storage.download_gzipped('cloud-storage-test-2', 'large') == content
+    assert storage.stat('cloud-storage-test-2', 'large').content_type == 'text/plain'
+
+    storage.rename(bucket_name, 'large', 'renamed')
+    assert storage.is_exists(bucket_name, 'large') is False
+    assert storage.download_gzipped(bucket_name, 'renamed') == content
+
+    with pytest.raises(CloudStorageNotFoundException):
+        storage.copy(bucket_name, 'missing', bucket_name, 'x')
+
+
+class FlakyClient(object):
+
+    def __init__(self, client, failures):
+        self.client = client
+        self.failures = failures
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def head_object(self, **kwargs):
+        if self.failures:
+            raise botocore.exceptions.ClientError(self.failures.pop(0), 'HeadObject')
+        return self.client.head_object(**kwargs)
+
+
+@mock_s3
+def test_retry_policy():
+    conn = boto3.resource('s3', region_name='us-east-1')
+    conn.create_bucket(Bucket='cloud-storage-test')
+    S3CloudStorageBoto3().upload('cloud-storage-test', 'a', b'hello')
+
+    throttled = {'Error': {'Code': 'SlowDown'}, 'ResponseMetadata': {'HTTPStatusCode': 503}}
+    unavailable = {'Error': {'Code': '503'}, 'ResponseMetadata': {'HTTPStatusCode': 503}}
+    client = FlakyClient(boto3.client('s3', region_name='us-east-1'), [throttled])
+    with pytest.raises(CloudStorageTooManyRequestsException):
+        S3CloudStorageBoto3(storage_client=client).stat('cloud-storage-test', 'a')
+
+    client.failures = [throttled, unavailable]
+    retry_policy = RetryPolicy(base_delay=0)
+    storage = S3CloudStorageBoto3(storage_client=client, retry_policy=retry_policy)
+    assert storage.stat('cloud-storage-test', 'a').size == 5
+    assert retry_policy.stats()['retries'] == 2
+
+
+class FlakyPartClient(FlakyClient):
+
+    def __init__(self, client, failures):
+        super().__init__(client, failures)
+        self.created_uploads = 0
+
+    def create_multipart_upload(self, **kwargs):
+        self.created_uploads += 1
+        return self.client.create_multipart_upload(**kwargs)
+
+    def upload_part(self, **kwargs):
+        if kwargs['PartNumber'] == 2 and self.failures:
+            raise botocore.exceptions.ClientError(self.failures.pop(0), 'UploadPart')
+        return self.client.upload_part(**kwargs)
+
+
+@mock_s3
+def test_retry_policy_retries_parts(tmp_path):
+    conn = boto3.resource('s3', region_name='us-east-1')
+    conn.create_bucket(Bucket='cloud-storage-test')
+
+    part_size = 5 * 1024 * 1024
+    content = bytes(range(256)) * (part_size * 2 // 256 + 10)
+    source_file_name = str(tmp_path / 'large.bin')
+    with open(source_file_name, 'wb') as f:
+        f.write(content)
+
+    unavailable = {'Error': {'Code': '503'}, 'ResponseMetadata': {'HTTPStatusCode': 503}}
+    client = FlakyPartClient(
+        boto3.client('s3', region_name='us-east-1'), [unavailable, unavailable])
+    retry_policy = RetryPolicy(base_delay=0)
+    storage = S3CloudStorageBoto3(
+        storage_client=client, retry_policy=retry_policy,
+        multipart_threshold=part_size, part_size=part_size)
+    storage.upload_file('cloud-storage-test', 'large.bin', source_file_name)
+
+    # the failed part is uploaded again, not the whole file.
+    assert client.created_uploads == 1
+    assert retry_policy.stats()['retries'] == 2
+    assert storage.download_gzipped('cloud-storage-test', 'large.bin') == content
@@ -0,0 +1,44 @@
+import io
+
+import pytest
+
+from cloud_storage.streams import IterableReader, RangedReader, iter_chunks
+
+
+def test_iter_chunks():
+    assert list(iter_chunks(io.BytesIO(b'hello world'), 4)) == [b'hell', b'o wo', b'rld']
+    assert list(iter_chunks([b'hello', b'', b' world'])) == [b'hello', b' world']
+    with pytest.raises(AssertionError):
+        list(iter_chunks(['hello']))
+
+
+def test_iterable_reader():
+    reader = IterableReader([b'hello', b' ', b'world'])
+    assert reader.read(3) == b'hel'
+    assert reader.tell() == 3
+    assert reader.read() == b'lo world'
+    assert reader.read(1) == b''
+
+
+def test_ranged_reader():
+    content = bytes(range(256)) * 40
+    requests = []
+
+    def fetch_range(start, end):
+        requests.append((start, end))
+        return content[start:end + 1]
+
+    reader = RangedReader(
+        fetch_range, len(content), block_size=1000, readahead_blocks=3,
+        cache_blocks=4)
+    reader.seek(-10, io.SEEK_END)
+    assert reader.read() == content[-10:]
+    reader.seek(0)
+    assert reader.read(1500) == content[:1500]
+    assert reader.read(1500) == content[1500:3000]
+    # second block onward was read ahead in one request.
+    assert requests == [(10000, 10239), (0, 999), (1000, 3999)]
+
+    buffered = io.BufferedReader(reader)
+    buffered.seek(5000)
+    assert buffered.read(100) == content[5000:5100]
@@ -0,0 +1,109 @@
+import datetime
+import shutil
+
+import boto3
+import pytest
+
+from moto import mock_s3
+
+from cloud_storage import LocalStorage, S3CloudStorageBoto3
+from cloud_storage.enums import CloudStorageType
+from cloud_storage.models import ObjectInfo
+from cloud_storage.transfer import is_unchanged, main, parse_url, sync
+
+SOURCE_ROOT_DIR = '/tmp/transfer_test_source'
+DESTINATION_ROOT_DIR = '/tmp/transfer_test_destination'
+
+
+@pytest.fixture
+def storages():
+    for root_dir in (SOURCE_ROOT_DIR, DESTINATION_ROOT_DIR):
+        shutil.rmtree(root_dir, ignore_errors=True)
+    return (LocalStorage(SOURCE_ROOT_DIR, layout='sharded'),
+            LocalStorage(DESTINATION_ROOT_DIR, layout='sharded'))
+
+
+def test_sync(storages):
+    source, destination = storages
+    source.upload('src', 'data/a.txt', b'a', content_type='text/plain')
+    source.upload('src', 'data/b.txt', b'b', content_encoding='gzip')
+    source.upload('src', 'other.txt', b'other')
+
+    counts, failures = sync(source, 'src', destination, 'dst',
+                            prefix='data/', dst_prefix='copy/', max_workers=1)
+    assert counts == {'transferred': 2, 'skipped': 0, 'failed': 0}
+    assert failures == []
+    assert [x.object_key for x in destination.iter_objects('dst')] == \
+        ['copy/a.txt', 'copy/b.txt']
+    assert destination.stat('dst', 'copy/a.txt').content_type == 'text/plain'
+    # content is copied as stored.
+    assert destination.download_gzipped('dst', 'copy/b.txt', do_gunzip=True) == b'b'
+
+    source.upload('src', 'data/a.txt', b'A')
+    counts, _ = sync(source, 'src', destination, 'dst', prefix='data/', dst_prefix='copy/')
+    assert counts == {'transferred': 1, 'skipped': 1, 'failed': 0}
+    assert destination.download_gzipped('dst', 'copy/a.txt') == b'A'
+
+
+def test_sync_uses_listed_info(storages):
+    source, destination = storages
+    source.upload('src', 'a.txt', b'a', content_type='text/plain')
+    stat = source.stat
+    stated = []
+    source.stat = lambda *args: stated.append(args) or stat(*args)
+
+    for _ in range(2):
+        sync(source, 'src', destination, 'dst')
+    assert destination.stat('dst', 'a.txt').content_type == 'text/plain'
+    # the sharded listing has every field compared and copied.
+    assert stated == []
+
+
+@mock_s3
+def test_sync_from_s3(storages):
+    conn = boto3.resource('s3', region_name='us-east-1')
+    conn.create_bucket(Bucket='cloud-storage-test')
+    source = S3CloudStorageBoto3()
+    _, destination = storages
+    content = bytes(range(256)) * 4000
+    source.upload('cloud-storage-test', 'large.bin', content, content_type='image/png')
+
+    counts, _ = sync(source, 'cloud-storage-test', destination, 'dst')
+    assert counts['transferred'] == 1
+    assert destination.download_gzipped('dst', 'large.bin') == content
+    assert destination.stat('dst', 'large.bin').content_type == 'image/png'
+
+    counts, _ = sync(source, 'cloud-storage-test', destination, 'dst')
+    assert counts['skipped'] == 1
+
+
+def test_is_unchanged_without_md5():
+    updated = datetime.datetime(2026, 10, 18, tzinfo=datetime.timezone.utc)
+    # as an S3 multipart object, whose ETag isn't an MD5.
+    info = ObjectInfo('a', 10, '"abc-2"', None, updated, None, None)
+    copied = info._replace(updated=updated + datetime.timedelta(seconds=1))
+    assert is_unchanged(info, copied) is True
+    # rewritten with the same size since copied.
+    rewritten = info._replace(updated=updated + datetime.timedelta(seconds=2))
+    assert is_unchanged(rewritten, copied) is False
+    assert is_unchanged(info, copied._replace(size=11)) is False
+
+
+def test_parse_url():
+    assert parse_url('s3://bucket/a/b/') == (CloudStorageType.S3, 'bucket', 'a/b/')
+    assert parse_url('gs://bucket') == (CloudStorageType.GCS, 'bucket', '')
+    with pytest.raises(ValueError):
+        parse_url('/tmp/bucket')
+
+
+def test_main(storages, capsys):
+    source, _ = storages
+    source.upload('src', 'a', b'a')
+    argv = ['local://src/', 'local://dst/', '--local-root', SOURCE_ROOT_DIR,
+            '--local-layout', 'sharded']
+    assert main(argv) == 0
+    assert main(argv) == 0
+    assert capsys.readouterr().out.splitlines() == [
+        '1 transferred, 0 skipped, 0 failed',
+        '0 transferred, 1 skipped, 0 failed',
+    ]